@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Benchmarks do Bot de Monitoramento de Preços
+Mede o custo das etapas críticas com páginas salvas ou geradas sinteticamente
+
+Uso:
+    python benchmark.py parse [pagina1.html pagina2.html ...]
+    python benchmark.py pages URL [URL ...]
+    python benchmark.py db [--products N] [--seconds S]
+    python benchmark.py alerts [--alerts N] [--products N] [--changes N]
+    python benchmark.py cadence [--products N] [--days N]
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Adiciona o diretório src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from bs4 import BeautifulSoup
+
+from scraper_utils import find_jsonld_prices
+from src.extraction import extract_document
+from src.scraper import StaticScraper
+
+NIKE_NAME_SELECTORS = [
+    'h1[data-testid="product-name"]',
+    'h1[data-automation-id="product-title"]',
+    'h1.headline-5',
+    'h1.pdp_product_title'
+]
+
+NIKE_PRICE_SELECTORS = [
+    'span[data-testid="main-price"]',
+    '[data-automation-id="product-price"]',
+    '.product-price',
+    '.price-current'
+]
+
+def synthetic_page(blocks: int = 1500) -> bytes:
+    """Gera uma PDP sintética com o tamanho aproximado de uma página real"""
+    filler = "\n".join(
+        f'<div class="grid-item item-{i}"><a href="/p/{i}"><img src="/img/{i}.jpg" alt="Produto relacionado {i}">'
+        f'<span class="title">Produto relacionado {i}</span><span class="value">R$ {100 + i},90</span></a></div>'
+        for i in range(blocks)
+    )
+    return f"""<!DOCTYPE html>
+<html><head>
+<title>Tênis Nike Air Max 90 Masculino</title>
+<meta property="og:title" content="Tênis Nike Air Max 90 Masculino">
+<meta property="og:image" content="https://static.nike.com.br/air-max-90.jpg">
+<script type="application/ld+json">{{"@context":"https://schema.org","@type":"Product","name":"Tênis Nike Air Max 90 Masculino","sku":"CN8490-002","offers":{{"@type":"Offer","price":"799.99","priceCurrency":"BRL","availability":"https://schema.org/InStock"}}}}</script>
+</head><body>
+<nav>{filler[:len(filler) // 3]}</nav>
+<main>
+<h1 data-testid="product-name">Tênis Nike Air Max 90 Masculino</h1>
+<span data-testid="main-price">R$ 799,99</span>
+<img src="/img/air-max-90.jpg" alt="Tênis Nike Air Max 90 Masculino - Foto 1">
+</main>
+<footer>{filler[len(filler) // 3:]}</footer>
+</body></html>""".encode('utf-8')
+
+def legacy_extract(content: bytes, url: str):
+    """Extração como era feita antes da etapa compartilhada (referência do benchmark)"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    def find_text(selectors):
+        for selector in selectors:
+            element = soup.select_one(selector)
+            if element and element.get_text(strip=True):
+                return element.get_text(strip=True)
+        return ""
+
+    name = find_text(NIKE_NAME_SELECTORS)
+    price = find_text(NIKE_PRICE_SELECTORS)
+    img_tag = soup.find('img', {'alt': re.compile(re.escape(name[:20]), re.I)})
+    jsonld = find_jsonld_prices(soup)
+    return name, price, img_tag['src'] if img_tag else "", jsonld
+
+def bench(func, *args, repeat: int = 20) -> float:
+    """Retorna o tempo médio (ms) de uma função"""
+    func(*args)  # aquecimento
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - started) / repeat * 1000
+
+def bench_parse(paths):
+    """Compara a extração legada, a etapa de extração única (DOM) e o caminho estruturado"""
+    print("📄 Benchmark de parsing (ms por página)")
+    pages = [(p, Path(p).read_bytes()) for p in paths] or [('sintética', synthetic_page())]
+    scraper = StaticScraper()
+    url = 'https://www.nike.com.br/produto'
+
+    for label, content in pages:
+        legacy_ms = bench(legacy_extract, content, url)
+        dom_ms = bench(lambda c, u: scraper._scrape_nike_static(extract_document(c, u), u), content, url)
+        fast_ms = bench(scraper.parse_html, content, url)
+        print(f"   {label[:40]:40} {len(content) / 1024:8.0f} KB | legado: {legacy_ms:8.1f} | "
+              f"DOM: {dom_ms:8.1f} | estruturado: {fast_ms:8.2f} | {legacy_ms / fast_ms:7.1f}x")
+
+def load_page(url: str, block: bool, legacy_wait: bool) -> dict:
+    """Carrega uma PDP no navegador e retorna bytes transferidos e tempo até o preço"""
+    from playwright.sync_api import sync_playwright
+    from src.resource_filter import ResourceFilter
+    from src.scraper import DynamicScraper
+
+    scraper = DynamicScraper()
+    resource_filter = ResourceFilter(enabled=block)
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True, args=['--no-sandbox', '--disable-dev-shm-usage'])
+        page = browser.new_page()
+        metrics = resource_filter.install(page, url)
+        try:
+            if legacy_wait:
+                # Comportamento anterior: networkidle + 3 s fixos
+                page.goto(url, wait_until='networkidle', timeout=60000)
+                page.wait_for_timeout(3000)
+                metrics.mark_ready()
+            else:
+                page.goto(url, wait_until='domcontentloaded', timeout=60000)
+                scraper._wait_until_ready(page, url, metrics)
+        finally:
+            browser.close()
+
+    return metrics.to_dict()
+
+def bench_pages(urls):
+    """Compara bytes e tempo até o preço com e sem o filtro de recursos"""
+    print("🌐 Benchmark de páginas dinâmicas")
+    for url in urls:
+        legacy = load_page(url, block=False, legacy_wait=True)
+        filtered = load_page(url, block=True, legacy_wait=False)
+        print(f"   {url[:60]}")
+        print(f"      antes:  {legacy['bytes'] / 1024:8.0f} KB | {legacy['requests']:4} req | "
+              f"pronto em {legacy['time_to_price_ms'] or 0:8.0f} ms")
+        print(f"      depois: {filtered['bytes'] / 1024:8.0f} KB | {filtered['requests']:4} req "
+              f"({filtered['blocked']} bloqueadas) | preço em {filtered['time_to_price_ms'] or 0:8.0f} ms")
+
+def bench_db(products: int, seconds: float):
+    """Latência de leitura do dashboard enquanto um ciclo de atualização grava, por perfil"""
+    from src import database
+    from src.database import DatabaseManager
+
+    print(f"🗄️  Benchmark de concorrência do SQLite ({products} produtos, {seconds:.0f}s por perfil)")
+    # Mede o banco, não o cache de consultas
+    database.query_cache.enabled = False
+
+    for profile in ('legacy', 'wal'):
+        path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+        database.init_database(f'sqlite:///{path}', profile)
+
+        ids = []
+        for i in range(products):
+            product = DatabaseManager.add_product(f'Produto {i}', f'https://loja.com.br/p/{i}', 100.0 + i)
+            ids.append(product.id)
+
+        stop = threading.Event()
+        written = [0]
+
+        def writer():
+            # Simula o ciclo de atualização: lotes de preços gravados continuamente
+            while not stop.is_set():
+                batch = [(pid, round(random.uniform(50, 500), 2), datetime.utcnow())
+                         for pid in random.sample(ids, min(200, len(ids)))]
+                DatabaseManager.apply_price_updates(batch)
+                written[0] += len(batch)
+
+        def reader(latencies):
+            # Mesmas consultas da página inicial do dashboard, a cada 20 ms
+            while not stop.is_set():
+                started = time.perf_counter()
+                DatabaseManager.get_database_stats()
+                DatabaseManager.get_product_by_id(random.choice(ids))
+                latencies.append((time.perf_counter() - started) * 1000)
+                time.sleep(0.02)
+
+        reader_latencies = [[] for _ in range(2)]
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader, args=(lat,)) for lat in reader_latencies]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        latencies = sorted(l for lat in reader_latencies for l in lat)
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        print(f"   {profile:7} | leituras: {len(latencies):6} | p50: {statistics.median(latencies):7.1f} ms | "
+              f"p95: {p95:7.1f} ms | máx: {latencies[-1]:7.1f} ms | preços gravados: {written[0]}")
+
+def legacy_evaluate_alerts(changes):
+    """Avaliação como era feita antes do índice: uma consulta e um teste por alerta (referência)"""
+    from src.database import DatabaseManager
+
+    fired = []
+    for product_id, old_price, new_price, lowest_price in changes:
+        for alert in DatabaseManager.get_active_alerts(product_id):
+            if alert.alert_type == 'static':
+                hit = bool(alert.threshold_price) and new_price <= alert.threshold_price
+            elif alert.alert_type == 'percentage':
+                hit = (bool(alert.percentage_threshold) and old_price > 0
+                       and (old_price - new_price) / old_price * 100 >= alert.percentage_threshold)
+            else:
+                hit = lowest_price is not None and new_price < lowest_price - 0.01
+            if hit:
+                fired.append(alert.id)
+    return fired
+
+def bench_alerts(alerts: int, products: int, changes: int):
+    """Carga do índice de alertas e avaliação de um lote de mudanças (índice x consulta por produto)"""
+    from sqlalchemy import insert
+    from src import database
+    from src.alert_index import AlertIndex
+
+    print(f"🔔 Benchmark de avaliação de alertas ({alerts} alertas, {products} produtos, lote de {changes} mudanças)")
+    database.query_cache.enabled = False
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    database.init_database(f'sqlite:///{path}')
+
+    rng = random.Random(42)
+    db = database.get_db()
+    try:
+        db.execute(insert(database.Product), [
+            {'id': i, 'name': f'Produto {i}', 'url': f'https://loja.com.br/p/{i}', 'current_price': 300.0}
+            for i in range(1, products + 1)
+        ])
+        rows = []
+        for i in range(1, alerts + 1):
+            alert_type = rng.choice(['static', 'percentage', 'lowest_ever'])
+            rows.append({
+                'product_id': rng.randint(1, products), 'chat_id': str(rng.randint(1, 5000)),
+                'alert_type': alert_type, 'active': True,
+                'threshold_price': round(rng.uniform(100, 300), 2) if alert_type == 'static' else None,
+                'percentage_threshold': rng.choice([5, 10, 20, 30]) if alert_type == 'percentage' else None
+            })
+        db.execute(insert(database.Alert), rows)
+        db.commit()
+    finally:
+        db.close()
+
+    batch = []
+    for product_id in rng.sample(range(1, products + 1), min(changes, products)):
+        new_price = round(300.0 * rng.uniform(0.6, 1.05), 2)
+        batch.append((product_id, 300.0, new_price, round(rng.uniform(150, 300), 2)))
+
+    started = time.perf_counter()
+    index = AlertIndex.load()
+    load_ms = (time.perf_counter() - started) * 1000
+
+    indexed_ms = bench(index.evaluate, batch)
+    legacy_ms = bench(legacy_evaluate_alerts, batch, repeat=3)
+    fired = index.evaluate(batch)
+    assert sorted(alert.id for alert, _, _, _ in fired) == sorted(legacy_evaluate_alerts(batch))
+
+    print(f"   carga do índice: {load_ms:8.1f} ms ({index.size} alertas, uma vez por ciclo)")
+    print(f"   por produto:     {legacy_ms:8.1f} ms por lote | índice: {indexed_ms:8.2f} ms por lote | "
+          f"{legacy_ms / indexed_ms:7.1f}x | {len(fired)} alertas disparados")
+
+def simulate_refresh(changes, horizon: float, interval_for):
+    """Coletas de um produto no período: (requisições, atraso de cada mudança detectada)
+
+    changes são os instantes (s) das mudanças de preço; os negativos já estão no histórico.
+    """
+    history = [change for change in changes if change < 0]
+    upcoming = [change for change in changes if change >= 0]
+    requests, lags, position, now = 0, [], 0, 0.0
+    while now < horizon:
+        now += interval_for(now, history)
+        requests += 1
+        while position < len(upcoming) and upcoming[position] <= now:
+            lags.append(now - upcoming[position])
+            history.append(now)  # o histórico registra o instante da coleta
+            position += 1
+    return requests, lags
+
+def bench_cadence(products: int, days: int):
+    """Simulação de requisições por dia e atraso de detecção: intervalo fixo x cadência adaptativa"""
+    from config.settings import Config
+    from src.cadence import CadenceModel, LOOKBACK_HALF_LIVES
+
+    print(f"⏳ Simulação de cadência ({products} produtos, {days} dias)")
+    rng = random.Random(42)
+    model = CadenceModel()
+    horizon = days * 86400
+    lookback = Config.CADENCE_HALF_LIFE_HOURS * 3600 * LOOKBACK_HALF_LIVES
+    # Perfis: (nome, fração dos produtos, mudanças de preço por dia)
+    profiles = [('estáveis', 0.70, 1 / 30), ('moderados', 0.20, 1.0), ('voláteis', 0.10, 12.0)]
+
+    def adaptive(tight_alert):
+        thresholds = [97.0] if tight_alert else []
+        return lambda now, history: model.interval(
+            [now - change for change in history if now - change < lookback], 100.0, thresholds)
+
+    def fixed(now, history):
+        return Config.REFRESH_INTERVAL_SECONDS
+
+    totals = {'fixo': [0, []], 'adaptativo': [0, []]}
+    for name, share, per_day in profiles:
+        count = max(1, int(products * share))
+        rows = {'fixo': [0, []], 'adaptativo': [0, []]}
+        for _ in range(count):
+            changes, moment = [], -lookback
+            while True:
+                moment += rng.expovariate(per_day / 86400)
+                if moment >= horizon:
+                    break
+                changes.append(moment)
+            tight_alert = rng.random() < 0.05  # alerta fixo 3% abaixo do preço atual
+            for label, interval_for in (('fixo', fixed), ('adaptativo', adaptive(tight_alert))):
+                requests, lags = simulate_refresh(changes, horizon, interval_for)
+                rows[label][0] += requests
+                rows[label][1].extend(lags)
+
+        for label, (requests, lags) in rows.items():
+            totals[label][0] += requests
+            totals[label][1].extend(lags)
+            lags.sort()
+            p50 = lags[len(lags) // 2] / 60 if lags else 0.0
+            p95 = lags[int(len(lags) * 0.95) - 1] / 60 if lags else 0.0
+            print(f"   {name:10s} {label:10s} {requests / days:9.0f} req/dia | atraso p50: {p50:6.1f} min | "
+                  f"p95: {p95:6.1f} min | {len(lags)} mudanças")
+
+    fixed_requests, adaptive_requests = totals['fixo'][0], totals['adaptativo'][0]
+    print(f"   total: {fixed_requests / days:.0f} -> {adaptive_requests / days:.0f} req/dia "
+          f"({fixed_requests / adaptive_requests:.1f}x menos requisições)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parse_cmd = subparsers.add_parser('parse', help='Compara a extração de HTML com páginas salvas')
+    parse_cmd.add_argument('pages', nargs='*', help='Arquivos HTML salvos (padrão: página sintética)')
+
+    pages_cmd = subparsers.add_parser('pages', help='Compara o carregamento de PDPs com e sem bloqueio de recursos')
+    pages_cmd.add_argument('urls', nargs='+', help='URLs de páginas de produto (Nike, Adidas...)')
+
+    db_cmd = subparsers.add_parser('db', help='Latência de leitura do dashboard durante gravações (legacy x WAL)')
+    db_cmd.add_argument('--products', type=int, default=500, help='Produtos no banco temporário')
+    db_cmd.add_argument('--seconds', type=float, default=10, help='Duração da medição por perfil')
+
+    alerts_cmd = subparsers.add_parser('alerts', help='Avaliação de alertas com índice em memória x consulta por produto')
+    alerts_cmd.add_argument('--alerts', type=int, default=100000, help='Alertas ativos no banco temporário')
+    alerts_cmd.add_argument('--products', type=int, default=10000, help='Produtos no banco temporário')
+    alerts_cmd.add_argument('--changes', type=int, default=1000, help='Mudanças de preço no lote avaliado')
+
+    cadence_cmd = subparsers.add_parser('cadence', help='Requisições por dia e atraso de detecção: intervalo fixo x adaptativo')
+    cadence_cmd.add_argument('--products', type=int, default=1000, help='Produtos simulados')
+    cadence_cmd.add_argument('--days', type=int, default=7, help='Dias simulados')
+
+    args = parser.parse_args()
+
+    if args.command == 'parse':
+        bench_parse(args.pages)
+    elif args.command == 'pages':
+        bench_pages(args.urls)
+    elif args.command == 'db':
+        bench_db(args.products, args.seconds)
+    elif args.command == 'alerts':
+        bench_alerts(args.alerts, args.products, args.changes)
+    elif args.command == 'cadence':
+        bench_cadence(args.products, args.days)
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,42 @@ class Config:
     # Configurações do banco de dados
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///data/price_monitor.db')
     
+    # Perfil de armazenamento do SQLite (PRAGMAs aplicados em cada conexão)
+    # 'wal': leituras não bloqueiam durante a gravação dos ciclos de atualização
+    # 'legacy': journal de rollback padrão do SQLite
+    DB_PROFILE = os.getenv('DB_PROFILE', 'wal')
+    DB_PROFILES = {
+        'wal': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'cache_size': -65536,       # KiB (negativo): 64 MB de cache de páginas
+            'mmap_size': 268435456,     # 256 MB mapeados em memória
+            'busy_timeout': 10000,      # ms aguardando um lock antes de falhar
+            'temp_store': 'MEMORY',
+        },
+        'legacy': {
+            'journal_mode': 'DELETE',
+            'synchronous': 'FULL',
+            'busy_timeout': 5000,
+        },
+    }
+    # Conexões mantidas pelo pool (agendador, bot do Telegram e threads do Flask)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = 30
+    # Cache em memória das consultas de produto e estatísticas (invalidado nas gravações)
+    DB_CACHE_ENABLED = os.getenv('DB_CACHE_ENABLED', 'True').lower() == 'true'
+    DB_CACHE_TTL = int(os.getenv('DB_CACHE_TTL', 30))
+    DB_CACHE_MAX_ENTRIES = int(os.getenv('DB_CACHE_MAX_ENTRIES', 2048))
+    
+    # Retenção do histórico de preços: registros brutos por N dias, depois
+    # agregados em buckets OHLC por hora e, mais tarde, por dia
+    HISTORY_RAW_RETENTION_DAYS = int(os.getenv('HISTORY_RAW_RETENTION_DAYS', 30))
+    HISTORY_HOURLY_RETENTION_DAYS = int(os.getenv('HISTORY_HOURLY_RETENTION_DAYS', 180))
+    # Pontos máximos de um gráfico de histórico (escolhe a resolução pelo período)
+    HISTORY_MAX_POINTS = int(os.getenv('HISTORY_MAX_POINTS', 300))
+    HISTORY_ROLLUP_TIME = os.getenv('HISTORY_ROLLUP_TIME', '03:30')
+
     # Configurações de scraping
     USER_AGENTS = [
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -21,7 +57,118 @@ class Config:
     # Configurações de delay entre requisições (em segundos)
     MIN_DELAY = 2
     MAX_DELAY = 5
-    
+
+    # Configurações do pool de navegadores (Playwright)
+    # Número de navegadores mantidos abertos por tipo (chromium, firefox, webkit)
+    BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 2))
+    # Recicla o navegador depois de servir este número de páginas
+    BROWSER_MAX_PAGES = int(os.getenv('BROWSER_MAX_PAGES', 50))
+    # Tipos de navegador iniciados antecipadamente (separados por vírgula, vazio desativa)
+    BROWSER_POOL_WARMUP = [
+        b.strip() for b in os.getenv('BROWSER_POOL_WARMUP', '').split(',') if b.strip()
+    ]
+    # Tempo máximo (em segundos) aguardando uma página do pool
+    BROWSER_TASK_TIMEOUT = int(os.getenv('BROWSER_TASK_TIMEOUT', 90))
+
+    # Filtro de recursos das páginas dinâmicas: aborta o que o scraper não usa
+    BLOCK_RESOURCES_ENABLED = os.getenv('BLOCK_RESOURCES_ENABLED', 'True').lower() == 'true'
+    BLOCKED_RESOURCE_TYPES = [
+        t.strip() for t in os.getenv('BLOCKED_RESOURCE_TYPES', 'image,media,font').split(',') if t.strip()
+    ]
+    # Rastreadores e analytics de terceiros (o domínio e seus subdomínios)
+    BLOCKED_HOSTS = [
+        'google-analytics.com',
+        'googletagmanager.com',
+        'doubleclick.net',
+        'googleadservices.com',
+        'facebook.net',
+        'facebook.com',
+        'hotjar.com',
+        'clarity.ms',
+        'tiktok.com',
+        'criteo.com',
+        'criteo.net',
+        'newrelic.com',
+        'nr-data.net',
+        'optimizely.com',
+        'bing.com',
+    ]
+    # Regras por domínio da página: 'allow' libera e 'deny' bloqueia tipos de
+    # recurso ('image', 'script', ...) ou domínios. Ex.:
+    # 'loja.com.br': {'allow': ['image'], 'deny': ['stylesheet', 'chat.loja.com.br']}
+    RESOURCE_RULES = {
+        'nike.com.br': {'deny': ['stylesheet']},
+        'adidas.com.br': {'deny': ['stylesheet']},
+    }
+    # Tempo máximo (em ms) aguardando o preço ou o JSON-LD aparecer
+    PAGE_READY_TIMEOUT = int(os.getenv('PAGE_READY_TIMEOUT', 10000))
+
+    # Configurações do ciclo de atualização de preços
+    # Número máximo de produtos atualizados em paralelo
+    REFRESH_MAX_WORKERS = int(os.getenv('REFRESH_MAX_WORKERS', 8))
+    # Requisições simultâneas permitidas por domínio (politeness), no formato
+    # "dominio:limite" separado por vírgula; vale também para os subdomínios. Entre
+    # duas requisições ao mesmo domínio aguarda-se de MIN_DELAY a MAX_DELAY segundos.
+    DOMAIN_CONCURRENCY = {
+        domain.strip().lower(): int(limit)
+        for domain, _, limit in (
+            item.partition(':') for item in os.getenv(
+                'DOMAIN_CONCURRENCY', 'nike.com.br:2,adidas.com.br:2,netshoes.com.br:2,dafiti.com.br:2'
+            ).split(',')
+        )
+        if domain.strip() and limit.strip()
+    }
+    DEFAULT_DOMAIN_CONCURRENCY = int(os.getenv('DEFAULT_DOMAIN_CONCURRENCY', 1))
+    # Preços coletados são gravados em lotes deste tamanho (uma transação por lote)
+    PRICE_WRITE_BATCH_SIZE = int(os.getenv('PRICE_WRITE_BATCH_SIZE', 50))
+
+    # Agendador: cada produto tem o seu próximo horário de atualização
+    # Intervalo padrão entre atualizações de um produto (cada produto pode definir o seu)
+    REFRESH_INTERVAL_SECONDS = int(os.getenv('REFRESH_INTERVAL_SECONDS', 1800))
+    SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', 4))
+    SCHEDULER_BATCH_WINDOW = 30    # produtos que vencem dentro desta janela (s) vão no mesmo lote
+    SCHEDULER_LATE_SECONDS = 120   # início com atraso maior que este conta como prazo perdido
+    SCHEDULER_SYNC_SECONDS = 300   # releitura da agenda (produtos novos, removidos e intervalos alterados)
+    # Cadência adaptativa: produtos cujo preço muda com frequência (ou com alerta fixo logo abaixo
+    # do preço atual) são atualizados mais vezes; os estáveis, menos. Piso e teto em segundos.
+    CADENCE_ENABLED = os.getenv('CADENCE_ENABLED', 'True').lower() == 'true'
+    CADENCE_MIN_SECONDS = int(os.getenv('CADENCE_MIN_SECONDS', 300))
+    CADENCE_MAX_SECONDS = int(os.getenv('CADENCE_MAX_SECONDS', 21600))
+    CADENCE_HALF_LIFE_HOURS = 48     # o peso de uma mudança de preço cai pela metade a cada 48h
+    CADENCE_BURST_HALF_LIFE_HOURS = 6  # escala curta: reage a rajadas de mudanças (lançamentos, liquidações)
+    CADENCE_CHANGE_FRACTION = 0.25   # intervalo = fração do tempo médio estimado entre mudanças
+    CADENCE_ALERT_PROXIMITY = 0.05   # alertas fixos até 5% abaixo do preço atual aceleram a cadência
+
+    # Listagens de promoções (Nike Ofertas, Adidas Outlet) percorridas periodicamente
+    LISTING_CRAWL_ENABLED = os.getenv('LISTING_CRAWL_ENABLED', 'True').lower() == 'true'
+    LISTING_CRAWL_INTERVAL = int(os.getenv('LISTING_CRAWL_INTERVAL', 1800))
+    # Limite de páginas por listagem (Nike: 60 produtos por página, Adidas: 48)
+    LISTING_MAX_PAGES = int(os.getenv('LISTING_MAX_PAGES', 30))
+
+    # Configurações do cliente HTTP assíncrono (httpx) usado no scraping estático
+    ASYNC_FETCH_ENABLED = os.getenv('ASYNC_FETCH_ENABLED', 'True').lower() == 'true'
+    # HTTP/2 requer o pacote opcional 'h2' (pip install httpx[http2])
+    HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'False').lower() == 'true'
+    # Limite global de requisições em andamento (o limite por domínio é DOMAIN_CONCURRENCY)
+    HTTP_MAX_IN_FLIGHT = int(os.getenv('HTTP_MAX_IN_FLIGHT', 20))
+    HTTP_KEEPALIVE_CONNECTIONS = int(os.getenv('HTTP_KEEPALIVE_CONNECTIONS', 10))
+    HTTP_TIMEOUT = 30
+
+    # Cache de GET condicional (ETag / Last-Modified + hash do conteúdo)
+    HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'True').lower() == 'true'
+    HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', 'data/http_cache')
+
+    # Roteamento adaptativo estático x dinâmico (estatísticas por domínio e padrão de URL)
+    ROUTING_STATS_FILE = os.getenv('ROUTING_STATS_FILE', 'data/routing_stats.json')
+    # Tentativas mínimas antes de confiar nas estatísticas de uma rota
+    ROUTING_MIN_SAMPLES = int(os.getenv('ROUTING_MIN_SAMPLES', 5))
+    # Taxa mínima de sucesso do estático quando ainda não há medição do navegador
+    ROUTING_MIN_SUCCESS_RATE = float(os.getenv('ROUTING_MIN_SUCCESS_RATE', 0.5))
+    # Fração das requisições que volta a tentar o estático em rotas marcadas como dinâmicas
+    ROUTING_EXPLORE_RATE = float(os.getenv('ROUTING_EXPLORE_RATE', 0.05))
+    ROUTING_WINDOW = 50
+    ROUTING_SAVE_INTERVAL = 30
+
     # Configurações de logging
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = 'logs/price_monitor.log'
@@ -30,6 +177,23 @@ class Config:
     FLASK_HOST = '0.0.0.0'
     FLASK_PORT = int(os.getenv('FLASK_PORT', 5000))
     FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
+    # Paginação das APIs JSON (itens por página)
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+    API_MAX_PAGE_SIZE = 500
+    # Compressão das respostas (gzip sempre; brotli se o pacote estiver instalado)
+    RESPONSE_COMPRESSION_ENABLED = os.getenv('RESPONSE_COMPRESSION_ENABLED', 'True').lower() == 'true'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5
+    # Eventos ao vivo (SSE em /api/events)
+    SSE_MAX_CLIENTS = int(os.getenv('SSE_MAX_CLIENTS', 50))
+    SSE_KEEPALIVE_SECONDS = 15
+    SSE_RETRY_MS = 5000
+    EVENTS_QUEUE_SIZE = 500      # eventos pendentes por cliente antes de pedir ressincronização
+    EVENTS_HISTORY_SIZE = 1000   # eventos recentes reenviados na reconexão (Last-Event-ID)
+    # Fila de atualizações manuais (web e /update do bot)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+    JOB_HISTORY_SIZE = 500       # jobs concluídos mantidos para consulta em /api/jobs/<id>
     
     # Configurações de alertas
     ALERT_TYPES = {
@@ -37,4 +201,17 @@ class Config:
         'percentage': 'Queda percentual',
         'lowest_ever': 'Novo mínimo histórico'
     }
+    # Intervalo mínimo entre disparos de um mesmo alerta (cada alerta pode definir o seu)
+    ALERT_THROTTLE_SECONDS = int(os.getenv('ALERT_THROTTLE_SECONDS', 3600))
+    
+    # Fila de notificações do Telegram (limites em mensagens/s globais e segundos entre mensagens ao mesmo chat)
+    TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 25))
+    TELEGRAM_CHAT_INTERVAL = float(os.getenv('TELEGRAM_CHAT_INTERVAL', 1.0))
+    NOTIFY_DIGEST_DELAY_SECONDS = int(os.getenv('NOTIFY_DIGEST_DELAY_SECONDS', 10))  # agrupa alertas do mesmo ciclo
+    NOTIFY_DIGEST_MAX_ITEMS = 15   # alertas listados num digest (o resto vira "e mais N")
+    NOTIFY_BATCH_SIZE = 500        # notificações lidas da fila por rodada
+    NOTIFY_POLL_SECONDS = 5
+    NOTIFY_MAX_ATTEMPTS = 5
+    NOTIFY_RETRY_BASE_SECONDS = 30  # backoff: 30s, 60s, 120s...
+    NOTIFY_RETENTION_DAYS = 7
 
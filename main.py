@@ -18,6 +18,9 @@ from config.settings import Config
 from src.database import init_database
 from src.telegram_bot import init_telegram_bot, get_telegram_bot
 from src.alert_manager import init_alert_manager, get_alert_manager
+from src.browser_pool import init_browser_pool, get_browser_pool
+from src.http_fetcher import get_http_fetcher
+from src.routing import get_scrape_router
 from web.app import create_app
 
 def setup_logging():
@@ -46,6 +49,24 @@ def signal_handler(signum, frame):
     except:
         pass
     
+    # Fecha os navegadores mantidos abertos pelo pool
+    try:
+        get_browser_pool().shutdown()
+    except:
+        pass
+    
+    # Fecha as conexões do cliente HTTP assíncrono
+    try:
+        get_http_fetcher().shutdown()
+    except:
+        pass
+    
+    # Persiste as estatísticas de roteamento estático x dinâmico
+    try:
+        get_scrape_router().save()
+    except:
+        pass
+    
     print("\n👋 Bot finalizado!")
     sys.exit(0)
 
@@ -92,6 +113,14 @@ def main():
             print("⚠️  Bot do Telegram não configurado (token não fornecido)")
             print("   Para habilitar, configure TELEGRAM_BOT_TOKEN no arquivo .env")
         
+        # Inicializa o pool de navegadores (aquecimento opcional)
+        if Config.BROWSER_POOL_WARMUP:
+            logger.info("Aquecendo pool de navegadores...")
+            if init_browser_pool():
+                print(f"✅ Pool de navegadores aquecido ({', '.join(Config.BROWSER_POOL_WARMUP)})")
+            else:
+                print("⚠️  Erro ao aquecer pool de navegadores")
+        
         # Inicializa o gerenciador de alertas
         logger.info("Iniciando gerenciador de alertas...")
         alert_success = init_alert_manager()
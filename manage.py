@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Comandos de manutenção do Bot de Monitoramento de Preços
+
+Uso:
+    python manage.py backfill-stats [--product ID ...]
+    python manage.py rollup-history
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Adiciona o diretório src ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.database import init_database, DatabaseManager
+from src.history import get_history_manager
+
+def backfill_stats(product_ids):
+    """Reconstrói a tabela product_price_stats a partir do histórico de preços"""
+    print("📊 Reconstruindo estatísticas de preço...")
+    count = DatabaseManager.rebuild_price_stats(product_ids or None)
+    print(f"✅ Estatísticas reconstruídas para {count} produtos")
+
+def rollup_history():
+    """Agrega o histórico antigo em buckets por hora/dia conforme a retenção configurada"""
+    print("🗜️ Agregando histórico de preços...")
+    stats = get_history_manager().rollup()
+    if not stats:
+        print("❌ Falha no rollup do histórico (veja o log)")
+        return
+    print(f"✅ {stats['raw_rolled']} registros brutos -> {stats['hour_buckets']} buckets por hora")
+    print(f"✅ {stats['hour_rolled']} buckets por hora -> {stats['day_buckets']} buckets por dia")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stats_cmd = subparsers.add_parser('backfill-stats', help='Reconstrói product_price_stats a partir do histórico')
+    stats_cmd.add_argument('--product', type=int, action='append', dest='product_ids',
+                           help='Limita a um produto (pode ser repetido)')
+
+    subparsers.add_parser('rollup-history', help='Agrega o histórico antigo em buckets OHLC por hora/dia')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    init_database()
+
+    if args.command == 'backfill-stats':
+        backfill_stats(args.product_ids)
+    elif args.command == 'rollup-history':
+        rollup_history()
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,39 @@
 import requests
 from bs4 import BeautifulSoup
+from urllib.parse import urljoin
 
+from scraper_utils import brl_to_float
 
-def buscar_promocoes_adidas():
-    url = 'https://www.adidas.com.br/outlet'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+URL_OUTLET = 'https://www.adidas.com.br/outlet'
+PRODUTOS_POR_PAGINA = 48
+
+
+def url_pagina_adidas(pagina: int) -> str:
+    """URL da página N (1, 2, ...) do Outlet (paginação por deslocamento 'start')"""
+    if pagina <= 1:
+        return URL_OUTLET
+    return f'{URL_OUTLET}?start={(pagina - 1) * PRODUTOS_POR_PAGINA}'
+
+
+def parse_promocoes_adidas(html, base_url: str = URL_OUTLET):
+    """Extrai nome, preço e URL de cada produto de uma página do Outlet"""
+    soup = BeautifulSoup(html, 'html.parser')
     promocoes = []
     for produto in soup.select('.product-card'):
         nome = produto.select_one('.product-card__title')
         preco = produto.select_one('.product-card__price--sale')
+        link = produto.select_one('a[href]') or produto.find_parent('a', href=True)
         if nome and preco:
             promocoes.append({
                 'nome': nome.text.strip(),
                 'preco': preco.text.strip(),
+                'preco_valor': brl_to_float(preco.text),
+                'url': urljoin(base_url, link['href']) if link else None,
             })
-    return promocoes 
\ No newline at end of file
+    return promocoes
+
+
+def buscar_promocoes_adidas(pagina: int = 1):
+    url = url_pagina_adidas(pagina)
+    response = requests.get(url)
+    return parse_promocoes_adidas(response.text, url)
@@ -1,6 +1,6 @@
-from bs4 import BeautifulSoup
 import re
-from .utils import brl_to_float, find_jsonld_prices, choose_price
+from scraper_utils import brl_to_float, choose_price
+from src.extraction import extract_document
 
 def _safe_float_dot(s: str) -> float | None:
     try:
@@ -8,29 +8,28 @@ def _safe_float_dot(s: str) -> float | None:
     except Exception:
         return None
 
-def parse_dafiti(html: str, url: str, prefer_price: str = "lowest") -> dict:
-    soup = BeautifulSoup(html, 'lxml')
+def parse_dafiti(html, url: str, prefer_price: str = "lowest") -> dict:
+    # Parse único (aceita HTML ou um documento já extraído)
+    doc = extract_document(html, url)
 
     # ===== Nome / Marca / Seller =====
     name = None
     for sel in ['h1.product-name[itemprop="name"]', 'h1[itemprop="name"]', 'h1.product-name', 'h1']:
-        h1 = soup.select_one(sel)
+        h1 = doc.select_one(sel)
         if h1 and h1.get_text(strip=True):
             name = h1.get_text(strip=True)
             break
     if not name:
-        mt = soup.find('meta', property='og:title')
-        if mt and mt.get('content'):
-            name = mt['content']
+        name = doc.meta.get('og:title')
 
     brand = None
-    a_brand = soup.select_one('.product-brand a[title], a[itemprop="brand"]')
+    a_brand = doc.select_one('.product-brand a[title], a[itemprop="brand"]')
     if a_brand:
         brand = a_brand.get_text(strip=True)
 
     seller = None
     # Ex.: <p class="product-seller-name"> Vendido e entregue por <a>...</a>
-    seller_wrap = soup.select_one('.product-seller-name')
+    seller_wrap = doc.select_one('.product-seller-name')
     if seller_wrap:
         a = seller_wrap.find('a')
         if a:
@@ -42,7 +41,7 @@ def parse_dafiti(html: str, url: str, prefer_price: str = "lowest") -> dict:
     availability = None
 
     # Preço atual (finalPrice)
-    el_final = soup.select_one('.catalog-detail-price .catalog-detail-price-value[data-field="finalPrice"]')
+    el_final = doc.select_one('.catalog-detail-price .catalog-detail-price-value[data-field="finalPrice"]')
     price_current = None
     if el_final:
         # 1) atributo content=329.99 (mais confiável)
@@ -55,13 +54,13 @@ def parse_dafiti(html: str, url: str, prefer_price: str = "lowest") -> dict:
             candidates.append((price_current, "current"))
 
     # Preço cheio (specialPrice) – útil para mostrar economia
-    el_special = soup.select_one('.catalog-detail-price .catalog-detail-price-special[data-field="specialPrice"]')
+    el_special = doc.select_one('.catalog-detail-price .catalog-detail-price-special[data-field="specialPrice"]')
     price_original = None
     if el_special:
         price_original = brl_to_float(el_special.get_text(" ", strip=True))
 
     # % de desconto (quando existe)
-    el_disc = soup.select_one('.catalog-detail-price .catalog-detail-price-discount')
+    el_disc = doc.select_one('.catalog-detail-price .catalog-detail-price-discount')
     discount_percent = None
     if el_disc:
         # Ex.: "-49%"
@@ -73,24 +72,25 @@ def parse_dafiti(html: str, url: str, prefer_price: str = "lowest") -> dict:
                 pass
 
     # Moeda / disponibilidade via microdados
-    mt_cur = soup.select_one('meta[itemprop="priceCurrency"]')
-    if mt_cur and mt_cur.get('content'):
-        currency = mt_cur['content']
+    # (coletados na mesma passada do parse)
+    mt_cur = doc.microdata_value('priceCurrency')
+    if mt_cur:
+        currency = mt_cur
 
-    mt_av = soup.select_one('meta[itemprop="availability"]')
-    if mt_av and mt_av.get('content'):
-        availability = mt_av['content']  # ex.: https://schema.org/InStock
+    mt_av = doc.microdata_value('availability')
+    if mt_av:
+        availability = mt_av  # ex.: https://schema.org/InStock
 
     # Mensagem de esgotado como override (quando aparece no SSR)
-    stock_msg = soup.select_one('#stock-available .stock-available-message')
+    stock_msg = doc.select_one('#stock-available .stock-available-message')
     if stock_msg and 'esgotad' in stock_msg.get_text(strip=True).lower():
         availability = 'https://schema.org/OutOfStock'
 
     # ===== Parcelamento (opcional) =====
     installments_count = None
     installments_value = None
-    inst_count_el = soup.select_one('.catalog-detail-price-installment [data-field="installments-count"]')
-    inst_val_el = soup.select_one('.catalog-detail-price-installment [data-field="installments-value"]')
+    inst_count_el = doc.select_one('.catalog-detail-price-installment [data-field="installments-count"]')
+    inst_val_el = doc.select_one('.catalog-detail-price-installment [data-field="installments-value"]')
     if inst_count_el:
         # "5x" -> 5
         m = re.search(r'(\d+)', inst_count_el.get_text())
@@ -104,7 +104,7 @@ def parse_dafiti(html: str, url: str, prefer_price: str = "lowest") -> dict:
 
     # ===== JSON-LD como segunda fonte =====
     if not candidates:
-        jsonld_prices, currency_ld, availability_ld = find_jsonld_prices(soup)
+        jsonld_prices, currency_ld, availability_ld = doc.jsonld_prices()
         if currency_ld:
             currency = currency_ld
         if availability_ld:
@@ -117,11 +117,8 @@ def parse_dafiti(html: str, url: str, prefer_price: str = "lowest") -> dict:
 
     # ===== Fallback por regex no texto todo =====
     if not candidates:
-        txt = soup.get_text(" ", strip=True)
-        for m in re.finditer(r'R\$\s*\d{1,3}(?:\.\d{3})*,\d{2}', txt):
-            v = brl_to_float(m.group(0))
-            if v is not None:
-                candidates.append((v, "other"))
+        for v, _ in doc.brl_values:
+            candidates.append((v, "other"))
 
     # ===== Decisão do preço =====
     price_value, price_tag = choose_price(candidates, prefer=prefer_price)
@@ -1,29 +1,28 @@
 # src/scrapers/netshoes.py
-from bs4 import BeautifulSoup
-from .utils import brl_to_float, find_jsonld_prices, choose_price, extract_all_brl
+from scraper_utils import BRL_RE, brl_to_float, choose_price
+from src.extraction import extract_document
 import re
 
 PIX_TOKEN_RE   = re.compile(r'\bno\s*pix\b', re.IGNORECASE)
 CARD_TOKEN_RE  = re.compile(r'\bou\s*R\$\s*\d', re.IGNORECASE)  # linha do "ou R$ ... em até ..."
 PARCEL_RE      = re.compile(r'\bem\s+at[eé]\b', re.IGNORECASE)
 
-def parse_netshoes(html: str, url: str, prefer_price: str = "lowest") -> dict:
-    soup = BeautifulSoup(html, 'lxml')
+def parse_netshoes(html, url: str, prefer_price: str = "lowest") -> dict:
+    # Parse único (aceita HTML ou um documento já extraído)
+    doc = extract_document(html, url)
 
     # 1) Nome
     name = None
-    h1 = soup.select_one('h1.product-name')
+    h1 = doc.select_one('h1.product-name')
     if h1:
         name = h1.get_text(strip=True)
     if not name:
         # fallback em meta tags
-        mt = soup.find('meta', property='og:title')
-        if mt and mt.get('content'):
-            name = mt['content']
+        name = doc.meta.get('og:title')
 
     # 2) JSON-LD primeiro (quando existe)
     candidates = []
-    jsonld_prices, currency, availability = find_jsonld_prices(soup)
+    jsonld_prices, currency, availability = doc.jsonld_prices()
     for p in jsonld_prices:
         candidates.append( (float(p), "current") )
 
@@ -31,15 +30,16 @@ def parse_netshoes(html: str, url: str, prefer_price: str = "lowest") -> dict:
     #    Pegamos o bloco "buy box" (quando existir), senão varremos a página inteira
     container = None
     # Muitas PDPs usam blocos como ".buy-box", ".price-info" etc — mantenho alguns fallbacks
-    for sel in ['.buy-box', '.product-price', '.price', '.showcase__description', 'body']:
-        container = soup.select_one(sel)
+    for sel in ['.buy-box', '.product-price', '.price', '.showcase__description']:
+        container = doc.select_one(sel)
         if container:
             break
 
     if container:
         txt = container.get_text(" ", strip=True)
     else:
-        txt = soup.get_text(" ", strip=True)
+        # Texto completo calculado uma única vez pela etapa de extração
+        txt = doc.text
 
     # Exemplo do seu log:
     # "R$ 599,99R$ 512,99 no Pix ou R$ 539,99 em até 7x"
@@ -48,7 +48,7 @@ def parse_netshoes(html: str, url: str, prefer_price: str = "lowest") -> dict:
     # - Perto de "ou R$ ... em até" → card
     # Se não der, todos vão como "other"
     # Dica: mapeamos o offset do match pra decidir a que trecho pertence
-    spans = [(m.start(), m.end(), brl_to_float(m.group(0))) for m in re.finditer(r'R\$\s*\d{1,3}(\.\d{3})*,\d{2}', txt)]
+    spans = [(m.start(), m.end(), brl_to_float(m.group(0))) for m in BRL_RE.finditer(txt)]
     for start, end, val in spans:
         tag = "other"
         # janela de contexto à direita/esquerda
@@ -1,18 +1,38 @@
 import requests
 from bs4 import BeautifulSoup
+from urllib.parse import urljoin
 
+from scraper_utils import brl_to_float
 
-def buscar_promocoes_nike():
-    url = 'https://www.nike.com.br/Ofertas?ps=60'
-    response = requests.get(url)
-    soup = BeautifulSoup(response.text, 'html.parser')
+URL_OFERTAS = 'https://www.nike.com.br/Ofertas?ps=60'
+
+
+def url_pagina_nike(pagina: int) -> str:
+    """URL da página N (1, 2, ...) da listagem de Ofertas (60 produtos por página)"""
+    return f'{URL_OFERTAS}&page={pagina}'
+
+
+def parse_promocoes_nike(html, base_url: str = URL_OFERTAS):
+    """Extrai nome, preço e URL de cada produto de uma página de Ofertas"""
+    soup = BeautifulSoup(html, 'html.parser')
     promocoes = []
     for produto in soup.select('.produto__info'):
         nome = produto.select_one('.produto__nome-produto')
         preco = produto.select_one('.produto__preco')
+        link = produto.find_parent('a', href=True) or produto.select_one('a[href]')
+        if link is None and produto.parent is not None:
+            link = produto.parent.select_one('a[href]')
         if nome and preco:
             promocoes.append({
                 'nome': nome.text.strip(),
                 'preco': preco.text.strip(),
+                'preco_valor': brl_to_float(preco.text),
+                'url': urljoin(base_url, link['href']) if link else None,
             })
-    return promocoes 
\ No newline at end of file
+    return promocoes
+
+
+def buscar_promocoes_nike(pagina: int = 1):
+    url = url_pagina_nike(pagina)
+    response = requests.get(url)
+    return parse_promocoes_nike(response.text, url)
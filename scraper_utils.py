@@ -17,11 +17,17 @@ def brl_to_float(txt: str) -> float:
 
 def find_jsonld_prices(soup: BeautifulSoup):
     """Procura Product/Offer em JSON-LD."""
+    return parse_jsonld_prices(
+        tag.string or tag.text or '' for tag in soup.select('script[type="application/ld+json"]')
+    )
+
+def parse_jsonld_prices(texts):
+    """Procura Product/Offer nos textos de scripts JSON-LD já extraídos."""
     prices = []
     currency = None
     availability = None
-    for tag in soup.select('script[type="application/ld+json"]'):
-        txt = (tag.string or tag.text or '').strip()
+    for txt in texts:
+        txt = (txt or '').strip()
         if not txt:
             continue
         # Algumas páginas têm múltiplos JSONs concatenados
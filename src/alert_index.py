@@ -0,0 +1,117 @@
+"""
+Índice em memória dos alertas ativos
+Carregado uma vez por ciclo: limites fixos e percentuais ordenados por produto
+e a lista de quem acompanha o mínimo histórico. Avaliar um lote de mudanças de
+preço custa uma busca binária por produto alterado, não uma consulta por alerta.
+"""
+
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Margem para evitar alertas de mínimo histórico por diferenças de centavos
+LOWEST_EVER_MARGIN = 0.01
+
+# Campos do alerta usados na avaliação, no throttling e na notificação (compatível com o modelo Alert)
+AlertEntry = namedtuple('AlertEntry', 'id product_id chat_id alert_type threshold_price percentage_threshold throttle_seconds',
+                        defaults=(None,))
+
+# Mudança de preço: (produto, preço anterior, preço novo, menor preço antes da mudança)
+PriceChange = Tuple[int, float, float, Optional[float]]
+
+# Alerta disparado: (alerta, produto, preço anterior, preço novo)
+FiredAlert = Tuple[AlertEntry, int, float, float]
+
+class _SortedThresholds:
+    """Limites de um produto em ordem crescente, com os alertas na mesma ordem"""
+
+    __slots__ = ('values', 'alerts')
+
+    def __init__(self, pairs: List[Tuple[float, AlertEntry]]):
+        pairs.sort(key=lambda pair: pair[0])
+        self.values = [value for value, _ in pairs]
+        self.alerts = [alert for _, alert in pairs]
+
+class AlertIndex:
+    """Alertas ativos indexados por produto e tipo"""
+
+    def __init__(self, alerts: Iterable[AlertEntry] = ()):
+        static: Dict[int, List[Tuple[float, AlertEntry]]] = {}
+        percentage: Dict[int, List[Tuple[float, AlertEntry]]] = {}
+        self.lowest_ever: Dict[int, List[AlertEntry]] = {}
+        self.size = 0
+
+        for alert in alerts:
+            # Limites vazios ou zerados nunca disparam (mesma regra da avaliação por alerta)
+            if alert.alert_type == 'static' and alert.threshold_price:
+                static.setdefault(alert.product_id, []).append((alert.threshold_price, alert))
+            elif alert.alert_type == 'percentage' and alert.percentage_threshold:
+                percentage.setdefault(alert.product_id, []).append((alert.percentage_threshold, alert))
+            elif alert.alert_type == 'lowest_ever':
+                self.lowest_ever.setdefault(alert.product_id, []).append(alert)
+            else:
+                continue
+            self.size += 1
+
+        self.static = {product_id: _SortedThresholds(pairs) for product_id, pairs in static.items()}
+        self.percentage = {product_id: _SortedThresholds(pairs) for product_id, pairs in percentage.items()}
+        self.load_seconds = 0.0
+
+    @classmethod
+    def load(cls, product_ids: Sequence[int] = None) -> 'AlertIndex':
+        """Carrega os alertas ativos (todos ou só dos produtos informados) com uma leitura em lote"""
+        started = time.monotonic()
+        index = cls(AlertEntry(*row) for row in DatabaseManager.get_alert_entries(product_ids))
+        index.load_seconds = time.monotonic() - started
+        if product_ids is None:
+            logger.debug(f"Índice de alertas carregado: {index.size} alertas em {index.load_seconds * 1000:.0f} ms")
+        return index
+
+    def watches_lowest(self, product_id: int) -> bool:
+        """Se algum alerta acompanha o mínimo histórico do produto"""
+        return product_id in self.lowest_ever
+
+    def match(self, product_id: int, old_price: float, new_price: float,
+              lowest_price: Optional[float] = None) -> List[AlertEntry]:
+        """Alertas do produto cujas condições são atendidas pela mudança de preço"""
+        matched = []
+
+        # Preço fixo: dispara todo limite >= preço atual
+        thresholds = self.static.get(product_id)
+        if thresholds:
+            matched.extend(thresholds.alerts[bisect_left(thresholds.values, new_price):])
+
+        # Queda percentual: dispara todo limite <= queda observada
+        thresholds = self.percentage.get(product_id)
+        if thresholds and old_price and old_price > 0:
+            drop_percent = ((old_price - new_price) / old_price) * 100
+            matched.extend(thresholds.alerts[:bisect_right(thresholds.values, drop_percent)])
+
+        # Mínimo histórico: todos os interessados ou nenhum
+        watchers = self.lowest_ever.get(product_id)
+        if watchers and lowest_price is not None and new_price < lowest_price - LOWEST_EVER_MARGIN:
+            matched.extend(watchers)
+
+        return matched
+
+    def evaluate(self, changes: Iterable[PriceChange]) -> List[FiredAlert]:
+        """Todos os alertas disparados por um lote de mudanças de preço"""
+        fired = []
+        for product_id, old_price, new_price, lowest_price in changes:
+            fired.extend((alert, product_id, old_price, new_price)
+                         for alert in self.match(product_id, old_price, new_price, lowest_price))
+        return fired
+
+    def get_stats(self) -> Dict[str, float]:
+        """Tamanho do índice e tempo de carga"""
+        return {
+            'alerts': self.size,
+            'products': len(set(self.static) | set(self.percentage) | set(self.lowest_ever)),
+            'load_ms': round(self.load_seconds * 1000, 1)
+        }
@@ -4,15 +4,24 @@ Detecta quedas de preço e envia notificações
 """
 
 import logging
-import asyncio
-import schedule
 import time
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 from typing import List, Dict, Optional, Tuple
-from threading import Thread
+from threading import Lock
 
 from src.database import DatabaseManager
 from src.scraper import ScraperManager
+from src.refresh import RefreshEngine
+from src.listing_crawler import ListingCrawler
+from src.http_cache import HttpCache
+from src.resource_filter import get_resource_filter
+from src.history import get_history_manager
+from src.events import get_event_bus
+from src.alert_index import AlertIndex
+from src.alert_throttle import AlertThrottle
+from src.jobs import get_job_queue
+from src.scheduler import get_scheduler
+from src.cadence import get_cadence_model
 from src.telegram_bot import get_telegram_bot
 from config.settings import Config
 
@@ -25,11 +34,26 @@ class AlertManager:
         self.scraper_manager = ScraperManager()
         self.telegram_bot = get_telegram_bot()
         self.is_running = False
-        self.scheduler_thread = None
+        # Agenda orientada a eventos: cada produto tem o seu próximo horário
+        self.scheduler = get_scheduler()
+        # Intervalo de cada produto conforme a volatilidade do preço e os alertas próximos
+        self.cadence = get_cadence_model()
         
-        # Configurações de throttling
-        self.last_alert_times = {}  # Para evitar spam de alertas
-        self.min_alert_interval = 3600  # 1 hora entre alertas do mesmo tipo
+        # Atualização concorrente com limites por domínio
+        self.refresh_engine = RefreshEngine()
+        # Listagens de promoções: atualizam em lote os produtos encontrados nelas
+        self.listing_crawler = ListingCrawler(self.scraper_manager.static_scraper)
+        # Retenção do histórico (rollup diário em buckets por hora/dia)
+        self.history_manager = get_history_manager()
+        self._cycle_lock = Lock()  # Impede que dois ciclos se sobreponham
+        self._pending_lock = Lock()
+        self._write_lock = Lock()
+        self.last_cycle_stats = {}
+        self.last_listing_stats = {}
+        self.skipped_cycles = 0
+        
+        # Throttling persistente (Alert.last_triggered), para evitar spam de alertas
+        self.alert_throttle = AlertThrottle()
     
     def start_monitoring(self):
         """Inicia o monitoramento automático"""
@@ -39,15 +63,23 @@ class AlertManager:
         
         logger.info("Iniciando monitoramento de alertas...")
         
-        # Agenda verificações periódicas
-        schedule.every(30).minutes.do(self.check_all_products)
-        schedule.every(1).hours.do(self.cleanup_old_alerts)
+        # Disparos recentes sobrevivem a reinícios
+        self.alert_throttle.load()
         
-        self.is_running = True
+        # Cada produto entra na agenda com o seu próximo horário (última coleta + intervalo)
+        self.scheduler.register_group('product', self.refresh_due_products)
+        self.sync_product_schedule()
+        
+        # Tarefas periódicas
+        now = time.time()
+        self.scheduler.add('sync-products', self.sync_product_schedule, interval=Config.SCHEDULER_SYNC_SECONDS)
+        if Config.LISTING_CRAWL_ENABLED:
+            self.scheduler.add('listings', self.crawl_listings, interval=Config.LISTING_CRAWL_INTERVAL, due=now)
+        self.scheduler.add('cleanup', self.cleanup_old_alerts, interval=3600)
+        self.scheduler.add('history-rollup', self.history_manager.rollup, daily_at=Config.HISTORY_ROLLUP_TIME)
         
-        # Inicia thread do scheduler
-        self.scheduler_thread = Thread(target=self._run_scheduler, daemon=True)
-        self.scheduler_thread.start()
+        self.is_running = True
+        self.scheduler.start()
         
         logger.info("Monitoramento de alertas iniciado")
     
@@ -55,17 +87,123 @@ class AlertManager:
         """Para o monitoramento automático"""
         logger.info("Parando monitoramento de alertas...")
         self.is_running = False
-        schedule.clear()
+        self.scheduler.stop()
         logger.info("Monitoramento de alertas parado")
     
-    def _run_scheduler(self):
-        """Executa o scheduler em thread separada"""
-        while self.is_running:
-            schedule.run_pending()
-            time.sleep(60)  # Verifica a cada minuto
+    def sync_product_schedule(self) -> Dict[str, int]:
+        """Sincroniza a agenda com o banco: produtos novos, desativados e intervalos definidos pelo operador
+        
+        Produtos novos recebem o intervalo da cadência adaptativa; os já agendados têm o
+        intervalo recalculado a cada atualização (retorno de refresh_due_products).
+        """
+        now = time.time()
+        scheduled = set(self.scheduler.keys('product'))
+        rows = DatabaseManager.get_refresh_schedule()
+        active = {('product', row[0]) for row in rows}
+        new_ids = [row[0] for row in rows if ('product', row[0]) not in scheduled]
+        # Primeira sincronização: uma leitura só do histórico e dos alertas de todos os produtos
+        intervals = self.cadence.intervals(None if not scheduled else new_ids) if new_ids else {}
+        added = 0
+        
+        for product_id, last_updated, refresh_interval, _ in rows:
+            key = ('product', product_id)
+            if key in scheduled:
+                if refresh_interval:
+                    self.scheduler.set_interval(key, refresh_interval)
+                continue
+            interval = intervals.get(product_id, refresh_interval or Config.REFRESH_INTERVAL_SECONDS)
+            # Datas do banco são UTC sem fuso
+            last = last_updated.replace(tzinfo=timezone.utc).timestamp() if last_updated else 0
+            self.scheduler.add_item('product', key, interval, due=max(now, last + interval))
+            added += 1
+        
+        removed = scheduled - active
+        for key in removed:
+            self.scheduler.cancel(key)
+        self.cadence.forget(product_id for _, product_id in removed)
+        
+        if added or removed:
+            logger.info(f"Agenda de produtos: {added} adicionados, {len(removed)} removidos, {len(active)} agendados")
+        return {'scheduled': len(active), 'added': added, 'removed': len(removed)}
+    
+    def refresh_due_products(self, keys: List[Tuple[str, int]]) -> Optional[Dict[Tuple[str, int], int]]:
+        """Atualiza um lote de produtos vencidos na agenda (handler do grupo 'product')
+        
+        Retorna o novo intervalo de cada produto, recalculado com os preços recém-coletados.
+        """
+        products = DatabaseManager.get_products_by_ids([product_id for _, product_id in keys])
+        if not products:
+            return None
+        
+        http_cache = self.scraper_manager.static_scraper.cache
+        cache_before = http_cache.get_counters()
+        
+        # Só os alertas dos produtos do lote
+        alert_index = AlertIndex.load(product_ids=[product.id for product in products])
+        pending, write_failed = [], []
+        
+        def refresh_product(product) -> Dict:
+            return self._refresh_product(product, pending, alert_index, write_failed)
+        
+        try:
+            stats = self.refresh_engine.run(products, refresh_product)
+            alerts, failed = self._flush_price_updates(pending, alert_index)
+            stats['alerts'] += alerts
+            self._count_write_failures(stats, write_failed + failed)
+            stats['alert_index'] = alert_index.get_stats()
+            stats['http_cache'] = HttpCache.counters_delta(cache_before, http_cache.get_counters())
+            self.last_cycle_stats = stats
+        finally:
+            self.scraper_manager.router.save()
+        
+        logger.info(
+            f"Lote agendado: {stats['updated']} de {stats['products']} produtos atualizados, "
+            f"{stats['alerts']} alertas disparados, {stats['failed']} falhas em {stats['duration_seconds']:.1f}s"
+        )
+        intervals = self.cadence.intervals([product.id for product in products], alert_index)
+        return {('product', product_id): seconds for product_id, seconds in intervals.items()}
+    
+    def crawl_listings(self) -> Dict:
+        """Atualiza pelas listagens de promoções os produtos encontrados nelas
+        
+        Os produtos atualizados assim têm a próxima visita à página do produto adiada.
+        """
+        products = DatabaseManager.get_all_products(active_only=True)
+        if not products:
+            return {}
+        
+        matches, listing_stats = self.listing_crawler.refresh(products)
+        scraped_at = datetime.utcnow()
+        listing_stats['alerts'], failed = self._apply_price_batch([
+            (product, matches[product.id]['preco_valor'], scraped_at)
+            for product in products if product.id in matches
+        ])
+        # Produtos cujo preço não foi gravado continuam com a visita agendada
+        failed = set(failed)
+        applied = [product_id for product_id in matches if product_id not in failed]
+        listing_stats['write_failed'] = len(failed)
+        listing_stats['matched'] = len(applied)
+        intervals = self.cadence.intervals(applied) if applied else {}
+        for product_id in applied:
+            self.scheduler.postpone(('product', product_id), intervals.get(product_id))
+        self.last_listing_stats = listing_stats
+        
+        logger.info(
+            f"Listagens: {listing_stats['matched']} produtos atualizados a partir de "
+            f"{listing_stats['pages']} páginas ({listing_stats['items']} itens), "
+            f"{listing_stats['alerts']} alertas disparados"
+        )
+        return listing_stats
     
     def check_all_products(self):
-        """Verifica todos os produtos ativos para atualizações de preço"""
+        """Verifica todos os produtos ativos de uma vez (ciclo completo manual, fora da agenda)"""
+        # Um ciclo nunca se sobrepõe ao seguinte: se o anterior ainda está
+        # rodando, este agendamento é descartado
+        if not self._cycle_lock.acquire(blocking=False):
+            self.skipped_cycles += 1
+            logger.warning("Verificação anterior ainda em andamento, ciclo ignorado")
+            return
+        
         logger.info("Iniciando verificação de todos os produtos...")
         
         try:
@@ -75,183 +213,266 @@ class AlertManager:
                 logger.info("Nenhum produto ativo para verificar")
                 return
             
-            updated_count = 0
-            alert_count = 0
-            
-            for product in products:
-                try:
-                    # Atualiza o preço do produto
-                    old_price = product.current_price
-                    updated = self.update_product_price(product.id)
-                    
-                    if updated:
-                        updated_count += 1
-                        
-                        # Verifica alertas para este produto
-                        alerts_triggered = self.check_product_alerts(product.id, old_price)
-                        alert_count += alerts_triggered
-                        
-                        # Pequeno delay entre produtos
-                        time.sleep(2)
-                    
-                except Exception as e:
-                    logger.error(f"Erro ao verificar produto {product.id}: {e}")
-                    continue
-            
-            logger.info(f"Verificação concluída: {updated_count} produtos atualizados, {alert_count} alertas disparados")
-            
-        except Exception as e:
-            logger.error(f"Erro na verificação geral de produtos: {e}")
-    
-    def update_product_price(self, product_id: int) -> bool:
-        """Atualiza o preço de um produto específico"""
-        try:
-            product = DatabaseManager.get_product_by_id(product_id)
-            if not product:
-                logger.warning(f"Produto {product_id} não encontrado")
-                return False
-            
-            # Faz scraping do produto
-            product_data = self.scraper_manager.scrape_product(product.url)
+            http_cache = self.scraper_manager.static_scraper.cache
+            cache_before = http_cache.get_counters()
             
-            if not product_data:
-                logger.warning(f"Não foi possível atualizar produto {product_id}")
-                return False
+            # Alertas ativos carregados uma vez; cada lote é avaliado contra o índice
+            alert_index = AlertIndex.load()
             
-            # Atualiza no banco se o preço mudou
-            if product_data.price != product.current_price:
-                success = DatabaseManager.update_product_price(product_id, product_data.price)
-                if success:
-                    logger.info(f"Preço atualizado para produto {product_id}: {product.current_price} -> {product_data.price}")
-                return success
-            else:
-                logger.debug(f"Preço inalterado para produto {product_id}")
-                return True
-                
-        except Exception as e:
-            logger.error(f"Erro ao atualizar preço do produto {product_id}: {e}")
-            return False
-    
-    def check_product_alerts(self, product_id: int, old_price: float) -> int:
-        """Verifica alertas para um produto específico"""
-        try:
-            product = DatabaseManager.get_product_by_id(product_id)
-            if not product:
-                return 0
+            # Primeiro as listagens (uma requisição para dezenas de produtos);
+            # só os produtos que não aparecem nelas precisam da página do produto
+            listing_stats = {}
+            listing_alerts = 0
+            if Config.LISTING_CRAWL_ENABLED:
+                matches, listing_stats = self.listing_crawler.refresh(products)
+                scraped_at = datetime.utcnow()
+                listing_alerts, failed = self._apply_price_batch([
+                    (product, matches[product.id]['preco_valor'], scraped_at)
+                    for product in products if product.id in matches
+                ], alert_index)
+                # Os que não foram gravados seguem para a página do produto
+                failed = set(failed)
+                matches = {product_id: item for product_id, item in matches.items() if product_id not in failed}
+                listing_stats['matched'] = len(matches)
+                products = [product for product in products if product.id not in matches]
             
-            current_price = product.current_price
-            alerts = DatabaseManager.get_active_alerts(product_id)
+            # Os preços coletados são gravados em lotes (uma transação por lote)
+            pending, write_failed = [], []
             
-            if not alerts:
-                return 0
+            def refresh_product(product) -> Dict:
+                return self._refresh_product(product, pending, alert_index, write_failed)
             
-            alerts_triggered = 0
+            stats = self.refresh_engine.run(products, refresh_product)
+            alerts, failed = self._flush_price_updates(pending, alert_index)
+            self._count_write_failures(stats, write_failed + failed)
+            stats['updated'] += listing_stats.get('matched', 0)
+            stats['alerts'] += listing_alerts + alerts
+            stats['listing'] = listing_stats
+            stats['alert_index'] = alert_index.get_stats()
+            stats['http_cache'] = HttpCache.counters_delta(cache_before, http_cache.get_counters())
+            self.last_cycle_stats = stats
             
-            for alert in alerts:
-                try:
-                    should_trigger = self.should_trigger_alert(alert, old_price, current_price, product_id)
-                    
-                    if should_trigger:
-                        success = self.send_alert_notification(alert, product, old_price, current_price)
-                        
-                        if success:
-                            # Marca o alerta como disparado
-                            DatabaseManager.update_alert_triggered(alert.id)
-                            alerts_triggered += 1
-                            
-                            # Registra para throttling
-                            alert_key = f"{alert.id}_{alert.alert_type}"
-                            self.last_alert_times[alert_key] = datetime.utcnow()
-                            
-                            logger.info(f"Alerta {alert.id} disparado para produto {product_id}")
-                        
-                except Exception as e:
-                    logger.error(f"Erro ao processar alerta {alert.id}: {e}")
-                    continue
+            if listing_stats:
+                logger.info(
+                    f"Listagens: {listing_stats['matched']} produtos atualizados a partir de "
+                    f"{listing_stats['pages']} páginas ({listing_stats['items']} itens), "
+                    f"{len(products)} produtos via página do produto"
+                )
             
-            return alerts_triggered
+            logger.info(
+                f"Verificação concluída: {stats['updated']} produtos atualizados, "
+                f"{stats['alerts']} alertas disparados, {stats['failed']} falhas em "
+                f"{stats['duration_seconds']:.1f}s ({stats['throughput_per_minute']:.1f} produtos/min)"
+            )
+            logger.info(
+                f"Cache HTTP: {stats['http_cache']['not_modified']} respostas 304 e "
+                f"{stats['http_cache']['hash_hits']} páginas inalteradas de {stats['http_cache']['requests']} "
+                f"requisições, {stats['http_cache']['bytes_saved'] / 1024:.0f} KB economizados"
+            )
             
         except Exception as e:
-            logger.error(f"Erro ao verificar alertas do produto {product_id}: {e}")
-            return 0
+            logger.error(f"Erro na verificação geral de produtos: {e}")
+        finally:
+            self.scraper_manager.router.save()
+            self._cycle_lock.release()
     
-    def should_trigger_alert(self, alert, old_price: float, current_price: float, product_id: int) -> bool:
-        """Determina se um alerta deve ser disparado"""
-        
-        # Verifica throttling
-        alert_key = f"{alert.id}_{alert.alert_type}"
-        last_alert_time = self.last_alert_times.get(alert_key)
-        
-        if last_alert_time:
-            time_since_last = (datetime.utcnow() - last_alert_time).total_seconds()
-            if time_since_last < self.min_alert_interval:
-                logger.debug(f"Alerta {alert.id} em throttling (faltam {self.min_alert_interval - time_since_last:.0f}s)")
-                return False
-        
-        # Verifica condições específicas do tipo de alerta
-        if alert.alert_type == 'static':
-            return self._check_static_alert(alert, current_price)
-        elif alert.alert_type == 'percentage':
-            return self._check_percentage_alert(alert, old_price, current_price)
-        elif alert.alert_type == 'lowest_ever':
-            return self._check_lowest_ever_alert(alert, current_price, product_id)
+    def _refresh_product(self, product, pending: List, alert_index: AlertIndex = None,
+                         write_failed: List[int] = None) -> Dict:
+        """Coleta o preço de um produto e o enfileira para gravação em lote (executado pelo RefreshEngine)
         
-        return False
-    
-    def _check_static_alert(self, alert, current_price: float) -> bool:
-        """Verifica alerta de preço fixo"""
-        if not alert.threshold_price:
-            return False
+        Produtos enfileirados antes contam como atualizados; se o lote deles não for
+        gravado, entram em write_failed para a correção das estatísticas do ciclo.
+        """
+        product_data = self.scraper_manager.scrape_product(product.url)
+        
+        if not product_data:
+            logger.warning(f"Não foi possível atualizar produto {product.id}")
+            return {'updated': False}
         
-        return current_price <= alert.threshold_price
+        with self._pending_lock:
+            pending.append((product, product_data.price, datetime.utcnow()))
+            if len(pending) < Config.PRICE_WRITE_BATCH_SIZE:
+                return {'updated': True, 'alerts': 0}
+            batch = pending[:]
+            pending.clear()
+        
+        alerts, failed = self._apply_price_batch(batch, alert_index)
+        if write_failed is not None:
+            write_failed.extend(product_id for product_id in failed if product_id != product.id)
+        return {'updated': product.id not in failed, 'alerts': alerts}
+    
+    def _flush_price_updates(self, pending: List, alert_index: AlertIndex = None) -> Tuple[int, List[int]]:
+        """Grava o que restou na fila de preços ao final do ciclo"""
+        with self._pending_lock:
+            batch = pending[:]
+            pending.clear()
+        return self._apply_price_batch(batch, alert_index)
+    
+    @staticmethod
+    def _count_write_failures(stats: Dict, failed: List[int]):
+        """Produtos coletados cujo lote não foi gravado passam de atualizados a falhas"""
+        stats['write_failed'] = len(failed)
+        stats['updated'] -= len(failed)
+        stats['failed'] += len(failed)
     
-    def _check_percentage_alert(self, alert, old_price: float, current_price: float) -> bool:
-        """Verifica alerta de queda percentual"""
-        if not alert.percentage_threshold or old_price <= 0:
-            return False
+    def _apply_price_batch(self, batch: List[Tuple], alert_index: AlertIndex = None) -> Tuple[int, List[int]]:
+        """Aplica um lote de (produto, preço, data da coleta) e avalia os alertas
+        
+        Retorna os alertas disparados e os produtos do lote que não foram gravados
+        (erro de banco ou produto removido). Sem alert_index (atualização manual)
+        carrega só os alertas dos produtos do lote.
+        """
+        if not batch:
+            return 0, []
+        
+        # Lotes gravados um de cada vez (SQLite admite um único escritor)
+        with self._write_lock:
+            changes = DatabaseManager.apply_price_updates(
+                [(product.id, price, scraped_at) for product, price, scraped_at in batch]
+            )
+        
+        products = {product.id: product for product, _, _ in batch}
+        failed = [product_id for product_id in products if product_id not in changes]
+        if failed:
+            logger.error(f"{len(failed)} de {len(products)} preços do lote não foram gravados")
+        scraped = {product.id: scraped_at for product, _, scraped_at in batch}
+        detection_lags = []
         
-        price_drop_percent = ((old_price - current_price) / old_price) * 100
+        for product_id, change in changes.items():
+            if change['changed']:
+                logger.info(f"Preço atualizado para produto {product_id}: {change['old_price']} -> {change['new_price']}")
+                # A mudança aconteceu entre a coleta anterior e esta
+                previous = products[product_id].last_updated
+                if previous:
+                    detection_lags.append((scraped[product_id] - previous).total_seconds())
+        self.cadence.record_detections(detection_lags)
         
-        return price_drop_percent >= alert.percentage_threshold
+        if alert_index is None:
+            alert_index = AlertIndex.load(product_ids=list(changes))
+        
+        fired = alert_index.evaluate(
+            (product_id, change['old_price'], change['new_price'], change['lowest_price'])
+            for product_id, change in changes.items()
+        )
+        return self._dispatch_alerts(fired, products), failed
     
-    def _check_lowest_ever_alert(self, alert, current_price: float, product_id: int) -> bool:
-        """Verifica alerta de novo mínimo histórico"""
+    def refresh_product_now(self, product_id: int) -> Dict:
+        """Atualização manual de um produto (executada pela fila de jobs)
+
+        Usa o mesmo scraper, cache HTTP e limites por domínio do ciclo e grava
+        pelo mesmo caminho em lote, avaliando os alertas.
+        """
+        product = DatabaseManager.get_product_by_id(product_id)
+        if not product:
+            raise ValueError(f"Produto {product_id} não encontrado")
+
+        product_data = self.scraper_manager.scrape_product(product.url)
+        if not product_data:
+            raise RuntimeError("Não foi possível atualizar o produto")
+
+        old_price = product.current_price
+        alerts, failed = self._apply_price_batch([(product, product_data.price, datetime.utcnow())])
+        if failed:
+            raise RuntimeError("Erro ao gravar o preço do produto")
+        # Recém-atualizado: a próxima visita agendada conta a partir de agora
+        self.scheduler.postpone(('product', product_id), self.cadence.intervals([product_id]).get(product_id))
+
+        return {
+            'product_id': product_id,
+            'old_price': old_price,
+            'new_price': product_data.price,
+            'changed': product_data.price != old_price,
+            'alerts': alerts
+        }
+
+    def add_product_from_url(self, url: str) -> Dict:
+        """Coleta e cadastra um produto pela URL (executada pela fila de jobs)"""
+        existing = DatabaseManager.get_product_by_url(url)
+        if existing:
+            return {'product_id': existing.id, 'name': existing.name, 'url': existing.url,
+                    'price': existing.current_price, 'created': False}
+
+        product_data = self.scraper_manager.scrape_product(url)
+        if not product_data:
+            raise RuntimeError("Não foi possível extrair dados do produto")
+
+        product = DatabaseManager.add_product(
+            name=product_data.name,
+            url=url,
+            price=product_data.price,
+            image_url=product_data.image_url,
+            original_price=product_data.original_price
+        )
+        if not product:
+            raise RuntimeError("Erro ao salvar produto no banco de dados")
+
+        if self.is_running:
+            interval = self.cadence.intervals([product.id]).get(product.id, Config.REFRESH_INTERVAL_SECONDS)
+            self.scheduler.add_item('product', ('product', product.id), interval, due=time.time() + interval)
+
+        return {'product_id': product.id, 'name': product_data.name, 'url': url,
+                'price': product_data.price, 'created': True}
+
+    def _dispatch_alerts(self, fired: List[Tuple], products: Dict) -> int:
+        """Enfileira as notificações dos alertas disparados (fora do throttling) e os marca como disparados"""
+        triggered = [
+            (alert, products[product_id], old_price, current_price)
+            for alert, product_id, old_price, current_price in fired
+            if not self.alert_throttle.is_throttled(alert)
+        ]
+        if not triggered:
+            return 0
+        
+        notifier = self.telegram_bot.notifier
         try:
-            lowest_price = DatabaseManager.get_lowest_price(product_id)
-            
-            if lowest_price is None:
-                return False
-            
-            # Considera uma margem pequena para evitar alertas por diferenças mínimas
-            margin = 0.01  # R$ 0,01
-            return current_price < (lowest_price - margin)
-            
+            notifications = notifier.outbox_rows(self._build_notifications(triggered))
+            # Notificações e last_triggered na mesma transação (mesmo instante no banco e no throttling)
+            triggered_at = datetime.utcnow()
+            if not DatabaseManager.trigger_alerts([alert.id for alert, _, _, _ in triggered],
+                                                  triggered_at, notifications):
+                return 0
         except Exception as e:
-            logger.error(f"Erro ao verificar mínimo histórico: {e}")
-            return False
+            logger.error(f"Erro ao processar {len(triggered)} alertas disparados: {e}")
+            return 0
+        notifier.notify_enqueued(len(notifications))
+        
+        bus = get_event_bus()
+        for alert, product, old_price, current_price in triggered:
+            self.alert_throttle.record(alert, triggered_at)
+            bus.publish('alert', {
+                'alert_id': alert.id,
+                'product_id': product.id,
+                'product_name': product.name,
+                'alert_type': alert.alert_type,
+                'old_price': old_price,
+                'new_price': current_price
+            })
+            logger.info(f"Alerta {alert.id} disparado para produto {product.id}")
+        
+        return len(triggered)
     
-    def send_alert_notification(self, alert, product, old_price: float, current_price: float) -> bool:
-        """Envia notificação de alerta"""
-        try:
-            success = False
-            
+    def _build_notifications(self, triggered: List[Tuple]) -> List[Dict]:
+        """Notificações de (alerta, produto, preço anterior, preço atual) para a fila de saída do bot
+        
+        O envio acontece no event loop do bot, com limites de taxa e digest por chat.
+        """
+        notifications = []
+        for alert, product, old_price, current_price in triggered:
             # Envia via Telegram se configurado
             if alert.chat_id and alert.chat_id != 'web_user' and self.telegram_bot.application:
-                telegram_success = asyncio.run(
-                    self.telegram_bot.send_price_alert(
-                        alert.chat_id, product, old_price, current_price, alert.alert_type
-                    )
-                )
-                success = success or telegram_success
+                notifications.append({
+                    'chat_id': alert.chat_id,
+                    'alert_id': alert.id,
+                    'product_id': product.id,
+                    'alert_type': alert.alert_type,
+                    'old_price': old_price,
+                    'new_price': current_price
+                })
             
             # Log da notificação
             self._log_alert_notification(alert, product, old_price, current_price)
-            
-            return True  # Sempre retorna True para não bloquear outros alertas
-            
-        except Exception as e:
-            logger.error(f"Erro ao enviar notificação do alerta {alert.id}: {e}")
-            return False
+        
+        return notifications
     
     def _log_alert_notification(self, alert, product, old_price: float, current_price: float):
         """Registra log detalhado da notificação"""
@@ -270,20 +491,16 @@ class AlertManager:
         logger.info(log_message)
     
     def cleanup_old_alerts(self):
-        """Remove registros antigos de throttling"""
+        """Remove registros de throttling cujo intervalo já terminou e notificações antigas já entregues"""
         try:
-            cutoff_time = datetime.utcnow() - timedelta(hours=24)
-            
-            keys_to_remove = []
-            for key, timestamp in self.last_alert_times.items():
-                if timestamp < cutoff_time:
-                    keys_to_remove.append(key)
+            removed = self.alert_throttle.prune()
             
-            for key in keys_to_remove:
-                del self.last_alert_times[key]
+            if removed:
+                logger.info(f"Limpeza: removidos {removed} registros antigos de throttling")
             
-            if keys_to_remove:
-                logger.info(f"Limpeza: removidos {len(keys_to_remove)} registros antigos de throttling")
+            purged = self.telegram_bot.notifier.purge()
+            if purged:
+                logger.info(f"Limpeza: removidas {purged} notificações antigas da fila de saída")
                 
         except Exception as e:
             logger.error(f"Erro na limpeza de alertas antigos: {e}")
@@ -308,15 +525,10 @@ class AlertManager:
                 results['products_checked'] += 1
                 
                 try:
-                    old_price = product.current_price
-                    updated = self.update_product_price(product.id)
-                    
-                    if updated:
-                        results['products_updated'] += 1
-                        
-                        # Verifica alertas
-                        alerts_triggered = self.check_product_alerts(product.id, old_price)
-                        results['alerts_triggered'] += alerts_triggered
+                    # Mesmo caminho das atualizações manuais: gravação em lote e índice de alertas
+                    result = self.refresh_product_now(product.id)
+                    results['products_updated'] += 1
+                    results['alerts_triggered'] += result['alerts']
                         
                 except Exception as e:
                     error_msg = f"Erro no produto {product.id}: {str(e)}"
@@ -338,20 +550,25 @@ class AlertManager:
         try:
             stats = DatabaseManager.get_database_stats()
             
-            # Adiciona informações específicas de alertas
-            all_alerts = DatabaseManager.get_active_alerts()
-            
-            alert_types = {}
-            for alert in all_alerts:
-                alert_type = alert.alert_type
-                alert_types[alert_type] = alert_types.get(alert_type, 0) + 1
-            
             return {
                 'total_alerts': stats['total_alerts'],
                 'active_alerts': stats['active_alerts'],
-                'alert_types': alert_types,
+                'alert_types': DatabaseManager.get_alert_type_counts(),
                 'monitoring_active': self.is_running,
-                'throttling_records': len(self.last_alert_times)
+                'throttling_records': len(self.alert_throttle),
+                'throttling': self.alert_throttle.get_stats(),
+                'notifications': self.telegram_bot.notifier.get_stats(),
+                'last_cycle': self.last_cycle_stats,
+                'last_listing': self.last_listing_stats,
+                'scheduler': self.scheduler.get_stats(),
+                'cadence': self.cadence.get_stats(),
+                'skipped_cycles': self.skipped_cycles,
+                'routing': self.scraper_manager.router.get_stats(),
+                'dynamic_pages': get_resource_filter().get_stats(),
+                'history': self.history_manager.get_stats(),
+                'db_cache': DatabaseManager.get_cache_stats(),
+                'events': get_event_bus().get_stats(),
+                'jobs': get_job_queue().get_stats()
             }
             
         except Exception as e:
@@ -0,0 +1,96 @@
+"""
+Throttling persistente dos alertas
+O estado vem de Alert.last_triggered (gravado a cada disparo): na primeira
+consulta é carregado numa única leitura e mantido em memória como "em throttling
+até" por alerta. Reinícios não liberam novos disparos antes da hora.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict
+
+from config.settings import Config
+from src.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+def _to_epoch(moment: datetime) -> float:
+    # Datas do banco são UTC sem fuso
+    return (moment - EPOCH).total_seconds()
+
+class AlertThrottle:
+    """Fim do intervalo de throttling de cada alerta disparado recentemente"""
+
+    def __init__(self, default_seconds: int = None):
+        self.default_seconds = default_seconds or Config.ALERT_THROTTLE_SECONDS
+        self._until: Dict[int, float] = {}  # alert_id -> epoch (UTC) em que pode disparar de novo
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.suppressed = 0
+
+    def window(self, alert) -> int:
+        """Intervalo mínimo entre disparos do alerta (próprio ou o padrão)"""
+        return getattr(alert, 'throttle_seconds', None) or self.default_seconds
+
+    def load(self):
+        """Carrega os últimos disparos do banco (uma consulta; só os que ainda estão no intervalo)"""
+        now = time.time()
+        until = {}
+        for alert_id, last_triggered, throttle_seconds in DatabaseManager.get_alert_trigger_times():
+            expires = _to_epoch(last_triggered) + (throttle_seconds or self.default_seconds)
+            if expires > now:
+                until[alert_id] = expires
+
+        with self._lock:
+            self._until = until
+            self._loaded = True
+        logger.info(f"Throttling de alertas carregado: {len(until)} alertas em intervalo")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def remaining(self, alert, now: float = None) -> float:
+        """Segundos até o alerta poder disparar de novo (0 se já pode)"""
+        self._ensure_loaded()
+        now = now or time.time()
+        with self._lock:
+            until = self._until.get(alert.id)
+        return max(0.0, until - now) if until else 0.0
+
+    def is_throttled(self, alert) -> bool:
+        remaining = self.remaining(alert)
+        if remaining:
+            self.suppressed += 1
+            logger.debug(f"Alerta {alert.id} em throttling (faltam {remaining:.0f}s)")
+        return remaining > 0
+
+    def record(self, alert, triggered_at: datetime) -> None:
+        """Registra um disparo (o mesmo instante gravado em Alert.last_triggered)"""
+        self._ensure_loaded()
+        with self._lock:
+            self._until[alert.id] = _to_epoch(triggered_at) + self.window(alert)
+
+    def prune(self) -> int:
+        """Remove alertas cujo intervalo já terminou; retorna quantos saíram"""
+        now = time.time()
+        with self._lock:
+            expired = [alert_id for alert_id, until in self._until.items() if until <= now]
+            for alert_id in expired:
+                del self._until[alert_id]
+        return len(expired)
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Alertas em throttling e disparos suprimidos"""
+        return {
+            'default_seconds': self.default_seconds,
+            'throttled_alerts': len(self._until),
+            'suppressed': self.suppressed
+        }
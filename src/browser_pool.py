@@ -0,0 +1,231 @@
+"""
+Pool de navegadores Playwright para o Bot de Monitoramento de Preços
+Mantém navegadores abertos entre produtos e entrega contextos isolados
+"""
+
+import logging
+import queue
+import random
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+from playwright.sync_api import sync_playwright, Page
+
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+# Sentinela usada para encerrar as threads do pool
+_STOP = object()
+
+class BrowserWorker(threading.Thread):
+    """Thread dona de um navegador do pool
+
+    A API síncrona do Playwright só pode ser usada pela thread que a iniciou,
+    por isso cada navegador vive em sua própria thread e recebe tarefas por fila.
+    """
+
+    def __init__(self, pool: 'BrowserPool', browser_type: str, index: int, warm: bool = False):
+        super().__init__(name=f"browser-{browser_type}-{index}", daemon=True)
+        self.pool = pool
+        self.browser_type = browser_type
+        self.warm = warm
+        self.playwright = None
+        self.browser = None
+        self.pages_served = 0
+
+    def run(self):
+        tasks = self.pool._queues[self.browser_type]
+
+        if self.warm:
+            try:
+                self._ensure_browser()
+            except Exception as e:
+                logger.error(f"Erro no aquecimento do navegador {self.name}: {e}")
+
+        while True:
+            task = tasks.get()
+            if task is _STOP:
+                break
+
+            func, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                future.set_result(self._run_task(func))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._close_browser()
+        self._stop_driver()
+
+    def _ensure_browser(self):
+        """Garante um navegador conectado, relançando-o após falhas"""
+        if self.browser is not None:
+            if self.browser.is_connected():
+                return
+            logger.warning(f"Navegador {self.name} desconectado, relançando...")
+            self.pool._record('crashes')
+            self._close_browser()
+
+        if self.playwright is None:
+            self.playwright = sync_playwright().start()
+
+        # Usa getattr para obter a classe do navegador dinamicamente
+        browser_launcher = getattr(self.playwright, self.browser_type)
+        self.browser = browser_launcher.launch(
+            headless=True,
+            args=['--no-sandbox', '--disable-dev-shm-usage']
+        )
+        self.pages_served = 0
+        self.pool._record('launches')
+        logger.info(f"Navegador {self.name} iniciado")
+
+    def _run_task(self, func: Callable[[Page], Any]) -> Any:
+        """Executa uma tarefa em um contexto novo e isolado"""
+        self._ensure_browser()
+
+        context = self.browser.new_context(user_agent=random.choice(Config.USER_AGENTS))
+        try:
+            page = context.new_page()
+            return func(page)
+        finally:
+            try:
+                context.close()
+            except Exception:
+                pass
+
+            self.pages_served += 1
+            self.pool._record('pages')
+
+            # Recicla após N páginas ou se o navegador caiu durante a tarefa
+            if not self.browser.is_connected():
+                self.pool._record('crashes')
+                self._close_browser()
+            elif self.pages_served >= self.pool.max_pages:
+                logger.info(f"Reciclando navegador {self.name} após {self.pages_served} páginas")
+                self.pool._record('recycles')
+                self._close_browser()
+
+    def _close_browser(self):
+        if self.browser is not None:
+            try:
+                self.browser.close()
+            except Exception:
+                pass
+            self.browser = None
+
+    def _stop_driver(self):
+        if self.playwright is not None:
+            try:
+                self.playwright.stop()
+            except Exception:
+                pass
+            self.playwright = None
+
+class BrowserPool:
+    """Pool de navegadores de longa duração, separados por tipo de navegador"""
+
+    def __init__(self, size: int = None, max_pages: int = None):
+        self.size = size or Config.BROWSER_POOL_SIZE
+        self.max_pages = max_pages or Config.BROWSER_MAX_PAGES
+
+        self._queues: Dict[str, queue.Queue] = {}
+        self._workers: Dict[str, List[BrowserWorker]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.stats = {'launches': 0, 'recycles': 0, 'crashes': 0, 'pages': 0}
+
+    def _record(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _start_workers(self, browser_type: str, warm: bool = False) -> queue.Queue:
+        """Inicia as threads de um tipo de navegador (apenas na primeira vez)"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Pool de navegadores encerrado")
+
+            if browser_type not in self._queues:
+                self._queues[browser_type] = queue.Queue()
+                workers = [BrowserWorker(self, browser_type, i, warm=warm) for i in range(self.size)]
+                self._workers[browser_type] = workers
+                for worker in workers:
+                    worker.start()
+                logger.info(f"Pool de navegadores '{browser_type}' iniciado com {self.size} navegador(es)")
+
+            return self._queues[browser_type]
+
+    def submit(self, browser_type: str, func: Callable[[Page], Any]) -> Future:
+        """Agenda func(page) em um navegador do pool e retorna um Future"""
+        tasks = self._start_workers(browser_type)
+        future = Future()
+        tasks.put((func, future))
+        return future
+
+    def run(self, browser_type: str, func: Callable[[Page], Any], timeout: float = None) -> Any:
+        """Executa func(page) em um navegador do pool e aguarda o resultado"""
+        future = self.submit(browser_type, func)
+        return future.result(timeout=timeout or Config.BROWSER_TASK_TIMEOUT)
+
+    def warm_up(self, browser_types: List[str] = None):
+        """Inicia os navegadores antecipadamente para evitar latência no primeiro uso"""
+        for browser_type in browser_types or Config.BROWSER_POOL_WARMUP:
+            self._start_workers(browser_type, warm=True)
+
+    def shutdown(self, timeout: float = 10):
+        """Encerra todos os navegadores do pool"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            queues = dict(self._queues)
+            workers = [w for ws in self._workers.values() for w in ws]
+
+        logger.info("Encerrando pool de navegadores...")
+
+        for browser_type, tasks in queues.items():
+            # Cancela tarefas pendentes para não atrasar o encerramento
+            while True:
+                try:
+                    task = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not _STOP:
+                    task[1].cancel()
+
+            for _ in self._workers[browser_type]:
+                tasks.put(_STOP)
+
+        for worker in workers:
+            worker.join(timeout=timeout)
+
+        logger.info("Pool de navegadores encerrado")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas de uso do pool"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['pool_size'] = self.size
+            stats['browser_types'] = list(self._queues.keys())
+            stats['pending_tasks'] = sum(q.qsize() for q in self._queues.values())
+        return stats
+
+# Instância global do pool de navegadores
+browser_pool = BrowserPool()
+
+def init_browser_pool():
+    """Inicializa o pool de navegadores, aquecendo os tipos configurados"""
+    try:
+        browser_pool.warm_up()
+        return True
+    except Exception as e:
+        logger.error(f"Erro ao inicializar pool de navegadores: {e}")
+        return False
+
+def get_browser_pool() -> BrowserPool:
+    """Retorna a instância do pool de navegadores"""
+    return browser_pool
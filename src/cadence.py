@@ -0,0 +1,155 @@
+"""
+Cadência adaptativa de atualização por produto
+A frequência de mudanças de preço de cada produto é estimada pelo price_history
+(contagem com decaimento exponencial em duas escalas: a longa dá a tendência, a
+curta reage a rajadas como um lançamento ou liquidação em andamento). O intervalo
+é uma fração do tempo médio esperado entre mudanças, encurtado quando há alerta
+de preço fixo logo abaixo do preço atual e limitado por um piso e um teto.
+O primeiro registro do histórico (cadastro) conta como mudança: produtos recém-
+cadastrados são visitados com mais frequência até a volatilidade ser conhecida.
+"""
+
+import logging
+import math
+import threading
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterable, Optional, Sequence
+
+from config.settings import Config
+from src.alert_index import AlertIndex
+from src.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Mudanças mais antigas que este número de meias-vidas pesam menos de 7% e não são lidas
+LOOKBACK_HALF_LIVES = 4
+
+class CadenceModel:
+    """Calcula o intervalo de atualização de cada produto e mede o atraso de detecção"""
+
+    def __init__(self, min_seconds: int = None, max_seconds: int = None, half_life_hours: float = None,
+                 burst_half_life_hours: float = None, change_fraction: float = None, alert_proximity: float = None):
+        self.min_seconds = min_seconds or Config.CADENCE_MIN_SECONDS
+        self.max_seconds = max(max_seconds or Config.CADENCE_MAX_SECONDS, self.min_seconds)
+        self.half_life = (half_life_hours or Config.CADENCE_HALF_LIFE_HOURS) * 3600
+        # Constantes de tempo (s) das duas escalas: tendência e rajada
+        self.taus = tuple(
+            hours * 3600 / math.log(2)
+            for hours in (half_life_hours or Config.CADENCE_HALF_LIFE_HOURS,
+                          burst_half_life_hours or Config.CADENCE_BURST_HALF_LIFE_HOURS)
+        )
+        self.change_fraction = change_fraction or Config.CADENCE_CHANGE_FRACTION
+        self.alert_proximity = alert_proximity or Config.CADENCE_ALERT_PROXIMITY
+
+        self._intervals: Dict[int, int] = {}  # último intervalo calculado por produto
+        self._lags: Deque[float] = deque(maxlen=1000)
+        self._lock = threading.Lock()
+        self.detections = 0
+
+    def change_rate(self, change_ages: Iterable[float]) -> float:
+        """Mudanças por segundo: soma dos pesos exp(-idade/tau) dividida por tau, a maior das duas escalas"""
+        ages = [max(age, 0.0) for age in change_ages]
+        return max(sum(math.exp(-age / tau) for age in ages) / tau for tau in self.taus)
+
+    def interval(self, change_ages: Iterable[float], current_price: Optional[float] = None,
+                 static_thresholds: Sequence[float] = (), override: Optional[int] = None) -> int:
+        """Intervalo (s) de um produto a partir das idades (s) das mudanças de preço recentes
+
+        static_thresholds vem ordenado (como no índice de alertas); override é o
+        intervalo definido pelo operador e tem precedência.
+        """
+        if override:
+            return override
+        if not Config.CADENCE_ENABLED:
+            return Config.REFRESH_INTERVAL_SECONDS
+
+        rate = self.change_rate(change_ages)
+        seconds = self.change_fraction / rate if rate else self.max_seconds
+        seconds = min(max(seconds, self.min_seconds), self.max_seconds)
+
+        # Alerta fixo logo abaixo do preço: quanto mais perto, mais perto do piso (curva quadrática)
+        if current_price and static_thresholds:
+            position = bisect_left(static_thresholds, current_price)
+            if position:
+                gap = (current_price - static_thresholds[position - 1]) / current_price
+                if gap < self.alert_proximity:
+                    cap = self.min_seconds + (self.max_seconds - self.min_seconds) * (gap / self.alert_proximity) ** 2
+                    seconds = min(seconds, cap)
+
+        return int(seconds)
+
+    def intervals(self, product_ids: Sequence[int] = None, alert_index: AlertIndex = None,
+                  now: datetime = None) -> Dict[int, int]:
+        """Intervalos dos produtos ativos (todos ou os informados), com uma leitura do histórico recente
+
+        alert_index pode vir do lote que acabou de ser atualizado, evitando recarregar os alertas.
+        """
+        products = DatabaseManager.get_refresh_schedule(product_ids)
+        if not products:
+            return {}
+        if alert_index is None:
+            alert_index = AlertIndex.load(product_ids)
+
+        now = now or datetime.utcnow()
+        changes: Dict[int, list] = {}
+        if Config.CADENCE_ENABLED:
+            since = now - timedelta(seconds=self.half_life * LOOKBACK_HALF_LIVES)
+            for product_id, timestamp in DatabaseManager.get_price_change_times(product_ids, since):
+                changes.setdefault(product_id, []).append((now - timestamp).total_seconds())
+
+        result = {}
+        for product_id, _, override, current_price in products:
+            thresholds = alert_index.static.get(product_id)
+            result[product_id] = self.interval(changes.get(product_id, ()), current_price,
+                                               thresholds.values if thresholds else (), override)
+
+        with self._lock:
+            self._intervals.update(result)
+        return result
+
+    def forget(self, product_ids: Iterable[int]) -> None:
+        """Remove produtos que saíram da agenda"""
+        with self._lock:
+            for product_id in product_ids:
+                self._intervals.pop(product_id, None)
+
+    def record_detections(self, lags: Iterable[float]) -> None:
+        """Registra mudanças detectadas: segundos desde a coleta anterior (limite superior do atraso)"""
+        lags = [lag for lag in lags if lag >= 0]
+        with self._lock:
+            self._lags.extend(lags)
+            self.detections += len(lags)
+
+    def get_stats(self) -> Dict[str, float]:
+        """Requisições por dia (adaptativa x intervalo fixo) e atraso de detecção das mudanças"""
+        with self._lock:
+            intervals = list(self._intervals.values())
+            lags = sorted(self._lags)
+
+        requests_per_day = sum(86400 / seconds for seconds in intervals)
+        baseline = len(intervals) * 86400 / Config.REFRESH_INTERVAL_SECONDS
+        return {
+            'enabled': Config.CADENCE_ENABLED,
+            'products': len(intervals),
+            'min_seconds': self.min_seconds,
+            'max_seconds': self.max_seconds,
+            'at_floor': sum(1 for seconds in intervals if seconds <= self.min_seconds),
+            'at_ceiling': sum(1 for seconds in intervals if seconds >= self.max_seconds),
+            'requests_per_day': round(requests_per_day),
+            'baseline_requests_per_day': round(baseline),
+            'reduction_factor': round(baseline / requests_per_day, 1) if requests_per_day else 0.0,
+            'detections': self.detections,
+            # Tempo desde a coleta anterior: a mudança ocorreu em algum ponto desse intervalo
+            'detection_lag_p50_seconds': round(lags[len(lags) // 2], 1) if lags else 0.0,
+            'detection_lag_p95_seconds': round(lags[int(len(lags) * 0.95) - 1], 1) if lags else 0.0,
+            'detection_lag_max_seconds': round(lags[-1], 1) if lags else 0.0
+        }
+
+# Instância global
+cadence_model = CadenceModel()
+
+def get_cadence_model() -> CadenceModel:
+    """Retorna a instância global do modelo de cadência"""
+    return cadence_model
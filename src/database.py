@@ -3,17 +3,26 @@ Módulo de banco de dados para o Bot de Monitoramento de Preços
 Gerencia modelos SQLAlchemy e operações de banco de dados
 """
 
+import base64
+import binascii
+import json
 import logging
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import List, Optional, Dict, Any, Callable, Hashable, Iterable, Sequence, Tuple
 from pathlib import Path
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, desc
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Index, asc, case, desc, func, insert, literal, select, tuple_, update
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.orm import sessionmaker, relationship, Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError
 
 from config.settings import Config
+from src.migrations import run_migrations
+from src.events import get_event_bus
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +36,10 @@ SessionLocal = None
 class Product(Base):
     """Modelo para produtos monitorados"""
     __tablename__ = 'products'
+    __table_args__ = (
+        Index('ix_products_active', 'active'),
+        Index('ix_products_last_updated', 'last_updated'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(500), nullable=False)
@@ -37,10 +50,13 @@ class Product(Base):
     last_updated = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
     active = Column(Boolean, default=True)
+    refresh_interval = Column(Integer)  # Segundos entre atualizações definidos pelo operador (None = cadência adaptativa)
     
     # Relacionamentos
     price_history = relationship("PriceHistory", back_populates="product", cascade="all, delete-orphan")
     alerts = relationship("Alert", back_populates="product", cascade="all, delete-orphan")
+    price_stats = relationship("ProductPriceStats", uselist=False, cascade="all, delete-orphan")
+    price_buckets = relationship("PriceHistoryBucket", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name[:50]}...', price={self.current_price})>"
@@ -56,12 +72,18 @@ class Product(Base):
             'current_price': self.current_price,
             'last_updated': self.last_updated.isoformat() if self.last_updated else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'active': self.active
+            'active': self.active,
+            'refresh_interval': self.refresh_interval
         }
 
 class PriceHistory(Base):
     """Modelo para histórico de preços"""
     __tablename__ = 'price_history'
+    # Mantidos em sincronia com a migração 1 (bancos novos já nascem com os índices)
+    __table_args__ = (
+        Index('ix_price_history_product_timestamp', 'product_id', 'timestamp'),
+        Index('ix_price_history_product_price', 'product_id', 'price'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
@@ -83,9 +105,122 @@ class PriceHistory(Base):
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
         }
 
+class PriceHistoryBucket(Base):
+    """Histórico agregado (OHLC) de um produto por hora ou por dia"""
+    __tablename__ = 'price_history_buckets'
+    
+    product_id = Column(Integer, ForeignKey('products.id'), primary_key=True)
+    resolution = Column(String(10), primary_key=True)  # 'hour' ou 'day'
+    bucket_start = Column(DateTime, primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False, default=1)  # registros brutos agregados
+    price_sum = Column(Float, nullable=False)  # soma dos preços (mantém as médias exatas)
+    
+    def __repr__(self):
+        return f"<PriceHistoryBucket(product_id={self.product_id}, {self.resolution}={self.bucket_start}, close={self.close})>"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte o bucket para dicionário"""
+        return {
+            'product_id': self.product_id,
+            'resolution': self.resolution,
+            'bucket_start': self.bucket_start.isoformat() if self.bucket_start else None,
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'samples': self.samples
+        }
+
+class ProductPriceStats(Base):
+    """Estatísticas de preço pré-agregadas por produto (mantidas a cada registro de histórico)"""
+    __tablename__ = 'product_price_stats'
+    
+    product_id = Column(Integer, ForeignKey('products.id'), primary_key=True)
+    lowest_price = Column(Float)
+    lowest_at = Column(DateTime)
+    highest_price = Column(Float)
+    highest_at = Column(DateTime)
+    last_price = Column(Float)
+    last_change_at = Column(DateTime)
+    change_count = Column(Integer, default=0)  # registros de histórico após o primeiro
+    min_7d = Column(Float)
+    avg_7d = Column(Float)
+    min_30d = Column(Float)
+    avg_30d = Column(Float)
+    min_90d = Column(Float)
+    avg_90d = Column(Float)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ProductPriceStats(product_id={self.product_id}, lowest={self.lowest_price}, last={self.last_price})>"
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte as estatísticas para dicionário"""
+        return {
+            'product_id': self.product_id,
+            'lowest_price': self.lowest_price,
+            'lowest_at': self.lowest_at.isoformat() if self.lowest_at else None,
+            'highest_price': self.highest_price,
+            'highest_at': self.highest_at.isoformat() if self.highest_at else None,
+            'last_price': self.last_price,
+            'last_change_at': self.last_change_at.isoformat() if self.last_change_at else None,
+            'change_count': self.change_count,
+            'min_7d': self.min_7d,
+            'avg_7d': self.avg_7d,
+            'min_30d': self.min_30d,
+            'avg_30d': self.avg_30d,
+            'min_90d': self.min_90d,
+            'avg_90d': self.avg_90d,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+# Janelas (em dias) das estatísticas de mínimo/média
+PRICE_STATS_WINDOWS = (7, 30, 90)
+
+# Queda em relação ao preço original (0.25 = 25% abaixo)
+price_drop_expr = func.coalesce(case(
+    (Product.original_price > 0, (Product.original_price - Product.current_price) / Product.original_price),
+    else_=0.0
+), 0.0)
+
+# Colunas que as APIs paginadas podem projetar (fields=)
+PRODUCT_FIELDS = {
+    'id': Product.id,
+    'name': Product.name,
+    'url': Product.url,
+    'image_url': Product.image_url,
+    'original_price': Product.original_price,
+    'current_price': Product.current_price,
+    'price_drop': price_drop_expr,
+    'last_updated': Product.last_updated,
+    'created_at': Product.created_at,
+    'active': Product.active,
+    'refresh_interval': Product.refresh_interval,
+}
+HISTORY_FIELDS = {
+    'id': PriceHistory.id,
+    'product_id': PriceHistory.product_id,
+    'price': PriceHistory.price,
+    'timestamp': PriceHistory.timestamp,
+}
+# Ordenações de /api/products: (expressão, decrescente)
+PRODUCT_ORDERS = {
+    'id': (Product.id, False),
+    'last_updated': (Product.last_updated, True),
+    'price_drop': (price_drop_expr, True),
+}
+
 class Alert(Base):
     """Modelo para alertas de preço"""
     __tablename__ = 'alerts'
+    __table_args__ = (
+        Index('ix_alerts_active_product', 'active', 'product_id'),
+        Index('ix_alerts_chat_id', 'chat_id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
@@ -96,6 +231,7 @@ class Alert(Base):
     active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_triggered = Column(DateTime)
+    throttle_seconds = Column(Integer)  # Intervalo mínimo entre disparos (None = ALERT_THROTTLE_SECONDS)
     
     # Relacionamento
     product = relationship("Product", back_populates="alerts")
@@ -114,37 +250,128 @@ class Alert(Base):
             'percentage_threshold': self.percentage_threshold,
             'active': self.active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_triggered': self.last_triggered.isoformat() if self.last_triggered else None
+            'last_triggered': self.last_triggered.isoformat() if self.last_triggered else None,
+            'throttle_seconds': self.throttle_seconds
         }
 
-def init_database():
+class NotificationOutbox(Base):
+    """Fila persistente de notificações do Telegram (drenada pelo loop do bot)"""
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        Index('ix_notification_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(String(100), nullable=False)
+    alert_id = Column(Integer, ForeignKey('alerts.id'))
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    alert_type = Column(String(50), nullable=False)
+    old_price = Column(Float, nullable=False)
+    new_price = Column(Float, nullable=False)
+    status = Column(String(20), nullable=False, default='pending')  # 'pending', 'sent' ou 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+    last_error = Column(Text)
+    
+    def __repr__(self):
+        return f"<NotificationOutbox(id={self.id}, chat_id={self.chat_id}, status={self.status})>"
+
+def _apply_sqlite_pragmas(dbapi_connection, pragmas: Dict[str, Any]):
+    """Aplica os PRAGMAs do perfil de armazenamento em uma nova conexão"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def init_database(database_url: str = None, profile: str = None):
     """Inicializa o banco de dados"""
     global engine, SessionLocal
     
+    database_url = database_url or Config.DATABASE_URL
+    profile = profile or Config.DB_PROFILE
+    
     try:
-        # Cria o diretório de dados se não existir
-        db_path = Config.DATABASE_URL.replace('sqlite:///', '')
-        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        if engine is not None:
+            engine.dispose()
+        
+        is_sqlite = database_url.startswith('sqlite')
+        engine_options = {
+            'echo': False,  # Set to True for SQL debugging
+            'pool_pre_ping': True
+        }
+        
+        if is_sqlite:
+            # Cria o diretório de dados se não existir
+            db_path = database_url.replace('sqlite:///', '')
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            
+            pragmas = Config.DB_PROFILES.get(profile)
+            if pragmas is None:
+                raise ValueError(f"Perfil de banco desconhecido: {profile}")
+            
+            # Conexões compartilhadas entre as threads do agendador, do bot e do Flask
+            engine_options['connect_args'] = {
+                'check_same_thread': False,
+                'timeout': pragmas.get('busy_timeout', 5000) / 1000
+            }
+            if ':memory:' not in database_url:
+                engine_options.update(
+                    pool_size=Config.DB_POOL_SIZE,
+                    max_overflow=Config.DB_MAX_OVERFLOW,
+                    pool_timeout=Config.DB_POOL_TIMEOUT
+                )
         
         # Cria engine
-        engine = create_engine(
-            Config.DATABASE_URL,
-            echo=False,  # Set to True for SQL debugging
-            pool_pre_ping=True
-        )
+        engine = create_engine(database_url, **engine_options)
+        
+        if is_sqlite:
+            event.listen(engine, 'connect', lambda conn, _: _apply_sqlite_pragmas(conn, pragmas))
         
         # Cria SessionLocal
         SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        query_cache.clear()
         
         # Cria todas as tabelas
         Base.metadata.create_all(bind=engine)
         
-        logger.info("Banco de dados inicializado com sucesso")
+        # Aplica migrações pendentes (índices e alterações em bancos existentes)
+        run_migrations(engine)
+        
+        _backfill_price_stats()
+        
+        if is_sqlite:
+            logger.info(f"Banco de dados inicializado com sucesso (perfil '{profile}': {get_storage_info()})")
+        else:
+            logger.info("Banco de dados inicializado com sucesso")
         
     except Exception as e:
         logger.error(f"Erro ao inicializar banco de dados: {e}")
         raise
 
+def _backfill_price_stats():
+    """Reconstrói as estatísticas de preço de um banco existente que ainda não as tem
+    
+    get_lowest_price (alertas de mínimo histórico) lê só product_price_stats.
+    """
+    db = SessionLocal()
+    try:
+        missing = db.query(ProductPriceStats.product_id).first() is None and db.query(PriceHistory.id).first() is not None
+    finally:
+        db.close()
+    if missing:
+        logger.info("Tabela product_price_stats vazia: reconstruindo a partir do histórico")
+        DatabaseManager.rebuild_price_stats()
+
+def get_storage_info() -> Dict[str, Any]:
+    """Valores efetivos dos PRAGMAs de armazenamento do SQLite"""
+    names = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'busy_timeout')
+    with engine.connect() as conn:
+        return {name: conn.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
+
 def get_db() -> Session:
     """Retorna uma sessão do banco de dados"""
     if SessionLocal is None:
@@ -157,6 +384,174 @@ def get_db() -> Session:
         db.close()
         raise
 
+def _encode_cursor(sort_key: Any, row_id: int) -> str:
+    """Cursor opaco da paginação por chave: (valor da ordenação, id) da última linha"""
+    if isinstance(sort_key, datetime):
+        sort_key = sort_key.isoformat()
+    raw = json.dumps([sort_key, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def _decode_cursor(cursor: str, is_datetime: bool) -> Tuple[Any, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_key, row_id = json.loads(raw)
+        if is_datetime:
+            sort_key = datetime.fromisoformat(sort_key)
+        return sort_key, int(row_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+def _json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _keyset_page(columns: Dict[str, Any], fields: Optional[List[str]], filters: List[Any], id_column,
+                 sort_column, descending: bool, cursor: Optional[str], limit: int,
+                 as_rows: bool = False) -> Tuple[List[Any], Optional[str]]:
+    """Uma página ordenada por (sort_column, id) a partir do cursor, selecionando só as colunas pedidas
+    
+    Com as_rows os itens são tuplas na ordem de fields (serializadas direto, sem dicts).
+    """
+    selected = list(fields) if fields else list(columns)
+    unknown = [f for f in selected if f not in columns]
+    if unknown:
+        raise ValueError(f"Campos inválidos: {', '.join(unknown)}")
+    
+    db = get_db()
+    try:
+        query = db.query(
+            *[columns[f].label(f) for f in selected],
+            sort_column.label('_sort_key'),
+            id_column.label('_row_id')
+        ).filter(*filters)
+        
+        if cursor:
+            sort_key, row_id = _decode_cursor(cursor, isinstance(sort_column.type, DateTime))
+            position = tuple_(sort_column, id_column)
+            after = tuple_(literal(sort_key, sort_column.type), literal(row_id))
+            query = query.filter(position < after if descending else position > after)
+        
+        direction = desc if descending else asc
+        # Uma linha a mais indica se existe próxima página
+        rows = query.order_by(direction(sort_column), direction(id_column)).limit(limit + 1).all()
+    finally:
+        db.close()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1]._sort_key, rows[-1]._row_id)
+    
+    width = len(selected)
+    if as_rows:
+        return [tuple(row)[:width] for row in rows], next_cursor
+    items = [{f: _json_value(getattr(row, f)) for f in selected} for row in rows]
+    return items, next_cursor
+
+class QueryCache:
+    """Cache read-through em memória com validade (TTL) e descarte LRU"""
+    
+    def __init__(self, ttl: float = None, max_entries: int = None, enabled: bool = None):
+        self.ttl = Config.DB_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or Config.DB_CACHE_MAX_ENTRIES
+        self.enabled = Config.DB_CACHE_ENABLED if enabled is None else enabled
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # Geração por chave (incrementada a cada invalidação) e do cache todo (clear):
+        # uma carga que começou antes de uma gravação não guarda o valor antigo
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou carrega do banco (None não é guardado)"""
+        if not self.enabled:
+            return loader()
+        
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = (self._epoch, self._generations.get(key, 0))
+        
+        value = loader()
+        if value is not None:
+            with self._lock:
+                if generation != (self._epoch, self._generations.get(key, 0)):
+                    return value  # invalidada durante a carga: o valor pode estar desatualizado
+                self._entries[key] = (now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+    
+    def invalidate(self, *keys: Hashable):
+        """Remove chaves do cache (chamado após gravações)"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._generations[key] = self._generations.get(key, 0) + 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._epoch += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de acertos/falhas e ocupação do cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+# Cache das consultas de produto e estatísticas
+query_cache = QueryCache()
+
+def _publish_stats_delta(**delta: int):
+    """Publica a variação dos contadores do dashboard (total_products, active_alerts...)"""
+    get_event_bus().publish('stats', delta)
+
+def _publish_price_changes(changes: Dict[int, Dict[str, Any]], history_rows: List[Dict[str, Any]]):
+    """Publica as mudanças de preço já gravadas (só os produtos cujo preço mudou)"""
+    if not history_rows:
+        return
+    bus = get_event_bus()
+    changed_at = {row['product_id']: row['timestamp'] for row in history_rows}
+    for product_id, change in changes.items():
+        if not change['changed']:
+            continue
+        lowest = change['lowest_price']
+        bus.publish('price', {
+            'product_id': product_id,
+            'old_price': change['old_price'],
+            'new_price': change['new_price'],
+            'lowest_price': change['new_price'] if lowest is None else min(lowest, change['new_price']),
+            'timestamp': changed_at[product_id].isoformat()
+        })
+    _publish_stats_delta(total_price_records=len(history_rows))
+
+def _invalidate_products(product_ids: Iterable[int]):
+    """Invalida o produto, suas estatísticas de preço e os totais do banco"""
+    keys = [('db_stats',)]
+    for product_id in product_ids:
+        keys.extend([('product', product_id), ('price_stats', product_id)])
+    query_cache.invalidate(*keys)
+
 class DatabaseManager:
     """Gerenciador de operações do banco de dados"""
     
@@ -183,6 +578,8 @@ class DatabaseManager:
             db.add(product)
             db.commit()
             db.refresh(product)
+            query_cache.invalidate(('db_stats',))
+            _publish_stats_delta(total_products=1, active_products=1)
             
             # Adiciona primeiro registro no histórico
             DatabaseManager.add_price_history(product.id, price)
@@ -200,30 +597,86 @@ class DatabaseManager:
     @staticmethod
     def update_product_price(product_id: int, new_price: float) -> bool:
         """Atualiza o preço de um produto"""
+        changes = DatabaseManager.apply_price_updates([(product_id, new_price, datetime.utcnow())])
+        return product_id in changes
+    
+    @staticmethod
+    def apply_price_updates(results: Iterable[Tuple[int, float, datetime]]) -> Dict[int, Dict[str, Any]]:
+        """Aplica um lote de preços coletados em uma única transação
+        
+        Recebe tuplas (product_id, new_price, scraped_at). Atualiza os produtos com
+        um UPDATE em lote e insere histórico apenas onde o preço mudou. Retorna, por
+        produto aplicado, old_price, new_price, changed e lowest_price (menor preço
+        do histórico antes deste lote), evitando novas leituras na avaliação de alertas.
+        Produtos ausentes do retorno não foram gravados (erro de banco devolve {}).
+        """
+        results = list(results)
+        if not results:
+            return {}
+        
         db = get_db()
         try:
-            product = db.query(Product).filter(Product.id == product_id).first()
-            if not product:
-                logger.warning(f"Produto não encontrado: {product_id}")
-                return False
+            ids = list({product_id for product_id, _, _ in results})
+            current_prices = {}
+            lowest_prices = {}
+            # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                current_prices.update(
+                    db.query(Product.id, Product.current_price).filter(Product.id.in_(chunk)).all()
+                )
+                lowest_prices.update(
+                    db.query(ProductPriceStats.product_id, ProductPriceStats.lowest_price)
+                      .filter(ProductPriceStats.product_id.in_(chunk))
+                      .all()
+                )
             
-            old_price = product.current_price
-            product.current_price = new_price
-            product.last_updated = datetime.utcnow()
+            product_rows = {}
+            history_rows = []
+            changes = {}
             
-            db.commit()
+            for product_id, new_price, scraped_at in results:
+                if product_id not in current_prices:
+                    logger.warning(f"Produto não encontrado: {product_id}")
+                    continue
+                
+                old_price = current_prices[product_id]
+                changed = old_price != new_price
+                
+                product_rows[product_id] = {'id': product_id, 'current_price': new_price, 'last_updated': scraped_at}
+                if changed:
+                    history_rows.append({'product_id': product_id, 'price': new_price, 'timestamp': scraped_at})
+                
+                if product_id in changes:
+                    # Mesmo produto repetido no lote: preserva o preço anterior ao lote
+                    changes[product_id].update(new_price=new_price, changed=changes[product_id]['changed'] or changed)
+                else:
+                    changes[product_id] = {
+                        'old_price': old_price,
+                        'new_price': new_price,
+                        'changed': changed,
+                        'lowest_price': lowest_prices.get(product_id)
+                    }
+                current_prices[product_id] = new_price
             
-            # Adiciona ao histórico se o preço mudou
-            if old_price != new_price:
-                DatabaseManager.add_price_history(product_id, new_price)
-                logger.info(f"Preço atualizado para produto {product_id}: R$ {old_price} -> R$ {new_price}")
+            if product_rows:
+                db.execute(update(Product), list(product_rows.values()))
+            if history_rows:
+                db.execute(insert(PriceHistory), history_rows)
+                DatabaseManager._record_price_stats(
+                    db, [(row['product_id'], row['price'], row['timestamp']) for row in history_rows]
+                )
+            db.commit()
+            _invalidate_products(product_rows)
+            _publish_price_changes(changes, history_rows)
             
-            return True
+            logger.debug(f"Lote de preços aplicado: {len(product_rows)} produtos, {len(history_rows)} mudanças")
+            return changes
             
         except SQLAlchemyError as e:
             db.rollback()
-            logger.error(f"Erro ao atualizar preço: {e}")
-            return False
+            logger.error(f"Erro ao aplicar lote de preços: {e}")
+            return {}
         finally:
             db.close()
     
@@ -239,7 +692,11 @@ class DatabaseManager:
             )
             
             db.add(history)
+            db.flush()
+            DatabaseManager._record_price_stats(db, [(product_id, price, history.timestamp)])
             db.commit()
+            _invalidate_products([product_id])
+            _publish_stats_delta(total_price_records=1)
             return True
             
         except SQLAlchemyError as e:
@@ -260,10 +717,40 @@ class DatabaseManager:
     
     @staticmethod
     def get_product_by_id(product_id: int) -> Optional[Product]:
-        """Busca produto por ID"""
+        """Busca produto por ID (via cache)"""
+        def load():
+            db = get_db()
+            try:
+                return db.query(Product).filter(Product.id == product_id).first()
+            finally:
+                db.close()
+        return query_cache.get_or_load(('product', product_id), load)
+    
+    @staticmethod
+    def get_product_view(product_id: int, history_limit: int = 50) -> Optional[Dict[str, Any]]:
+        """Produto com estatísticas, alertas ativos e histórico recente, em dicionários prontos para exibição"""
         db = get_db()
         try:
-            return db.query(Product).filter(Product.id == product_id).first()
+            product = (db.query(Product)
+                         .options(joinedload(Product.price_stats))
+                         .filter(Product.id == product_id)
+                         .first())
+            if not product:
+                return None
+            
+            # Só os alertas ativos (índice active + product_id), em vez de carregar a relação inteira
+            alerts = db.query(Alert).filter(Alert.active == True, Alert.product_id == product_id).all()
+            history = (db.query(PriceHistory)
+                         .filter(PriceHistory.product_id == product_id)
+                         .order_by(desc(PriceHistory.timestamp))
+                         .limit(history_limit)
+                         .all())
+            
+            view = product.to_dict()
+            view['price_stats'] = product.price_stats.to_dict() if product.price_stats else None
+            view['alerts'] = [alert.to_dict() for alert in alerts]
+            view['price_history'] = [h.to_dict() for h in history]
+            return view
         finally:
             db.close()
     
@@ -279,6 +766,58 @@ class DatabaseManager:
         finally:
             db.close()
     
+    @staticmethod
+    def get_products_by_ids(product_ids: Sequence[int], active_only: bool = True) -> List[Product]:
+        """Produtos com os ids informados (consulta em blocos)"""
+        ids = list(set(product_ids))
+        db = get_db()
+        try:
+            products = []
+            for start in range(0, len(ids), 500):
+                query = db.query(Product).filter(Product.id.in_(ids[start:start + 500]))
+                if active_only:
+                    query = query.filter(Product.active == True)
+                products.extend(query.all())
+            return products
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_refresh_schedule(product_ids: Sequence[int] = None) -> List[Tuple[int, Optional[datetime], Optional[int], Optional[float]]]:
+        """(id, last_updated, refresh_interval, current_price) dos produtos ativos, para montar a agenda de atualização"""
+        db = get_db()
+        try:
+            query = db.query(Product.id, Product.last_updated, Product.refresh_interval, Product.current_price)\
+                      .filter(Product.active == True)
+            if product_ids is None:
+                return [tuple(row) for row in query]
+
+            ids = list(set(product_ids))
+            rows = []
+            # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+            for start in range(0, len(ids), 500):
+                rows.extend(tuple(row) for row in query.filter(Product.id.in_(ids[start:start + 500])))
+            return rows
+        finally:
+            db.close()
+    
+    @staticmethod
+    def set_refresh_interval(product_id: int, seconds: Optional[int]) -> bool:
+        """Define o intervalo de atualização de um produto (None volta ao padrão)"""
+        db = get_db()
+        try:
+            updated = db.query(Product).filter(Product.id == product_id)\
+                        .update({Product.refresh_interval: seconds}, synchronize_session=False)
+            db.commit()
+            query_cache.invalidate(('product', product_id))
+            return bool(updated)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Erro ao definir intervalo de atualização do produto {product_id}: {e}")
+            return False
+        finally:
+            db.close()
+    
     @staticmethod
     def get_price_history(product_id: int, limit: int = 100) -> List[PriceHistory]:
         """Retorna histórico de preços de um produto"""
@@ -292,22 +831,253 @@ class DatabaseManager:
         finally:
             db.close()
     
+    @staticmethod
+    def get_products_page(order: str = 'id', cursor: str = None, limit: int = 50, fields: List[str] = None,
+                          since: datetime = None, active_only: bool = True,
+                          as_rows: bool = False) -> Tuple[List[Any], Optional[str]]:
+        """Página de produtos (paginação por chave); retorna (itens, próximo cursor)"""
+        if order not in PRODUCT_ORDERS:
+            raise ValueError(f"Ordenação inválida: {order}")
+        sort_column, descending = PRODUCT_ORDERS[order]
+        
+        filters = []
+        if active_only:
+            filters.append(Product.active == True)
+        if since:
+            filters.append(Product.last_updated > since)
+        return _keyset_page(PRODUCT_FIELDS, fields, filters, Product.id, sort_column, descending, cursor, limit, as_rows)
+    
+    @staticmethod
+    def get_price_history_page(product_id: int, cursor: str = None, limit: int = 50, fields: List[str] = None,
+                               since: datetime = None, newest_first: bool = True,
+                               as_rows: bool = False) -> Tuple[List[Any], Optional[str]]:
+        """Página do histórico bruto de um produto (paginação por chave); retorna (itens, próximo cursor)"""
+        filters = [PriceHistory.product_id == product_id]
+        if since:
+            filters.append(PriceHistory.timestamp > since)
+        return _keyset_page(HISTORY_FIELDS, fields, filters, PriceHistory.id, PriceHistory.timestamp,
+                            newest_first, cursor, limit, as_rows)
+    
+    @staticmethod
+    def get_price_change_times(product_ids: Sequence[int] = None, since: datetime = None) -> List[Tuple[int, datetime]]:
+        """(product_id, timestamp) das mudanças de preço desde since (todos ou só os produtos informados)"""
+        db = get_db()
+        try:
+            query = db.query(PriceHistory.product_id, PriceHistory.timestamp)
+            if since is not None:
+                query = query.filter(PriceHistory.timestamp >= since)
+            if product_ids is None:
+                return [tuple(row) for row in query]
+
+            ids = list(set(product_ids))
+            rows = []
+            # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+            for start in range(0, len(ids), 500):
+                rows.extend(tuple(row) for row in query.filter(PriceHistory.product_id.in_(ids[start:start + 500])))
+            return rows
+        finally:
+            db.close()
+    
     @staticmethod
     def get_lowest_price(product_id: int) -> Optional[float]:
         """Retorna o menor preço já registrado para um produto"""
         db = get_db()
         try:
-            result = db.query(PriceHistory.price)\
-                      .filter(PriceHistory.product_id == product_id)\
-                      .order_by(PriceHistory.price)\
+            result = db.query(ProductPriceStats.lowest_price)\
+                      .filter(ProductPriceStats.product_id == product_id)\
                       .first()
             return result[0] if result else None
         finally:
             db.close()
     
+    @staticmethod
+    def get_price_stats(product_id: int) -> Optional[ProductPriceStats]:
+        """Retorna as estatísticas pré-agregadas de preço de um produto (via cache)"""
+        def load():
+            db = get_db()
+            try:
+                return db.query(ProductPriceStats).filter(ProductPriceStats.product_id == product_id).first()
+            finally:
+                db.close()
+        return query_cache.get_or_load(('price_stats', product_id), load)
+    
+    @staticmethod
+    def get_price_stats_map(product_ids: List[int]) -> Dict[int, ProductPriceStats]:
+        """Estatísticas de vários produtos em uma consulta"""
+        if not product_ids:
+            return {}
+        db = get_db()
+        try:
+            rows = db.query(ProductPriceStats).filter(ProductPriceStats.product_id.in_(list(product_ids))).all()
+            return {row.product_id: row for row in rows}
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _record_price_stats(db: Session, rows: List[Tuple[int, float, datetime]]):
+        """Atualiza product_price_stats com novos registros de histórico (na sessão do chamador)
+        
+        Mínimo/máximo, último preço e contagem são atualizados incrementalmente;
+        as janelas de 7/30/90 dias são recalculadas só para os produtos afetados.
+        """
+        if not rows:
+            return
+        
+        product_ids = list({product_id for product_id, _, _ in rows})
+        existing = {
+            row.product_id: row
+            for row in db.query(ProductPriceStats).filter(ProductPriceStats.product_id.in_(product_ids)).all()
+        }
+        
+        for product_id, price, timestamp in sorted(rows, key=lambda r: r[2]):
+            stats = existing.get(product_id)
+            if stats is None:
+                stats = ProductPriceStats(product_id=product_id, lowest_price=price, lowest_at=timestamp,
+                                          highest_price=price, highest_at=timestamp, change_count=0)
+                db.add(stats)
+                existing[product_id] = stats
+            else:
+                stats.change_count = (stats.change_count or 0) + 1
+                if stats.lowest_price is None or price < stats.lowest_price:
+                    stats.lowest_price, stats.lowest_at = price, timestamp
+                if stats.highest_price is None or price > stats.highest_price:
+                    stats.highest_price, stats.highest_at = price, timestamp
+            stats.last_price = price
+            stats.last_change_at = timestamp
+            stats.updated_at = datetime.utcnow()
+        
+        DatabaseManager._refresh_window_stats(db, existing)
+    
+    @staticmethod
+    def _refresh_window_stats(db: Session, stats_by_product: Dict[int, ProductPriceStats], now: datetime = None):
+        """Recalcula mínimo e média das janelas de 7/30/90 dias (uma consulta por janela)"""
+        db.flush()
+        now = now or datetime.utcnow()
+        product_ids = list(stats_by_product.keys())
+        
+        for days in PRICE_STATS_WINDOWS:
+            cutoff = now - timedelta(days=days)
+            # (mínimo, soma, quantidade) dos registros brutos e dos buckets já agregados
+            aggregates = {}
+            for start in range(0, len(product_ids), 500):
+                chunk = product_ids[start:start + 500]
+                raw = (db.query(PriceHistory.product_id, func.min(PriceHistory.price),
+                                func.sum(PriceHistory.price), func.count(PriceHistory.id))
+                         .filter(PriceHistory.product_id.in_(chunk), PriceHistory.timestamp >= cutoff)
+                         .group_by(PriceHistory.product_id))
+                buckets = (db.query(PriceHistoryBucket.product_id, func.min(PriceHistoryBucket.low),
+                                    func.sum(PriceHistoryBucket.price_sum), func.sum(PriceHistoryBucket.samples))
+                             .filter(PriceHistoryBucket.product_id.in_(chunk), PriceHistoryBucket.bucket_start >= cutoff)
+                             .group_by(PriceHistoryBucket.product_id))
+                for product_id, min_price, total, count in list(raw) + list(buckets):
+                    if product_id in aggregates:
+                        prev_min, prev_total, prev_count = aggregates[product_id]
+                        min_price = min(min_price, prev_min)
+                        total += prev_total
+                        count += prev_count
+                    aggregates[product_id] = (min_price, total, count)
+            
+            for product_id, stats in stats_by_product.items():
+                if product_id in aggregates:
+                    min_price, total, count = aggregates[product_id]
+                    avg_price = total / count
+                else:
+                    # O último preço continua valendo na janela mesmo sem registros nela
+                    min_price = avg_price = stats.last_price
+                if stats.last_price is not None and min_price is not None:
+                    min_price = min(min_price, stats.last_price)
+                setattr(stats, f'min_{days}d', min_price)
+                setattr(stats, f'avg_{days}d', round(avg_price, 2) if avg_price is not None else None)
+    
+    @staticmethod
+    def refresh_window_stats(now: datetime = None) -> int:
+        """Recalcula as janelas de 7/30/90 dias de todos os produtos
+        
+        Executado diariamente (após o rollup): registros antigos só saem das janelas
+        assim, já que produtos de preço estável não geram novos registros.
+        """
+        db = get_db()
+        try:
+            product_ids = [row[0] for row in db.query(ProductPriceStats.product_id)]
+            for start in range(0, len(product_ids), 500):
+                chunk = product_ids[start:start + 500]
+                stats = {
+                    row.product_id: row
+                    for row in db.query(ProductPriceStats).filter(ProductPriceStats.product_id.in_(chunk))
+                }
+                DatabaseManager._refresh_window_stats(db, stats, now)
+                db.commit()
+                query_cache.invalidate(*(('price_stats', product_id) for product_id in chunk))
+            
+            logger.info(f"Janelas de estatísticas de preço recalculadas para {len(product_ids)} produtos")
+            return len(product_ids)
+            
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Erro ao recalcular janelas de estatísticas de preço: {e}")
+            return 0
+        finally:
+            db.close()
+    
+    @staticmethod
+    def rebuild_price_stats(product_ids: List[int] = None) -> int:
+        """Reconstrói product_price_stats a partir do histórico (backfill de bancos existentes)"""
+        db = get_db()
+        try:
+            query = db.query(PriceHistory.product_id, PriceHistory.price, PriceHistory.price,
+                             PriceHistory.price, PriceHistory.timestamp, literal(1))
+            bucket_query = db.query(PriceHistoryBucket.product_id, PriceHistoryBucket.low, PriceHistoryBucket.high,
+                                    PriceHistoryBucket.close, PriceHistoryBucket.bucket_start, PriceHistoryBucket.samples)
+            delete_query = db.query(ProductPriceStats)
+            if product_ids:
+                query = query.filter(PriceHistory.product_id.in_(product_ids))
+                bucket_query = bucket_query.filter(PriceHistoryBucket.product_id.in_(product_ids))
+                delete_query = delete_query.filter(ProductPriceStats.product_id.in_(product_ids))
+            delete_query.delete(synchronize_session=False)
+            
+            # Buckets agregados (mais antigos) antes dos registros brutos; cada linha
+            # é (produto, mínimo, máximo, último, momento, registros)
+            rows = chain(
+                bucket_query.order_by(PriceHistoryBucket.product_id, PriceHistoryBucket.bucket_start).yield_per(1000),
+                query.order_by(PriceHistory.product_id, PriceHistory.timestamp).yield_per(1000)
+            )
+            
+            rebuilt = {}
+            for product_id, low, high, last, timestamp, samples in rows:
+                stats = rebuilt.get(product_id)
+                if stats is None:
+                    stats = ProductPriceStats(product_id=product_id, lowest_price=low, lowest_at=timestamp,
+                                              highest_price=high, highest_at=timestamp, change_count=samples - 1)
+                    rebuilt[product_id] = stats
+                else:
+                    stats.change_count += samples
+                    if low < stats.lowest_price:
+                        stats.lowest_price, stats.lowest_at = low, timestamp
+                    if high > stats.highest_price:
+                        stats.highest_price, stats.highest_at = high, timestamp
+                stats.last_price = last
+                stats.last_change_at = timestamp
+                stats.updated_at = datetime.utcnow()
+            
+            db.add_all(rebuilt.values())
+            DatabaseManager._refresh_window_stats(db, rebuilt)
+            db.commit()
+            query_cache.clear()
+            
+            logger.info(f"Estatísticas de preço reconstruídas para {len(rebuilt)} produtos")
+            return len(rebuilt)
+            
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Erro ao reconstruir estatísticas de preço: {e}")
+            return 0
+        finally:
+            db.close()
+    
     @staticmethod
     def add_alert(product_id: int, chat_id: str, alert_type: str, 
-                  threshold_price: float = None, percentage_threshold: float = None) -> Optional[Alert]:
+                  threshold_price: float = None, percentage_threshold: float = None,
+                  throttle_seconds: int = None) -> Optional[Alert]:
         """Adiciona um novo alerta"""
         db = get_db()
         try:
@@ -328,12 +1098,15 @@ class DatabaseManager:
                 chat_id=chat_id,
                 alert_type=alert_type,
                 threshold_price=threshold_price,
-                percentage_threshold=percentage_threshold
+                percentage_threshold=percentage_threshold,
+                throttle_seconds=throttle_seconds
             )
             
             db.add(alert)
             db.commit()
             db.refresh(alert)
+            query_cache.invalidate(('db_stats',))
+            _publish_stats_delta(total_alerts=1, active_alerts=1)
             
             logger.info(f"Alerta adicionado: produto {product_id}, tipo {alert_type}")
             return alert
@@ -358,13 +1131,81 @@ class DatabaseManager:
             db.close()
     
     @staticmethod
-    def update_alert_triggered(alert_id: int) -> bool:
+    def get_alert_type_counts() -> Dict[str, int]:
+        """Quantidade de alertas ativos por tipo"""
+        db = get_db()
+        try:
+            return dict(db.query(Alert.alert_type, func.count(Alert.id))
+                          .filter(Alert.active == True)
+                          .group_by(Alert.alert_type).all())
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_alert_entries(product_ids: Sequence[int] = None) -> List[Tuple]:
+        """Alertas ativos como tuplas (id, product_id, chat_id, alert_type, threshold_price,
+        percentage_threshold, throttle_seconds)
+
+        Leitura só das colunas, sem objetos ORM, para montar o índice de avaliação.
+        """
+        columns = (Alert.id, Alert.product_id, Alert.chat_id, Alert.alert_type,
+                   Alert.threshold_price, Alert.percentage_threshold, Alert.throttle_seconds)
+        db = get_db()
+        try:
+            query = db.query(*columns).filter(Alert.active == True)
+            if product_ids is None:
+                return [tuple(row) for row in query.all()]
+
+            ids = list(set(product_ids))
+            rows = []
+            # Consulta em blocos para respeitar o limite de parâmetros do SQLite
+            for start in range(0, len(ids), 500):
+                rows.extend(tuple(row) for row in query.filter(Alert.product_id.in_(ids[start:start + 500])))
+            return rows
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_alert_trigger_times() -> List[Tuple[int, datetime, Optional[int]]]:
+        """(id, last_triggered, throttle_seconds) dos alertas ativos já disparados (estado do throttling)"""
+        db = get_db()
+        try:
+            query = db.query(Alert.id, Alert.last_triggered, Alert.throttle_seconds)\
+                      .filter(Alert.active == True, Alert.last_triggered.isnot(None))
+            return [tuple(row) for row in query]
+        finally:
+            db.close()
+
+    @staticmethod
+    def get_alert_views(chat_id: str = None, product_id: int = None, active_only: bool = True) -> List[Dict[str, Any]]:
+        """Alertas filtrados no SQL, com o produto carregado na mesma consulta (dicionários prontos para exibição)"""
+        db = get_db()
+        try:
+            query = db.query(Alert).options(joinedload(Alert.product))
+            if active_only:
+                query = query.filter(Alert.active == True)
+            if chat_id is not None:
+                query = query.filter(Alert.chat_id == str(chat_id))
+            if product_id:
+                query = query.filter(Alert.product_id == product_id)
+            
+            views = []
+            for alert in query.order_by(Alert.id).all():
+                view = alert.to_dict()
+                view['product'] = alert.product.to_dict()
+                views.append(view)
+            return views
+        finally:
+            db.close()
+    
+    @staticmethod
+    def update_alert_triggered(alert_id: int, triggered_at: datetime = None) -> bool:
         """Marca um alerta como disparado"""
         db = get_db()
         try:
             alert = db.query(Alert).filter(Alert.id == alert_id).first()
             if alert:
-                alert.last_triggered = datetime.utcnow()
+                alert.last_triggered = triggered_at or datetime.utcnow()
                 db.commit()
                 return True
             return False
@@ -375,6 +1216,129 @@ class DatabaseManager:
         finally:
             db.close()
     
+    @staticmethod
+    def trigger_alerts(alert_ids: Sequence[int], triggered_at: datetime,
+                       notifications: List[Dict[str, Any]]) -> bool:
+        """Marca os alertas como disparados e insere suas notificações na fila de saída
+        na mesma transação: ou ambos são gravados, ou nenhum"""
+        db = get_db()
+        try:
+            if notifications:
+                db.execute(insert(NotificationOutbox), notifications)
+            for start in range(0, len(alert_ids), 500):
+                db.query(Alert).filter(Alert.id.in_(alert_ids[start:start + 500]))\
+                  .update({Alert.last_triggered: triggered_at}, synchronize_session=False)
+            db.commit()
+            return True
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Erro ao registrar alertas disparados: {e}")
+            return False
+        finally:
+            db.close()
+    
+    @staticmethod
+    def enqueue_notifications(rows: List[Dict[str, Any]]) -> int:
+        """Insere notificações na fila de saída (chat_id, alert_id, product_id, alert_type,
+        old_price, new_price, next_attempt_at) em uma transação"""
+        if not rows:
+            return 0
+        db = get_db()
+        try:
+            db.execute(insert(NotificationOutbox), rows)
+            db.commit()
+            return len(rows)
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Erro ao enfileirar notificações: {e}")
+            return 0
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_due_notifications(now: datetime, limit: int = 500) -> List[Dict[str, Any]]:
+        """Notificações pendentes com tentativa vencida, com nome, URL e estatísticas de preço do produto
+
+        As estatísticas vêm na mesma consulta: a formatação roda no event loop do bot.
+        """
+        db = get_db()
+        try:
+            rows = db.query(NotificationOutbox, Product.name, Product.url, ProductPriceStats)\
+                     .join(Product, Product.id == NotificationOutbox.product_id)\
+                     .outerjoin(ProductPriceStats, ProductPriceStats.product_id == NotificationOutbox.product_id)\
+                     .filter(NotificationOutbox.status == 'pending', NotificationOutbox.next_attempt_at <= now)\
+                     .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)\
+                     .limit(limit).all()
+            return [{
+                'id': item.id,
+                'chat_id': item.chat_id,
+                'alert_id': item.alert_id,
+                'product_id': item.product_id,
+                'product_name': name,
+                'product_url': url,
+                'alert_type': item.alert_type,
+                'old_price': item.old_price,
+                'new_price': item.new_price,
+                'price_stats': price_stats,
+                'attempts': item.attempts
+            } for item, name, url, price_stats in rows]
+        finally:
+            db.close()
+    
+    @staticmethod
+    def finish_notifications(ids: Sequence[int], status: str, when: datetime = None,
+                             next_attempt_at: datetime = None, error: str = None) -> bool:
+        """Atualiza o resultado de uma entrega: 'sent', 'failed' ou 'pending' (nova tentativa em next_attempt_at)"""
+        if not ids:
+            return True
+        values = {NotificationOutbox.status: status, NotificationOutbox.attempts: NotificationOutbox.attempts + 1}
+        if status == 'sent':
+            values[NotificationOutbox.sent_at] = when or datetime.utcnow()
+        if next_attempt_at is not None:
+            values[NotificationOutbox.next_attempt_at] = next_attempt_at
+        if error is not None:
+            values[NotificationOutbox.last_error] = error[:500]
+        
+        db = get_db()
+        try:
+            db.query(NotificationOutbox).filter(NotificationOutbox.id.in_(list(ids)))\
+              .update(values, synchronize_session=False)
+            db.commit()
+            return True
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Erro ao atualizar notificações: {e}")
+            return False
+        finally:
+            db.close()
+    
+    @staticmethod
+    def purge_notifications(before: datetime) -> int:
+        """Remove notificações entregues (ou descartadas) antes de before"""
+        db = get_db()
+        try:
+            deleted = db.query(NotificationOutbox)\
+                        .filter(NotificationOutbox.status != 'pending', NotificationOutbox.created_at < before)\
+                        .delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Erro ao limpar notificações: {e}")
+            return 0
+        finally:
+            db.close()
+    
+    @staticmethod
+    def get_outbox_counts() -> Dict[str, int]:
+        """Quantidade de notificações por status"""
+        db = get_db()
+        try:
+            return dict(db.query(NotificationOutbox.status, func.count(NotificationOutbox.id))
+                          .group_by(NotificationOutbox.status).all())
+        finally:
+            db.close()
+    
     @staticmethod
     def deactivate_product(product_id: int) -> bool:
         """Desativa um produto (não o remove, apenas marca como inativo)"""
@@ -382,8 +1346,12 @@ class DatabaseManager:
         try:
             product = db.query(Product).filter(Product.id == product_id).first()
             if product:
+                was_active = product.active
                 product.active = False
                 db.commit()
+                _invalidate_products([product_id])
+                if was_active:
+                    _publish_stats_delta(active_products=-1)
                 logger.info(f"Produto {product_id} desativado")
                 return True
             return False
@@ -396,17 +1364,24 @@ class DatabaseManager:
     
     @staticmethod
     def get_database_stats() -> Dict[str, Any]:
-        """Retorna estatísticas do banco de dados"""
-        db = get_db()
-        try:
-            stats = {
-                'total_products': db.query(Product).count(),
-                'active_products': db.query(Product).filter(Product.active == True).count(),
-                'total_price_records': db.query(PriceHistory).count(),
-                'total_alerts': db.query(Alert).count(),
-                'active_alerts': db.query(Alert).filter(Alert.active == True).count()
-            }
-            return stats
-        finally:
-            db.close()
+        """Retorna estatísticas do banco de dados (uma consulta agregada, via cache)"""
+        def load():
+            db = get_db()
+            try:
+                row = db.execute(select(
+                    select(func.count(Product.id)).scalar_subquery().label('total_products'),
+                    select(func.count(Product.id)).where(Product.active == True).scalar_subquery().label('active_products'),
+                    select(func.count(PriceHistory.id)).scalar_subquery().label('total_price_records'),
+                    select(func.count(Alert.id)).scalar_subquery().label('total_alerts'),
+                    select(func.count(Alert.id)).where(Alert.active == True).scalar_subquery().label('active_alerts')
+                )).one()
+                return dict(row._mapping)
+            finally:
+                db.close()
+        return dict(query_cache.get_or_load(('db_stats',), load))
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """Acertos/falhas do cache de consultas"""
+        return query_cache.get_stats()
 
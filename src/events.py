@@ -0,0 +1,167 @@
+"""
+Barramento de eventos em processo (publish/subscribe)
+Mudanças de preço, alertas disparados e deltas de contadores publicados pelo
+banco e pelo gerenciador de alertas; a interface web repassa via SSE
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+class Event:
+    """Um evento publicado no barramento
+
+    O id ("<boot>-<seq>") inclui a época do processo: depois de um reinício a
+    sequência recomeça, mas um Last-Event-ID antigo não é confundido com um novo.
+    """
+
+    def __init__(self, boot: str, seq: int, event_type: str, data: Dict[str, Any]):
+        self.seq = seq
+        self.id = f"{boot}-{seq}"
+        self.type = event_type
+        self.data = data
+        self.timestamp = time.time()
+        self._sse = None
+
+    @property
+    def product_id(self) -> Optional[int]:
+        return self.data.get('product_id')
+
+    def to_sse(self) -> str:
+        """Formato text/event-stream (serializado uma única vez para todos os assinantes)"""
+        if self._sse is None:
+            payload = json.dumps(self.data, default=str, separators=(',', ':'))
+            self._sse = f"id: {self.id}\nevent: {self.type}\ndata: {payload}\n\n"
+        return self._sse
+
+class Subscription:
+    """Fila de um assinante; se encher, descarta os mais antigos e sinaliza ressincronização"""
+
+    def __init__(self, max_queue: int, product_id: int = None):
+        self.product_id = product_id
+        self.dropped = 0
+        self._queue: Deque[Event] = deque()
+        self._max_queue = max_queue
+        self._condition = threading.Condition()
+
+    def accepts(self, event: Event) -> bool:
+        # Assinatura de um produto só recebe eventos desse produto
+        return self.product_id is None or event.product_id == self.product_id
+
+    def put(self, event: Event):
+        with self._condition:
+            if len(self._queue) >= self._max_queue:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(event)
+            self._condition.notify()
+
+    def get(self, timeout: float = None) -> List[Event]:
+        """Aguarda e retorna todos os eventos pendentes (lista vazia no timeout)"""
+        with self._condition:
+            if not self._queue:
+                self._condition.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            return events
+
+    def take_dropped(self) -> int:
+        """Eventos perdidos desde a última chamada (o cliente deve recarregar o estado)"""
+        with self._condition:
+            dropped, self.dropped = self.dropped, 0
+            return dropped
+
+def _base36(number: int) -> str:
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    text = ''
+    while True:
+        number, remainder = divmod(number, 36)
+        text = digits[remainder] + text
+        if not number:
+            return text
+
+class EventBus:
+    """Distribui eventos para os assinantes sem bloquear quem publica"""
+
+    def __init__(self, max_queue: int = None, history_size: int = None, max_subscribers: int = None):
+        self.max_queue = max_queue or Config.EVENTS_QUEUE_SIZE
+        self.max_subscribers = max_subscribers or Config.SSE_MAX_CLIENTS
+        # Eventos recentes para reenvio a clientes que reconectam (Last-Event-ID)
+        self._history: Deque[Event] = deque(maxlen=history_size or Config.EVENTS_HISTORY_SIZE)
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        # Época desta instância (ms desde 1970 em base 36), prefixo dos ids dos eventos
+        self.boot = _base36(int(time.time() * 1000))
+        self._next_seq = 1
+        self.published = 0
+
+    def publish(self, event_type: str, data: Dict[str, Any]) -> Event:
+        """Publica um evento para todos os assinantes interessados"""
+        with self._lock:
+            event = Event(self.boot, self._next_seq, event_type, data)
+            self._next_seq += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+            self.published += 1
+
+        for subscription in subscribers:
+            if subscription.accepts(event):
+                subscription.put(event)
+        return event
+
+    def _parse_event_id(self, last_event_id: str) -> Optional[int]:
+        """Sequência de um Last-Event-ID desta instância (None se for de outra época ou inválido)"""
+        boot, _, seq = last_event_id.partition('-')
+        if boot != self.boot or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscribe(self, last_event_id: str = None, product_id: int = None) -> Optional[Subscription]:
+        """Cria uma assinatura (None se o limite de clientes foi atingido)"""
+        subscription = Subscription(self.max_queue, product_id)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                logger.warning(f"Limite de {self.max_subscribers} assinantes de eventos atingido")
+                return None
+            if last_event_id is not None:
+                last_seq = self._parse_event_id(last_event_id)
+                if last_seq is None or last_seq >= self._next_seq:
+                    # Id de antes de um reinício (ou desconhecido): nada a reenviar, recarrega o estado
+                    subscription.dropped += 1
+                else:
+                    missed = [e for e in self._history if e.seq > last_seq and subscription.accepts(e)]
+                    # Histórico não cobre a desconexão: o cliente precisa recarregar o estado
+                    if self._history and self._history[0].seq > last_seq + 1:
+                        subscription.dropped += 1
+                    for event in missed:
+                        subscription.put(event)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Assinantes conectados e eventos publicados"""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'last_event_id': f"{self.boot}-{self._next_seq - 1}"
+            }
+
+# Instância global
+event_bus = EventBus()
+
+def get_event_bus() -> EventBus:
+    """Retorna a instância global do barramento de eventos"""
+    return event_bus
@@ -0,0 +1,134 @@
+"""
+Etapa única de extração de HTML para o Bot de Monitoramento de Preços
+Faz o parse de cada documento uma só vez e reúne nome, preço, imagem, JSON-LD e microdados
+"""
+
+import logging
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+from scraper_utils import extract_all_brl, parse_jsonld_prices
+
+logger = logging.getLogger(__name__)
+
+# Usa o parser mais rápido disponível (lxml é C; html.parser é Python puro)
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+@lru_cache(maxsize=512)
+def compile_selector(selector: str):
+    """Compila (uma única vez por processo) um seletor CSS"""
+    return soupsieve.compile(selector)
+
+class Extraction:
+    """Documento HTML parseado uma vez, com os dados estruturados coletados em uma passada"""
+
+    def __init__(self, content, url: str = ""):
+        self.url = url
+        self.soup = BeautifulSoup(content, HTML_PARSER)
+
+        self.jsonld: List[str] = []      # conteúdo dos scripts application/ld+json
+        self.meta: Dict[str, str] = {}   # og:*, twitter:*, description...
+        self.microdata: Dict[str, object] = {}  # itemprop -> primeira tag
+        self.images: List[Tuple[str, str]] = []  # (alt, src)
+
+        self._text = None
+        self._brl_values = None
+        self._jsonld_prices = None
+
+        self._scan()
+
+    def _scan(self):
+        """Percorre a árvore uma única vez coletando os dados estruturados"""
+        for tag in self.soup.find_all(True):
+            name = tag.name
+
+            if name == 'script':
+                if tag.get('type', '').lower() == 'application/ld+json':
+                    self.jsonld.append(tag.string or tag.get_text())
+                continue
+
+            if name == 'img':
+                src = tag.get('src')
+                if src:
+                    self.images.append((tag.get('alt') or '', src))
+            elif name == 'meta':
+                key = tag.get('property') or tag.get('name')
+                content = tag.get('content')
+                if key and content and key.lower() not in self.meta:
+                    self.meta[key.lower()] = content
+
+            itemprop = tag.get('itemprop')
+            if itemprop and itemprop not in self.microdata:
+                self.microdata[itemprop] = tag
+
+    def select_one(self, selector: str):
+        """select_one com seletor compilado em cache"""
+        return compile_selector(selector).select_one(self.soup)
+
+    def select_text(self, selectors: Iterable[str]) -> str:
+        """Retorna o texto do primeiro seletor que encontrar conteúdo"""
+        for selector in selectors:
+            element = self.select_one(selector)
+            if element:
+                text = element.get_text(strip=True)
+                if text:
+                    return text
+        return ""
+
+    def microdata_value(self, prop: str) -> Optional[str]:
+        """Valor de um itemprop (atributo content/src/href ou texto)"""
+        tag = self.microdata.get(prop)
+        if tag is None:
+            return None
+        for attr in ('content', 'src', 'href'):
+            if tag.get(attr):
+                return tag[attr]
+        return tag.get_text(" ", strip=True) or None
+
+    def find_image(self, name: str = "") -> str:
+        """Imagem do produto: <img> cujo alt contém o nome, og:image ou microdado"""
+        prefix = (name or "")[:20].lower()
+        if prefix:
+            for alt, src in self.images:
+                if prefix in alt.lower():
+                    return urljoin(self.url, src)
+
+        image = self.meta.get('og:image') or self.microdata_value('image')
+        return urljoin(self.url, image) if image else ""
+
+    @property
+    def title(self) -> Optional[str]:
+        """Título via og:title ou microdado name"""
+        return self.meta.get('og:title') or self.microdata_value('name')
+
+    @property
+    def text(self) -> str:
+        """Texto completo do documento (calculado uma vez)"""
+        if self._text is None:
+            self._text = self.soup.get_text(" ", strip=True)
+        return self._text
+
+    @property
+    def brl_values(self) -> List[Tuple[float, str]]:
+        """Todos os valores 'R$ ...' do texto do documento (calculado uma vez)"""
+        if self._brl_values is None:
+            self._brl_values = extract_all_brl(self.text)
+        return self._brl_values
+
+    def jsonld_prices(self):
+        """Preços, moeda e disponibilidade dos blocos JSON-LD (calculado uma vez)"""
+        if self._jsonld_prices is None:
+            self._jsonld_prices = parse_jsonld_prices(self.jsonld)
+        return self._jsonld_prices
+
+def extract_document(content, url: str = "") -> Extraction:
+    """Ponto de entrada da etapa de extração compartilhada pelos parsers de site"""
+    return content if isinstance(content, Extraction) else Extraction(content, url)
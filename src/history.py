@@ -0,0 +1,260 @@
+"""
+Retenção e downsampling do histórico de preços
+Registros brutos ficam por HISTORY_RAW_RETENTION_DAYS; depois viram buckets OHLC
+por hora e, passados HISTORY_HOURLY_RETENTION_DAYS, buckets por dia. As séries
+dos gráficos escolhem a resolução pelo período pedido.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from config.settings import Config
+from src.database import get_db, query_cache, DatabaseManager, PriceHistory, PriceHistoryBucket
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Resoluções das séries, da mais fina para a mais grossa ('hour' e 'day' são as armazenadas)
+RESOLUTIONS = [
+    ('hour', timedelta(hours=1)),
+    ('day', timedelta(days=1)),
+    ('week', timedelta(days=7)),
+    ('month', timedelta(days=30)),
+]
+RESOLUTION_STEPS = dict(RESOLUTIONS)
+
+# Períodos aceitos pela API de histórico (None = todo o histórico)
+HISTORY_RANGES = {
+    '24h': timedelta(days=1),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+    '90d': timedelta(days=90),
+    '1y': timedelta(days=365),
+    'all': None,
+}
+
+# Segmento: (produto, início, abertura, máxima, mínima, fechamento, registros, soma dos preços)
+Segment = Tuple[int, datetime, float, float, float, float, int, float]
+
+def floor_time(ts: datetime, step: timedelta) -> datetime:
+    """Início do bucket de tamanho step que contém ts (alinhado à época, em UTC)"""
+    return EPOCH + ((ts - EPOCH) // step) * step
+
+def aggregate_segments(segments: Iterable[Segment], step: timedelta) -> Dict[Tuple[int, datetime], List]:
+    """Agrega segmentos em ordem cronológica em buckets OHLC de tamanho step"""
+    buckets: Dict[Tuple[int, datetime], List] = {}
+    for product_id, start, open_, high, low, close, samples, price_sum in segments:
+        key = (product_id, floor_time(start, step))
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [open_, high, low, close, samples, price_sum]
+        else:
+            bucket[1] = max(bucket[1], high)
+            bucket[2] = min(bucket[2], low)
+            bucket[3] = close
+            bucket[4] += samples
+            bucket[5] += price_sum
+    return buckets
+
+class HistoryManager:
+    """Rollup/retenção do histórico e séries com resolução adaptada ao período"""
+
+    def __init__(self, raw_retention_days: int = None, hourly_retention_days: int = None,
+                 max_points: int = None):
+        self.raw_retention = timedelta(days=raw_retention_days or Config.HISTORY_RAW_RETENTION_DAYS)
+        self.hourly_retention = timedelta(days=hourly_retention_days or Config.HISTORY_HOURLY_RETENTION_DAYS)
+        self.max_points = max_points or Config.HISTORY_MAX_POINTS
+        self.last_rollup = {}
+
+    def rollup(self, now: datetime = None) -> Dict[str, Any]:
+        """Agrega o histórico antigo (bruto -> hora -> dia) e remove o que foi agregado"""
+        now = now or datetime.utcnow()
+        started = time.monotonic()
+        # Cortes alinhados ao bucket: um bucket nunca fica com parte dos dados ainda bruta
+        raw_cutoff = floor_time(now - self.raw_retention, RESOLUTION_STEPS['hour'])
+        hourly_cutoff = floor_time(now - self.hourly_retention, RESOLUTION_STEPS['day'])
+        stats = {'raw_rolled': 0, 'hour_buckets': 0, 'hour_rolled': 0, 'day_buckets': 0}
+
+        db = get_db()
+        try:
+            raw_query = db.query(PriceHistory).filter(PriceHistory.timestamp < raw_cutoff)
+            raw_segments = (
+                (product_id, timestamp, price, price, price, price, 1, price)
+                for product_id, price, timestamp in
+                raw_query.with_entities(PriceHistory.product_id, PriceHistory.price, PriceHistory.timestamp)
+                         .order_by(PriceHistory.product_id, PriceHistory.timestamp)
+                         .yield_per(1000)
+            )
+            stats['hour_buckets'] = self._store_buckets(db, 'hour', aggregate_segments(raw_segments, RESOLUTION_STEPS['hour']))
+            stats['raw_rolled'] = raw_query.delete(synchronize_session=False)
+
+            hour_query = db.query(PriceHistoryBucket).filter(PriceHistoryBucket.resolution == 'hour',
+                                                             PriceHistoryBucket.bucket_start < hourly_cutoff)
+            hour_segments = (
+                (b.product_id, b.bucket_start, b.open, b.high, b.low, b.close, b.samples, b.price_sum)
+                for b in hour_query.order_by(PriceHistoryBucket.product_id, PriceHistoryBucket.bucket_start).yield_per(1000)
+            )
+            stats['day_buckets'] = self._store_buckets(db, 'day', aggregate_segments(hour_segments, RESOLUTION_STEPS['day']))
+            stats['hour_rolled'] = hour_query.delete(synchronize_session=False)
+
+            db.commit()
+            # Total de registros de histórico mudou
+            query_cache.invalidate(('db_stats',))
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Erro no rollup do histórico de preços: {e}")
+            return {}
+        finally:
+            db.close()
+
+        # Preços parados também precisam sair das janelas de 7/30/90 dias
+        stats['price_stats_refreshed'] = DatabaseManager.refresh_window_stats(now)
+
+        stats['duration_seconds'] = round(time.monotonic() - started, 3)
+        stats['finished_at'] = now.isoformat()
+        self.last_rollup = stats
+        logger.info(
+            f"Rollup do histórico: {stats['raw_rolled']} registros brutos -> {stats['hour_buckets']} buckets/hora, "
+            f"{stats['hour_rolled']} buckets/hora -> {stats['day_buckets']} buckets/dia"
+        )
+        return stats
+
+    def _store_buckets(self, db, resolution: str, buckets: Dict[Tuple[int, datetime], List]) -> int:
+        """Grava os buckets, mesclando com buckets já existentes no mesmo intervalo"""
+        if not buckets:
+            return 0
+
+        # Normalmente não há sobreposição (os cortes só avançam); mescla registros atrasados
+        first_start = min(start for _, start in buckets)
+        existing = {
+            (b.product_id, b.bucket_start): b
+            for b in db.query(PriceHistoryBucket).filter(PriceHistoryBucket.resolution == resolution,
+                                                         PriceHistoryBucket.bucket_start >= first_start)
+        }
+
+        for (product_id, start), (open_, high, low, close, samples, price_sum) in buckets.items():
+            bucket = existing.get((product_id, start))
+            if bucket is None:
+                db.add(PriceHistoryBucket(product_id=product_id, resolution=resolution, bucket_start=start,
+                                          open=open_, high=high, low=low, close=close,
+                                          samples=samples, price_sum=price_sum))
+            else:
+                bucket.high = max(bucket.high, high)
+                bucket.low = min(bucket.low, low)
+                bucket.close = close
+                bucket.samples += samples
+                bucket.price_sum += price_sum
+        db.flush()
+        return len(buckets)
+
+    def get_series(self, product_id: int, range_key: str = '30d', now: datetime = None) -> Dict[str, Any]:
+        """Série de preços do período com no máximo ~max_points pontos"""
+        if range_key not in HISTORY_RANGES:
+            raise ValueError(f"Período inválido: {range_key}")
+
+        end = now or datetime.utcnow()
+        span = HISTORY_RANGES[range_key]
+        start = end - span if span else None
+
+        db = get_db()
+        try:
+            segments = self._load_segments(db, product_id, start, end)
+            previous = self._price_before(db, product_id, start) if start else None
+        finally:
+            db.close()
+
+        raw_only = all(s[-1] == 'raw' for s in segments)
+        if raw_only and len(segments) <= self.max_points:
+            resolution = 'raw'
+            points = [self._point(ts, o, h, l, c, n) for _, ts, o, h, l, c, n, _, _ in segments]
+        else:
+            first = start or (segments[0][1] if segments else end)
+            coarsest_stored = max((RESOLUTION_STEPS[s[-1]] for s in segments if s[-1] != 'raw'), default=timedelta(0))
+            resolution, step = RESOLUTIONS[-1]
+            for name, candidate in RESOLUTIONS:
+                if candidate >= coarsest_stored and (end - first) / candidate <= self.max_points:
+                    resolution, step = name, candidate
+                    break
+            buckets = aggregate_segments((s[:8] for s in segments), step)
+            points = [self._point(bucket_start, o, h, l, c, n)
+                      for (_, bucket_start), (o, h, l, c, n, _) in buckets.items()]
+
+        # Preço vigente no início do período (o último antes dele continua valendo)
+        if previous is not None and (not points or points[0]['timestamp'] > start.isoformat()):
+            points.insert(0, self._point(start, previous, previous, previous, previous, 0))
+
+        return {
+            'product_id': product_id,
+            'range': range_key,
+            'resolution': resolution,
+            'points': points
+        }
+
+    @staticmethod
+    def _load_segments(db, product_id: int, start: Optional[datetime], end: datetime) -> List[Tuple]:
+        """Buckets e registros brutos do período em ordem cronológica (com a origem no fim)"""
+        bucket_query = db.query(PriceHistoryBucket).filter(PriceHistoryBucket.product_id == product_id,
+                                                           PriceHistoryBucket.bucket_start <= end)
+        raw_query = db.query(PriceHistory.timestamp, PriceHistory.price).filter(PriceHistory.product_id == product_id,
+                                                                               PriceHistory.timestamp <= end)
+        if start:
+            bucket_query = bucket_query.filter(PriceHistoryBucket.bucket_start >= start)
+            raw_query = raw_query.filter(PriceHistory.timestamp >= start)
+
+        segments = [
+            (product_id, b.bucket_start, b.open, b.high, b.low, b.close, b.samples, b.price_sum, b.resolution)
+            for b in bucket_query.order_by(PriceHistoryBucket.bucket_start)
+        ]
+        segments.extend(
+            (product_id, timestamp, price, price, price, price, 1, price, 'raw')
+            for timestamp, price in raw_query.order_by(PriceHistory.timestamp)
+        )
+        segments.sort(key=lambda s: s[1])
+        return segments
+
+    @staticmethod
+    def _price_before(db, product_id: int, start: datetime) -> Optional[float]:
+        """Último preço conhecido antes de start (bruto ou agregado)"""
+        raw = (db.query(PriceHistory.timestamp, PriceHistory.price)
+                 .filter(PriceHistory.product_id == product_id, PriceHistory.timestamp < start)
+                 .order_by(PriceHistory.timestamp.desc()).first())
+        bucket = (db.query(PriceHistoryBucket.bucket_start, PriceHistoryBucket.close)
+                    .filter(PriceHistoryBucket.product_id == product_id, PriceHistoryBucket.bucket_start < start)
+                    .order_by(PriceHistoryBucket.bucket_start.desc()).first())
+        candidates = [row for row in (raw, bucket) if row is not None]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda row: row[0])[1]
+
+    @staticmethod
+    def _point(ts: datetime, open_: float, high: float, low: float, close: float, samples: int) -> Dict[str, Any]:
+        return {
+            'timestamp': ts.isoformat(),
+            'price': close,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'samples': samples
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Configuração de retenção e resultado do último rollup"""
+        return {
+            'raw_retention_days': self.raw_retention.days,
+            'hourly_retention_days': self.hourly_retention.days,
+            'max_points': self.max_points,
+            'last_rollup': self.last_rollup
+        }
+
+# Instância global
+history_manager = HistoryManager()
+
+def get_history_manager() -> HistoryManager:
+    """Retorna a instância global do gerenciador de histórico"""
+    return history_manager
@@ -0,0 +1,133 @@
+"""
+Cache de GET condicional para o Bot de Monitoramento de Preços
+Guarda validadores (ETag / Last-Modified) e o hash do conteúdo de cada página de produto
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+class HttpCache:
+    """Cache em disco (um arquivo JSON por URL) com contadores de economia"""
+
+    COUNTER_KEYS = ('requests', 'not_modified', 'hash_hits', 'misses', 'bytes_downloaded', 'bytes_saved')
+
+    def __init__(self, cache_dir: str = None, enabled: bool = None):
+        self.cache_dir = Path(cache_dir or Config.HTTP_CACHE_DIR)
+        self.enabled = Config.HTTP_CACHE_ENABLED if enabled is None else enabled
+
+        self._entries: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self.counters = {key: 0 for key in self.COUNTER_KEYS}
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def _path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Retorna a entrada de cache de uma URL (carregando do disco se necessário)"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if url in self._entries:
+                return self._entries[url]
+
+        entry = None
+        path = self._path(url)
+        if path.exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Entrada de cache inválida para {url}: {e}")
+
+        with self._lock:
+            self._entries[url] = entry
+        return entry
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Headers If-None-Match / If-Modified-Since para a URL"""
+        entry = self.get(url)
+        if not entry or not entry.get('product'):
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url: str, headers: Dict[str, str], content_hash: str, content_length: int,
+              product: Dict[str, Any]):
+        """Grava validadores, hash e os dados extraídos da página"""
+        if not self.enabled:
+            return
+
+        entry = {
+            'url': url,
+            'etag': headers.get('etag'),
+            'last_modified': headers.get('last-modified'),
+            'content_hash': content_hash,
+            'content_length': content_length,
+            'product': product,
+            'updated_at': datetime.utcnow().isoformat(),
+        }
+
+        with self._lock:
+            self._entries[url] = entry
+
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(url)
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Erro ao gravar cache de {url}: {e}")
+
+    def refresh_validators(self, url: str, headers: Dict[str, str]):
+        """Atualiza os validadores de uma entrada cujo conteúdo não mudou"""
+        entry = self.get(url)
+        if entry and (headers.get('etag') or headers.get('last-modified')):
+            if headers.get('etag') != entry.get('etag') or headers.get('last-modified') != entry.get('last_modified'):
+                self.store(url, headers, entry['content_hash'], entry['content_length'], entry['product'])
+
+    def record(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def get_counters(self) -> Dict[str, int]:
+        """Retorna uma cópia dos contadores acumulados"""
+        with self._lock:
+            return dict(self.counters)
+
+    @staticmethod
+    def counters_delta(before: Dict[str, int], after: Dict[str, int]) -> Dict[str, int]:
+        """Diferença entre dois snapshots de contadores (estatística por ciclo)"""
+        delta = {key: after.get(key, 0) - before.get(key, 0) for key in HttpCache.COUNTER_KEYS}
+        requests = delta['requests']
+        hits = delta['not_modified'] + delta['hash_hits']
+        delta['hit_rate'] = round(hits / requests, 3) if requests else 0.0
+        return delta
+
+# Instância global do cache HTTP
+http_cache = HttpCache()
+
+def get_http_cache() -> HttpCache:
+    """Retorna a instância do cache HTTP"""
+    return http_cache
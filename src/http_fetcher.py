@@ -0,0 +1,174 @@
+"""
+Cliente HTTP assíncrono para o Bot de Monitoramento de Preços
+Mantém conexões keep-alive por host em um event loop próprio e limita requisições simultâneas
+(por domínio, pelo mesmo DomainLimiter do ciclo de atualização)
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Optional
+
+from config.settings import Config
+from src.refresh import get_domain_limiter
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401 - necessário para HTTP/2 no httpx
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+try:
+    import brotli  # noqa: F401 - necessário para decodificar respostas 'br'
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+class FetchResult:
+    """Resposta HTTP já lida por completo"""
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    def __repr__(self):
+        return f"FetchResult(url='{self.url}', status={self.status_code}, bytes={len(self.content)})"
+
+class AsyncHttpFetcher:
+    """Busca páginas com httpx em um event loop dedicado
+
+    O event loop roda em uma thread própria, então tanto corrotinas de outros
+    loops (bot do Telegram, views async do Flask) quanto threads comuns
+    (ciclo de atualização) podem usar o mesmo pool de conexões.
+    """
+
+    def __init__(self):
+        self.enabled = HTTPX_AVAILABLE and Config.ASYNC_FETCH_ENABLED
+        self.http2 = Config.HTTP2_ENABLED and H2_AVAILABLE
+        self.max_in_flight = Config.HTTP_MAX_IN_FLIGHT
+        self.limiter = get_domain_limiter()
+
+        if Config.HTTP2_ENABLED and not H2_AVAILABLE:
+            logger.warning("HTTP/2 solicitado mas o pacote 'h2' não está instalado; usando HTTP/1.1")
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client = None
+        self._global_semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """Inicia o event loop e o cliente HTTP na primeira utilização"""
+        with self._lock:
+            if not self.enabled:
+                raise RuntimeError("Cliente HTTP assíncrono desabilitado ou httpx não instalado")
+
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run_loop():
+                    asyncio.set_event_loop(loop)
+                    self._client = httpx.AsyncClient(
+                        http2=self.http2,
+                        limits=httpx.Limits(
+                            max_connections=self.max_in_flight,
+                            max_keepalive_connections=Config.HTTP_KEEPALIVE_CONNECTIONS
+                        ),
+                        timeout=Config.HTTP_TIMEOUT,
+                        follow_redirects=True
+                    )
+                    self._global_semaphore = asyncio.Semaphore(self.max_in_flight)
+                    ready.set()
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=run_loop, name='http-fetcher', daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+                logger.info(f"Cliente HTTP assíncrono iniciado (HTTP/2: {self.http2})")
+
+            return self._loop
+
+    @staticmethod
+    def accept_encoding() -> str:
+        """Retorna as codificações que o cliente consegue decodificar"""
+        return 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+
+    async def _fetch(self, url: str, headers: Dict[str, str], polite: bool) -> FetchResult:
+        """Executa a requisição no loop do fetcher respeitando os limites
+
+        polite=False quando quem chama já ocupa uma vaga do DomainLimiter (slot()).
+        """
+        if not polite:
+            return await self._get(url, headers)
+        async with self.limiter.async_slot(url):
+            return await self._get(url, headers)
+
+    async def _get(self, url: str, headers: Dict[str, str]) -> FetchResult:
+        async with self._global_semaphore:
+            request_headers = dict(headers or {})
+            request_headers['Accept-Encoding'] = self.accept_encoding()
+            response = await self._client.get(url, headers=request_headers)
+            return FetchResult(str(response.url), response.status_code, dict(response.headers), response.content)
+
+    def submit(self, url: str, headers: Dict[str, str] = None, polite: bool = True) -> Future:
+        """Agenda uma requisição a partir de qualquer thread e retorna um Future"""
+        loop = self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(self._fetch(url, headers, polite), loop)
+
+    def fetch_sync(self, url: str, headers: Dict[str, str] = None, polite: bool = True) -> FetchResult:
+        """Busca uma página bloqueando apenas a thread chamadora"""
+        return self.submit(url, headers, polite).result(timeout=Config.HTTP_TIMEOUT * 2)
+
+    async def fetch(self, url: str, headers: Dict[str, str] = None, polite: bool = True) -> FetchResult:
+        """Busca uma página a partir de qualquer event loop sem bloqueá-lo"""
+        loop = self._ensure_started()
+        coro = self._fetch(url, headers, polite)
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def shutdown(self, timeout: float = 5):
+        """Fecha as conexões e encerra o event loop do fetcher"""
+        with self._lock:
+            loop = self._loop
+            self._loop = None
+
+        if loop is None:
+            return
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Erro ao fechar cliente HTTP: {e}")
+
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+        logger.info("Cliente HTTP assíncrono encerrado")
+
+# Instância global do cliente HTTP
+http_fetcher = AsyncHttpFetcher()
+
+def get_http_fetcher() -> AsyncHttpFetcher:
+    """Retorna a instância do cliente HTTP assíncrono"""
+    return http_fetcher
@@ -0,0 +1,162 @@
+"""
+Fila de jobs em segundo plano para atualizações manuais
+A interface web e o bot do Telegram enfileiram a atualização (ou inclusão) de
+um produto e recebem um id; pedidos simultâneos para o mesmo produto reaproveitam
+o job em andamento. O scraping usa os mesmos recursos do ciclo de atualização.
+"""
+
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config.settings import Config
+from src.events import get_event_bus
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class Job:
+    """Um job da fila; future permite aguardar o resultado (ex.: asyncio.wrap_future no bot)"""
+
+    def __init__(self, kind: str, key: Hashable, product_id: int = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.key = key
+        self.product_id = product_id
+        self.status = QUEUED
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.future: Future = Future()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte o job para dicionário"""
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'product_id': self.product_id,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class JobQueue:
+    """Executa jobs em threads de fundo, deduplicando por chave"""
+
+    def __init__(self, max_workers: int = None, history_size: int = None):
+        self.max_workers = max_workers or Config.JOB_WORKERS
+        self.history_size = history_size or Config.JOB_HISTORY_SIZE
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[Hashable, Job] = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+
+    def submit(self, kind: str, key: Hashable, func: Callable[[], Dict[str, Any]],
+               product_id: int = None) -> Tuple[Job, bool]:
+        """Enfileira func; retorna (job, criado). Se já há um job ativo com a mesma chave, retorna esse"""
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None:
+                self.deduplicated += 1
+                return active, False
+
+            job = Job(kind, key, product_id)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self.submitted += 1
+            self._trim()
+
+        self._publish(job)
+        self._executor.submit(self._run, job, func)
+        return job, True
+
+    def _run(self, job: Job, func: Callable[[], Dict[str, Any]]):
+        job.status = RUNNING
+        job.started_at = datetime.utcnow()
+        self._publish(job)
+        try:
+            job.result = func()
+            job.status = DONE
+        except Exception as e:
+            logger.error(f"Erro no job {job.id} ({job.kind}): {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = datetime.utcnow()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+            self._publish(job)
+            job.future.set_result(job)
+
+    def _trim(self):
+        # Mantém só os jobs mais recentes já concluídos para consulta
+        while len(self._jobs) > self.history_size:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.finished:
+                break
+            del self._jobs[oldest_id]
+
+    @staticmethod
+    def _publish(job: Job):
+        # Resultado também chega pelo stream de eventos (/api/events)
+        get_event_bus().publish('job', job.to_dict())
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Jobs ativos, enviados e reaproveitados"""
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'active': len(self._active),
+                'submitted': self.submitted,
+                'deduplicated': self.deduplicated
+            }
+
+# Instância global
+job_queue = JobQueue()
+
+def get_job_queue() -> JobQueue:
+    """Retorna a instância global da fila de jobs"""
+    return job_queue
+
+def submit_product_refresh(product_id: int) -> Tuple[Job, bool]:
+    """Enfileira a atualização de preço de um produto"""
+    def run() -> Dict[str, Any]:
+        # Importação tardia: o gerenciador de alertas importa o bot, que importa este módulo
+        from src.alert_manager import get_alert_manager
+        return get_alert_manager().refresh_product_now(product_id)
+
+    return job_queue.submit('refresh', ('refresh', product_id), run, product_id=product_id)
+
+def submit_product_add(url: str) -> Tuple[Job, bool]:
+    """Enfileira a coleta e inclusão de um produto novo pela URL"""
+    from src.listing_crawler import normalize_url
+
+    def run() -> Dict[str, Any]:
+        from src.alert_manager import get_alert_manager
+        return get_alert_manager().add_product_from_url(url)
+
+    return job_queue.submit('add', ('add', normalize_url(url)), run)
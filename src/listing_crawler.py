@@ -0,0 +1,120 @@
+"""
+Crawler das listagens de promoções (Nike Ofertas e Adidas Outlet)
+Percorre as listagens paginadas e atualiza em lote os produtos monitorados que
+aparecem nelas: uma requisição cobre dezenas de produtos
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from config.settings import Config
+from src.refresh import domain_key, get_domain_limiter, DomainLimiter
+from scraper_nike import parse_promocoes_nike, url_pagina_nike
+from scraper_adidas import parse_promocoes_adidas, url_pagina_adidas
+
+logger = logging.getLogger(__name__)
+
+def normalize_url(url: str) -> str:
+    """Chave de comparação de URLs: domínio sem 'www.' + caminho, sem query/fragmento"""
+    path = urlparse(url).path.rstrip('/').lower()
+    return f"{domain_key(url)}{path}"
+
+class Listing:
+    """Uma listagem paginada de promoções"""
+
+    def __init__(self, name: str, domain: str, page_url: Callable[[int], str],
+                 parser: Callable[[bytes, str], List[Dict]]):
+        self.name = name
+        self.domain = domain
+        self.page_url = page_url
+        self.parser = parser
+
+    def covers(self, url: str) -> bool:
+        """Verifica se a URL de produto pertence ao domínio da listagem"""
+        domain = domain_key(url)
+        return domain == self.domain or domain.endswith('.' + self.domain)
+
+LISTINGS = [
+    Listing('nike_ofertas', 'nike.com.br', url_pagina_nike, parse_promocoes_nike),
+    Listing('adidas_outlet', 'adidas.com.br', url_pagina_adidas, parse_promocoes_adidas),
+]
+
+class ListingCrawler:
+    """Percorre as listagens e casa os itens com os produtos monitorados pela URL"""
+
+    def __init__(self, scraper, listings: List[Listing] = None, limiter: DomainLimiter = None,
+                 max_pages: int = None):
+        # StaticScraper: reaproveita o cliente HTTP e os headers do scraping estático
+        self.scraper = scraper
+        self.listings = LISTINGS if listings is None else listings
+        self.limiter = limiter or get_domain_limiter()
+        self.max_pages = max_pages or Config.LISTING_MAX_PAGES
+
+    def crawl_listing(self, listing: Listing) -> Tuple[Dict[str, Dict], int]:
+        """Percorre as páginas de uma listagem até acabar; retorna (itens por URL, páginas lidas)"""
+        items: Dict[str, Dict] = {}
+        pages = 0
+
+        for page in range(1, self.max_pages + 1):
+            url = listing.page_url(page)
+            try:
+                with self.limiter.slot(url):
+                    response = self.scraper.fetch_page(url)
+            except Exception as e:
+                logger.error(f"Erro ao buscar listagem {listing.name} (página {page}): {e}")
+                break
+
+            if response.status_code >= 400:
+                logger.warning(f"Listagem {listing.name} página {page}: HTTP {response.status_code}")
+                break
+
+            pages += 1
+            found = listing.parser(response.content, url)
+            new_items = 0
+            for item in found:
+                if item.get('url') and item.get('preco_valor'):
+                    key = normalize_url(item['url'])
+                    if key not in items:
+                        items[key] = item
+                        new_items += 1
+
+            # Fim da listagem: página vazia ou repetida (alguns sites repetem a última)
+            if not new_items:
+                break
+
+        logger.info(f"Listagem {listing.name}: {len(items)} itens em {pages} páginas")
+        return items, pages
+
+    def refresh(self, products) -> Tuple[Dict[int, Dict], Dict]:
+        """Busca nas listagens os produtos monitorados
+
+        Retorna {product_id: item} para os produtos encontrados (item com
+        'preco_valor' já convertido por brl_to_float) e as estatísticas da coleta.
+        """
+        started = time.monotonic()
+        stats = {'listings': 0, 'pages': 0, 'items': 0, 'matched': 0, 'duration_seconds': 0.0}
+
+        # Só percorre listagens de domínios com produtos monitorados
+        listings = [l for l in self.listings if any(l.covers(p.url) for p in products)]
+        if not listings:
+            return {}, stats
+
+        tracked = {normalize_url(p.url): p for p in products}
+        matches: Dict[int, Dict] = {}
+
+        with ThreadPoolExecutor(max_workers=len(listings), thread_name_prefix='listing') as executor:
+            for items, pages in executor.map(self.crawl_listing, listings):
+                stats['listings'] += 1
+                stats['pages'] += pages
+                stats['items'] += len(items)
+                for key, item in items.items():
+                    product = tracked.get(key)
+                    if product is not None:
+                        matches[product.id] = item
+
+        stats['matched'] = len(matches)
+        stats['duration_seconds'] = time.monotonic() - started
+        return matches, stats
@@ -0,0 +1,88 @@
+"""
+Migrações de esquema do Bot de Monitoramento de Preços
+Runner embutido: cada migração tem uma versão e é aplicada uma única vez, na
+inicialização, registrando-se na tabela schema_version
+"""
+
+import logging
+from datetime import datetime
+from typing import Callable, List, Tuple, Union
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# (versão, descrição, comandos SQL ou função que recebe a conexão)
+Migration = Tuple[int, str, Union[List[str], Callable[[Connection], None]]]
+
+def _add_column(table: str, column: str, ddl: str) -> Callable[[Connection], None]:
+    """Migração que adiciona uma coluna a uma tabela existente"""
+    def migrate(conn: Connection):
+        # Bancos novos já nascem com a coluna (create_all); só os antigos precisam do ALTER
+        columns = {existing['name'] for existing in inspect(conn).get_columns(table)}
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return migrate
+
+MIGRATIONS: List[Migration] = [
+    (1, 'Índices de products, price_history e alerts', [
+        # Produtos ativos (ciclo de atualização e contagens do dashboard)
+        "CREATE INDEX IF NOT EXISTS ix_products_active ON products (active)",
+        # Histórico de um produto em ordem cronológica e mínimo/máximo por produto
+        "CREATE INDEX IF NOT EXISTS ix_price_history_product_timestamp ON price_history (product_id, timestamp)",
+        "CREATE INDEX IF NOT EXISTS ix_price_history_product_price ON price_history (product_id, price)",
+        # Alertas ativos (por produto) e alertas de um chat do Telegram
+        "CREATE INDEX IF NOT EXISTS ix_alerts_active_product ON alerts (active, product_id)",
+        "CREATE INDEX IF NOT EXISTS ix_alerts_chat_id ON alerts (chat_id)",
+    ]),
+    (2, 'Índice de products por última atualização (paginação da API)', [
+        "CREATE INDEX IF NOT EXISTS ix_products_last_updated ON products (last_updated)",
+    ]),
+    (3, 'Intervalo de throttling por alerta (alerts.throttle_seconds)',
+     _add_column('alerts', 'throttle_seconds', 'INTEGER')),
+    (4, 'Intervalo de atualização por produto (products.refresh_interval)',
+     _add_column('products', 'refresh_interval', 'INTEGER')),
+]
+
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR(200) NOT NULL, "
+        "applied_at DATETIME NOT NULL)"
+    ))
+
+def get_schema_version(engine: Engine) -> int:
+    """Versão mais recente aplicada (0 para um banco sem migrações)"""
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+def run_migrations(engine: Engine, migrations: List[Migration] = None) -> int:
+    """Aplica as migrações pendentes em ordem; retorna quantas foram aplicadas"""
+    migrations = sorted(migrations or MIGRATIONS, key=lambda m: m[0])
+    current = get_schema_version(engine)
+    applied = 0
+
+    for version, name, steps in migrations:
+        if version <= current:
+            continue
+
+        logger.info(f"Aplicando migração {version}: {name}")
+        # Cada migração roda em sua própria transação junto com o registro da versão
+        with engine.begin() as conn:
+            if callable(steps):
+                steps(conn)
+            else:
+                for statement in steps:
+                    conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {'version': version, 'name': name, 'applied_at': datetime.utcnow()}
+            )
+        applied += 1
+
+    if applied:
+        logger.info(f"Esquema atualizado para a versão {migrations[-1][0]}")
+    return applied
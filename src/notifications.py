@@ -0,0 +1,193 @@
+"""
+Despacho das notificações de alerta pelo Telegram
+Os alertas disparados entram na tabela notification_outbox; um worker no event
+loop do bot drena a fila respeitando o limite global e o intervalo por chat,
+agrupa vários alertas do mesmo chat numa única mensagem (digest) e reenvia com
+backoff exponencial em caso de falha.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from telegram.constants import ParseMode
+from telegram.error import Forbidden, RetryAfter
+
+from config.settings import Config
+from src.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+class NotificationDispatcher:
+    """Fila de saída persistente das mensagens de alerta"""
+
+    def __init__(self, bot, global_rate: float = None, chat_interval: float = None):
+        self.bot = bot  # TelegramBot (formatação e application)
+        self.global_interval = 1.0 / (global_rate or Config.TELEGRAM_GLOBAL_RATE)
+        self.chat_interval = chat_interval if chat_interval is not None else Config.TELEGRAM_CHAT_INTERVAL
+        self.batch_size = Config.NOTIFY_BATCH_SIZE
+        self.max_attempts = Config.NOTIFY_MAX_ATTEMPTS
+        self.retry_base = Config.NOTIFY_RETRY_BASE_SECONDS
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task = None
+        self._next_send = 0.0  # monotonic: próximo envio permitido (limite global)
+        self._chat_next: Dict[str, float] = {}  # monotonic: próximo envio permitido por chat
+        self.counters = {'enqueued': 0, 'messages': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'digests': 0}
+
+    def enqueue(self, notifications: List[Dict[str, Any]]) -> int:
+        """Persiste notificações (chamado de qualquer thread) e acorda o worker
+
+        Cada item tem chat_id, alert_id, product_id, alert_type, old_price e new_price.
+        """
+        enqueued = DatabaseManager.enqueue_notifications(self.outbox_rows(notifications))
+        self.notify_enqueued(enqueued)
+        return enqueued
+
+    def outbox_rows(self, notifications: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Linhas da fila de saída para gravar na transação de quem chama
+
+        A primeira tentativa espera NOTIFY_DIGEST_DELAY_SECONDS para que alertas do
+        mesmo ciclo cheguem juntos ao chat.
+        """
+        first_attempt = datetime.utcnow() + timedelta(seconds=Config.NOTIFY_DIGEST_DELAY_SECONDS)
+        return [dict(item, next_attempt_at=first_attempt) for item in notifications]
+
+    def notify_enqueued(self, count: int) -> None:
+        """Contabiliza notificações já gravadas e acorda o worker"""
+        self.counters['enqueued'] += count
+        if count and self._loop is not None:
+            # Chamado fora do loop do bot (thread do agendador ou da fila de jobs)
+            self._loop.call_soon_threadsafe(self._loop.call_later, Config.NOTIFY_DIGEST_DELAY_SECONDS, self._wakeup.set)
+
+    def start(self, application) -> None:
+        """Inicia o worker no event loop do bot (post_init da Application)"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = application.create_task(self.run())
+        logger.info("Despacho de notificações iniciado")
+
+    async def stop(self, application=None) -> None:
+        """Encerra o worker (post_shutdown da Application); o que ficou pendente continua no banco"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self) -> None:
+        """Drena a fila até ser cancelado"""
+        while True:
+            try:
+                processed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro no despacho de notificações: {e}")
+                processed = 0
+
+            # Lote cheio enviado: continua; senão aguarda novo enfileiramento ou a próxima verificação
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=Config.NOTIFY_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def drain_once(self) -> int:
+        """Envia as notificações vencidas: uma mensagem por chat, respeitando os limites
+
+        Retorna quantas notificações foram tratadas (enviadas, reagendadas ou descartadas).
+        """
+        due = await asyncio.to_thread(DatabaseManager.get_due_notifications, datetime.utcnow(), self.batch_size)
+        if not due:
+            return 0
+
+        by_chat: Dict[str, List[Dict[str, Any]]] = {}
+        for item in due:
+            by_chat.setdefault(item['chat_id'], []).append(item)
+
+        handled = 0
+        for chat_id, items in by_chat.items():
+            # Chat ainda no intervalo mínimo: fica para a próxima rodada (e junta mais alertas)
+            if self._chat_next.get(chat_id, 0.0) > time.monotonic():
+                continue
+            await self._send(chat_id, items)
+            handled += len(items)
+
+        # Esquece chats cujo intervalo já passou
+        now = time.monotonic()
+        self._chat_next = {chat: at for chat, at in self._chat_next.items() if at > now}
+        return handled
+
+    async def _wait_global_slot(self) -> None:
+        now = time.monotonic()
+        wait = self._next_send - now
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._next_send = max(now, self._next_send) + self.global_interval
+
+    async def _send(self, chat_id: str, items: List[Dict[str, Any]]) -> None:
+        """Envia um alerta ou um digest para o chat e registra o resultado"""
+        ids = [item['id'] for item in items]
+        await self._wait_global_slot()
+        self._chat_next[chat_id] = time.monotonic() + self.chat_interval
+
+        try:
+            text, reply_markup = self.bot.format_notifications(items)
+            await self.bot.application.bot.send_message(
+                chat_id=chat_id,
+                text=text,
+                parse_mode=ParseMode.MARKDOWN,
+                reply_markup=reply_markup
+            )
+        except RetryAfter as e:
+            # Flood control do Telegram: pausa todos os envios pelo tempo pedido
+            retry_after = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else e.retry_after
+            logger.warning(f"Limite do Telegram atingido, aguardando {retry_after}s")
+            self._next_send = time.monotonic() + retry_after
+            await self._finish(ids, 'pending', next_attempt_at=datetime.utcnow() + timedelta(seconds=retry_after),
+                               error=str(e))
+            self.counters['retried'] += len(ids)
+            return
+        except Forbidden as e:
+            # Bot bloqueado ou removido do chat: novas tentativas não adiantam
+            logger.warning(f"Chat {chat_id} recusou notificações: {e}")
+            await self._finish(ids, 'failed', error=str(e))
+            self.counters['failed'] += len(ids)
+            return
+        except Exception as e:
+            attempts = max(item['attempts'] for item in items) + 1
+            if attempts >= self.max_attempts:
+                logger.error(f"Notificações para {chat_id} descartadas após {attempts} tentativas: {e}")
+                await self._finish(ids, 'failed', error=str(e))
+                self.counters['failed'] += len(ids)
+            else:
+                delay = self.retry_base * 2 ** (attempts - 1)
+                logger.warning(f"Falha ao notificar {chat_id} (tentativa {attempts}), nova tentativa em {delay}s: {e}")
+                await self._finish(ids, 'pending', next_attempt_at=datetime.utcnow() + timedelta(seconds=delay),
+                                   error=str(e))
+                self.counters['retried'] += len(ids)
+            return
+
+        await self._finish(ids, 'sent', when=datetime.utcnow())
+        self.counters['messages'] += 1
+        self.counters['sent'] += len(ids)
+        if len(items) > 1:
+            self.counters['digests'] += 1
+
+    @staticmethod
+    async def _finish(ids: List[int], status: str, **kwargs) -> None:
+        await asyncio.to_thread(DatabaseManager.finish_notifications, ids, status, **kwargs)
+
+    def purge(self) -> int:
+        """Remove da fila o que já foi entregue ou descartado há mais de NOTIFY_RETENTION_DAYS"""
+        return DatabaseManager.purge_notifications(datetime.utcnow() - timedelta(days=Config.NOTIFY_RETENTION_DAYS))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de envio e tamanho da fila por status"""
+        return {
+            'running': self._task is not None,
+            'outbox': DatabaseManager.get_outbox_counts(),
+            **self.counters
+        }
@@ -0,0 +1,187 @@
+"""
+Motor de atualização concorrente para o Bot de Monitoramento de Preços
+Atualiza produtos de lojas diferentes em paralelo respeitando limites por domínio
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+from urllib.parse import urlparse
+
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+def domain_key(url: str) -> str:
+    """Normaliza o domínio de uma URL (sem 'www.' e sem porta)"""
+    domain = urlparse(url).netloc.lower().split(':')[0]
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
+class _DomainState:
+    """Estado de politeness de um domínio"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.lock = threading.Lock()
+        self.next_allowed = 0.0
+
+class DomainLimiter:
+    """Limita requisições simultâneas e o intervalo entre requisições por domínio"""
+
+    def __init__(self, limits: Dict[str, int] = None, default_limit: int = None,
+                 min_delay: float = None, max_delay: float = None):
+        self.limits = limits if limits is not None else Config.DOMAIN_CONCURRENCY
+        self.default_limit = default_limit or Config.DEFAULT_DOMAIN_CONCURRENCY
+        self.min_delay = Config.MIN_DELAY if min_delay is None else min_delay
+        self.max_delay = Config.MAX_DELAY if max_delay is None else max_delay
+
+        self._states: Dict[str, _DomainState] = {}
+        self._lock = threading.Lock()
+
+    def get_limit(self, domain: str) -> int:
+        """Retorna o limite configurado para um domínio (ou subdomínio)"""
+        for configured, limit in self.limits.items():
+            if domain == configured or domain.endswith('.' + configured):
+                return limit
+        return self.default_limit
+
+    def _get_state(self, domain: str) -> _DomainState:
+        with self._lock:
+            state = self._states.get(domain)
+            if state is None:
+                state = _DomainState(self.get_limit(domain))
+                self._states[domain] = state
+            return state
+
+    def _reserve(self, state: _DomainState) -> float:
+        """Reserva o próximo horário livre do domínio e retorna quanto esperar (s)"""
+        with state.lock:
+            now = time.monotonic()
+            start = max(now, state.next_allowed)
+            state.next_allowed = start + random.uniform(self.min_delay, self.max_delay)
+        return start - now
+
+    @contextmanager
+    def slot(self, url: str):
+        """Reserva uma vaga no domínio da URL, aguardando o intervalo mínimo"""
+        state = self._get_state(domain_key(url))
+        state.semaphore.acquire()
+        try:
+            wait = self._reserve(state)
+            if wait > 0:
+                time.sleep(wait)
+
+            yield
+        finally:
+            state.semaphore.release()
+
+    @asynccontextmanager
+    async def async_slot(self, url: str):
+        """Mesma vaga de slot() para corrotinas, sem bloquear o event loop
+
+        As vagas são compartilhadas com as threads: o limite por domínio vale
+        para o ciclo de atualização e para as buscas assíncronas juntos.
+        """
+        state = self._get_state(domain_key(url))
+        while not state.semaphore.acquire(blocking=False):
+            await asyncio.sleep(0.05)
+        try:
+            wait = self._reserve(state)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            yield
+        finally:
+            state.semaphore.release()
+
+# Instância global compartilhada por todos os caminhos de scraping
+domain_limiter = DomainLimiter()
+
+def get_domain_limiter() -> DomainLimiter:
+    """Retorna a instância do limitador por domínio"""
+    return domain_limiter
+
+class RefreshEngine:
+    """Executa um ciclo de atualização com uma fila por domínio
+
+    Cada domínio recebe tantas "pistas" (tarefas consumidoras) quanto seu limite
+    de concorrência, assim uma loja lenta nunca ocupa as threads das demais.
+    """
+
+    def __init__(self, max_workers: int = None, limiter: DomainLimiter = None):
+        self.max_workers = max_workers or Config.REFRESH_MAX_WORKERS
+        self.limiter = limiter or get_domain_limiter()
+
+    def run(self, products: List[Any], refresh_func: Callable[[Any], Dict[str, Any]]) -> Dict[str, Any]:
+        """Atualiza os produtos e retorna as estatísticas do ciclo
+
+        refresh_func recebe um produto e retorna um dicionário com as chaves
+        opcionais 'updated' (bool) e 'alerts' (int).
+        """
+        started = time.monotonic()
+        stats = {
+            'started_at': datetime.utcnow().isoformat(),
+            'products': len(products),
+            'updated': 0,
+            'failed': 0,
+            'alerts': 0,
+            'domains': {},
+        }
+
+        # Agrupa os produtos por domínio mantendo a ordem original
+        queues: Dict[str, deque] = OrderedDict()
+        for product in products:
+            queues.setdefault(domain_key(product.url), deque()).append(product)
+
+        stats_lock = threading.Lock()
+
+        def lane(domain: str):
+            pending = queues[domain]
+            while True:
+                try:
+                    product = pending.popleft()
+                except IndexError:
+                    return
+
+                try:
+                    result = refresh_func(product) or {}
+                except Exception as e:
+                    logger.error(f"Erro ao verificar produto {product.id}: {e}")
+                    result = {}
+
+                with stats_lock:
+                    domain_stats = stats['domains'].setdefault(domain, {'products': 0, 'updated': 0})
+                    domain_stats['products'] += 1
+                    if result.get('updated'):
+                        stats['updated'] += 1
+                        domain_stats['updated'] += 1
+                    else:
+                        stats['failed'] += 1
+                    stats['alerts'] += result.get('alerts', 0)
+
+        # Intercala as pistas para que todos os domínios comecem juntos
+        lane_counts = {d: min(self.limiter.get_limit(d), len(q)) for d, q in queues.items()}
+        lanes = []
+        for round_index in range(max(lane_counts.values(), default=0)):
+            lanes.extend(d for d, count in lane_counts.items() if round_index < count)
+
+        if lanes:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(lanes)),
+                                    thread_name_prefix='refresh') as executor:
+                for future in [executor.submit(lane, domain) for domain in lanes]:
+                    future.result()
+
+        duration = time.monotonic() - started
+        stats['duration_seconds'] = round(duration, 2)
+        stats['throughput_per_minute'] = round(stats['products'] / duration * 60, 2) if duration > 0 else 0.0
+        return stats
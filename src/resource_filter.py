@@ -0,0 +1,162 @@
+"""
+Filtro de recursos das páginas do Playwright
+Aborta imagens, fontes, mídia e rastreadores que o scraper não usa e mede,
+por página, os bytes transferidos e o tempo até o preço aparecer
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from playwright.sync_api import Page, Route
+
+from config.settings import Config
+from src.refresh import domain_key
+
+logger = logging.getLogger(__name__)
+
+# Tipos de recurso reconhecidos pelo Playwright (request.resource_type)
+RESOURCE_TYPES = {
+    'document', 'stylesheet', 'image', 'media', 'font', 'script', 'texttrack',
+    'xhr', 'fetch', 'eventsource', 'websocket', 'manifest', 'other'
+}
+
+def _host_matches(host: str, suffixes: List[str]) -> bool:
+    return any(host == s or host.endswith('.' + s) for s in suffixes)
+
+class PageMetrics:
+    """Métricas de carregamento de uma página"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.domain = domain_key(url)
+        self.started = time.monotonic()
+        self.requests = 0
+        self.blocked = 0
+        self.bytes = 0
+        self.time_to_price_ms: Optional[float] = None
+
+    def mark_ready(self):
+        """Registra o momento em que preço ou JSON-LD apareceram"""
+        if self.time_to_price_ms is None:
+            self.time_to_price_ms = (time.monotonic() - self.started) * 1000
+
+    def to_dict(self) -> Dict:
+        return {
+            'url': self.url,
+            'requests': self.requests,
+            'blocked': self.blocked,
+            'bytes': self.bytes,
+            'time_to_price_ms': round(self.time_to_price_ms, 1) if self.time_to_price_ms is not None else None
+        }
+
+class ResourceFilter:
+    """Intercepta as requisições de uma página com regras globais e por domínio
+
+    As regras por domínio (Config.RESOURCE_RULES) têm listas 'allow' e 'deny' que
+    aceitam tipos de recurso (ex.: 'image') ou domínios (ex.: 'cdn.exemplo.com').
+    'allow' prevalece sobre os bloqueios globais; 'deny' acrescenta bloqueios.
+    """
+
+    def __init__(self, enabled: bool = None, blocked_types: List[str] = None,
+                 blocked_hosts: List[str] = None, rules: Dict[str, Dict[str, List[str]]] = None):
+        self.enabled = Config.BLOCK_RESOURCES_ENABLED if enabled is None else enabled
+        self.blocked_types = set(Config.BLOCKED_RESOURCE_TYPES if blocked_types is None else blocked_types)
+        self.blocked_hosts = list(Config.BLOCKED_HOSTS if blocked_hosts is None else blocked_hosts)
+        self.rules = Config.RESOURCE_RULES if rules is None else rules
+
+        # domínio -> totais acumulados das páginas carregadas
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _rules_for(self, page_domain: str) -> Dict[str, List[str]]:
+        for domain, rules in self.rules.items():
+            if page_domain == domain or page_domain.endswith('.' + domain):
+                return rules
+        return {}
+
+    def should_block(self, page_domain: str, resource_type: str, request_url: str) -> bool:
+        """Decide se uma requisição da página deve ser abortada"""
+        if not self.enabled or resource_type == 'document':
+            return False
+
+        host = (urlparse(request_url).hostname or '').lower()
+        rules = self._rules_for(page_domain)
+        allow = rules.get('allow', [])
+        deny = rules.get('deny', [])
+
+        if resource_type in allow or _host_matches(host, [a for a in allow if a not in RESOURCE_TYPES]):
+            return False
+        if resource_type in deny or _host_matches(host, [d for d in deny if d not in RESOURCE_TYPES]):
+            return True
+
+        return resource_type in self.blocked_types or _host_matches(host, self.blocked_hosts)
+
+    def install(self, page: Page, url: str) -> PageMetrics:
+        """Instala a interceptação e a contagem de bytes em uma página"""
+        metrics = PageMetrics(url)
+        page_domain = metrics.domain
+
+        def handle_route(route: Route):
+            request = route.request
+            metrics.requests += 1
+            if self.should_block(page_domain, request.resource_type, request.url):
+                metrics.blocked += 1
+                route.abort()
+            else:
+                route.continue_()
+
+        def on_request_finished(request):
+            try:
+                sizes = request.sizes()
+                metrics.bytes += sizes.get('responseBodySize', 0) + sizes.get('responseHeadersSize', 0)
+            except Exception:
+                pass
+
+        if self.enabled:
+            page.route('**/*', handle_route)
+        page.on('requestfinished', on_request_finished)
+        return metrics
+
+    def record(self, metrics: PageMetrics):
+        """Acumula as métricas de uma página nas estatísticas do domínio"""
+        with self._lock:
+            entry = self.stats.setdefault(metrics.domain, {
+                'pages': 0, 'requests': 0, 'blocked': 0, 'bytes': 0, 'ready_pages': 0, 'time_to_price_ms': 0.0
+            })
+            entry['pages'] += 1
+            entry['requests'] += metrics.requests
+            entry['blocked'] += metrics.blocked
+            entry['bytes'] += metrics.bytes
+            if metrics.time_to_price_ms is not None:
+                entry['ready_pages'] += 1
+                entry['time_to_price_ms'] += metrics.time_to_price_ms
+
+        logger.info(
+            f"Página {metrics.url}: {metrics.bytes / 1024:.0f} KB, {metrics.blocked}/{metrics.requests} "
+            f"requisições bloqueadas, preço em "
+            f"{f'{metrics.time_to_price_ms:.0f} ms' if metrics.time_to_price_ms is not None else 'não encontrado'}"
+        )
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Médias por domínio: KB por página, requisições bloqueadas e tempo até o preço"""
+        with self._lock:
+            return {
+                domain: {
+                    'pages': entry['pages'],
+                    'avg_kb_per_page': round(entry['bytes'] / entry['pages'] / 1024, 1),
+                    'blocked_per_page': round(entry['blocked'] / entry['pages'], 1),
+                    'avg_time_to_price_ms': round(entry['time_to_price_ms'] / entry['ready_pages'], 1)
+                    if entry['ready_pages'] else None
+                }
+                for domain, entry in self.stats.items()
+            }
+
+# Instância global do filtro de recursos
+resource_filter = ResourceFilter()
+
+def get_resource_filter() -> ResourceFilter:
+    """Retorna a instância do filtro de recursos"""
+    return resource_filter
@@ -0,0 +1,179 @@
+"""
+Roteamento adaptativo entre scraping estático e dinâmico
+Aprende, por domínio e por padrão de URL, a taxa de sucesso e a latência de cada
+caminho e só usa o navegador quando o caminho barato historicamente não funciona
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+from config.settings import Config
+from src.refresh import domain_key
+
+logger = logging.getLogger(__name__)
+
+STATIC = 'static'
+DYNAMIC = 'dynamic'
+METHODS = (STATIC, DYNAMIC)
+
+_ID_SEGMENT_RE = re.compile(r'\d|-|^[A-Za-z0-9_]{16,}$')
+
+def url_pattern(url: str) -> str:
+    """Generaliza a URL em um padrão: domínio + até dois segmentos do caminho
+
+    Segmentos que identificam o produto (slugs, códigos, números) viram '*',
+    mantendo a extensão. Ex.: adidas.com.br/tenis-ultraboost/GZ0127.html -> adidas.com.br/*/*.html
+    """
+    parsed = urlparse(url)
+    segments = [s for s in parsed.path.split('/') if s][:2]
+
+    generalized = []
+    for segment in segments:
+        stem, dot, ext = segment.rpartition('.') if '.' in segment else (segment, '', '')
+        if _ID_SEGMENT_RE.search(stem):
+            generalized.append(f"*{dot}{ext}")
+        else:
+            generalized.append(segment.lower())
+
+    return '/'.join([domain_key(url)] + generalized)
+
+class ScrapeRouter:
+    """Estatísticas de sucesso/latência por domínio e padrão de URL, persistidas em JSON"""
+
+    def __init__(self, stats_file: str = None, min_samples: int = None, explore_rate: float = None,
+                 window: int = None):
+        self.stats_file = Path(stats_file or Config.ROUTING_STATS_FILE)
+        self.min_samples = Config.ROUTING_MIN_SAMPLES if min_samples is None else min_samples
+        self.explore_rate = Config.ROUTING_EXPLORE_RATE if explore_rate is None else explore_rate
+        self.window = window or Config.ROUTING_WINDOW
+
+        # chave (domínio ou padrão) -> método -> {attempts, successes, avg_ms}
+        self.stats: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+        self.load()
+
+    def load(self):
+        """Carrega as estatísticas persistidas (se existirem)"""
+        if not self.stats_file.exists():
+            return
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                self.stats = json.load(f).get('routes', {})
+            logger.info(f"Estatísticas de roteamento carregadas: {len(self.stats)} rotas")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Erro ao carregar estatísticas de roteamento: {e}")
+
+    def save(self, force: bool = True):
+        """Grava as estatísticas em disco (escrita atômica)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            if not force and time.monotonic() - self._last_save < Config.ROUTING_SAVE_INTERVAL:
+                return
+            snapshot = json.loads(json.dumps(self.stats))
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+        try:
+            self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.stats_file.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'updated_at': datetime.utcnow().isoformat(), 'routes': snapshot}, f, indent=2)
+            os.replace(tmp_path, self.stats_file)
+        except OSError as e:
+            logger.warning(f"Erro ao gravar estatísticas de roteamento: {e}")
+
+    def _entry(self, key: str, method: str) -> Optional[Dict[str, float]]:
+        entry = self.stats.get(key, {}).get(method)
+        return entry if entry and entry['attempts'] >= self.min_samples else None
+
+    def _route_stats(self, url: str) -> Dict[str, Optional[Dict[str, float]]]:
+        """Estatísticas mais específicas disponíveis: padrão de URL, senão domínio"""
+        with self._lock:
+            for key in (url_pattern(url), domain_key(url)):
+                found = {method: self._entry(key, method) for method in METHODS}
+                if found[STATIC]:
+                    return found
+        return {STATIC: None, DYNAMIC: None}
+
+    def plan(self, url: str) -> List[str]:
+        """Ordem dos métodos a tentar para a URL
+
+        O estático vem primeiro quando ainda não há histórico ou quando o custo
+        esperado (latência estática + chance de falha x latência do navegador) é
+        menor que ir direto ao navegador. Uma fração das requisições explora o
+        caminho estático mesmo assim, para reaprender se o site mudar.
+        """
+        stats = self._route_stats(url)
+        static, dynamic = stats[STATIC], stats[DYNAMIC]
+
+        if static is None:
+            return [STATIC, DYNAMIC]
+
+        success_rate = static['successes'] / static['attempts']
+        if dynamic is not None:
+            static_first = success_rate * dynamic['avg_ms'] > static['avg_ms']
+        else:
+            static_first = success_rate >= Config.ROUTING_MIN_SUCCESS_RATE
+
+        if static_first or random.random() < self.explore_rate:
+            return [STATIC, DYNAMIC]
+        return [DYNAMIC]
+
+    def record(self, url: str, method: str, success: bool, elapsed: float):
+        """Registra o resultado de uma tentativa para o domínio e o padrão da URL"""
+        elapsed_ms = elapsed * 1000
+
+        with self._lock:
+            for key in (domain_key(url), url_pattern(url)):
+                entry = self.stats.setdefault(key, {}).setdefault(
+                    method, {'attempts': 0, 'successes': 0, 'avg_ms': elapsed_ms}
+                )
+                # Janela deslizante aproximada: reduz pela metade ao atingir o limite
+                if entry['attempts'] >= self.window:
+                    entry['attempts'] /= 2
+                    entry['successes'] /= 2
+
+                entry['attempts'] += 1
+                entry['successes'] += 1 if success else 0
+                if success:
+                    # A latência considerada é a das tentativas bem-sucedidas
+                    entry['avg_ms'] = entry['avg_ms'] * 0.8 + elapsed_ms * 0.2
+
+            self._dirty = True
+
+        self.save(force=False)
+
+    def get_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Resumo por rota: tentativas, taxa de sucesso e latência média de cada método"""
+        with self._lock:
+            return {
+                key: {
+                    method: {
+                        'attempts': round(entry['attempts'], 1),
+                        'success_rate': round(entry['successes'] / entry['attempts'], 3) if entry['attempts'] else 0.0,
+                        'avg_ms': round(entry['avg_ms'], 1)
+                    }
+                    for method, entry in methods.items()
+                }
+                for key, methods in self.stats.items()
+            }
+
+# Instância global do roteador
+scrape_router = ScrapeRouter()
+
+def get_scrape_router() -> ScrapeRouter:
+    """Retorna a instância do roteador de scraping"""
+    return scrape_router
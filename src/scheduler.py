@@ -0,0 +1,303 @@
+"""
+Agendador orientado a eventos (fila de prioridade por horário de execução)
+Cada tarefa tem o seu próximo horário; a thread do agendador dorme até o item
+mais próximo e entrega as tarefas vencidas a um pool de workers. Itens de um
+grupo (ex.: um produto por item) vencidos juntos são entregues em lote ao
+handler do grupo. Intervalos podem ser alterados com o agendador rodando.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+from config.settings import Config
+
+logger = logging.getLogger(__name__)
+
+def next_daily(at: str, now: float = None) -> float:
+    """Próxima ocorrência (timestamp) do horário local HH:MM"""
+    now_dt = datetime.fromtimestamp(now or time.time())
+    hour, minute = (int(part) for part in at.split(':'))
+    candidate = now_dt.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= now_dt:
+        candidate += timedelta(days=1)
+    return candidate.timestamp()
+
+class ScheduledTask:
+    """Uma tarefa agendada: função própria ou item de um grupo em lote"""
+
+    __slots__ = ('key', 'func', 'group', 'interval', 'daily_at', 'due', 'version', 'running', 'last_run')
+
+    def __init__(self, key: Hashable, func: Optional[Callable[[], Any]], group: Optional[str],
+                 interval: Optional[float], daily_at: Optional[str], due: float):
+        self.key = key
+        self.func = func
+        self.group = group
+        self.interval = interval
+        self.daily_at = daily_at
+        self.due = due
+        self.version = 0  # entradas antigas do heap são ignoradas quando a tarefa é reagendada
+        self.running = False
+        self.last_run = None
+
+    def next_due(self, now: float) -> float:
+        if self.daily_at:
+            return next_daily(self.daily_at, now)
+        return now + self.interval
+
+class Scheduler:
+    """Fila de prioridade de tarefas com thread própria e pool de workers"""
+
+    def __init__(self, max_workers: int = None, batch_window: float = None, late_seconds: float = None):
+        self.max_workers = max_workers or Config.SCHEDULER_WORKERS
+        self.batch_window = batch_window if batch_window is not None else Config.SCHEDULER_BATCH_WINDOW
+        self.late_seconds = late_seconds if late_seconds is not None else Config.SCHEDULER_LATE_SECONDS
+        self._heap: List = []
+        self._tasks: Dict[Hashable, ScheduledTask] = {}
+        self._handlers: Dict[str, Callable[[List[Hashable]], Optional[Dict[Hashable, float]]]] = {}
+        self._condition = threading.Condition()
+        self._sequence = itertools.count()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # Métricas: atraso entre o horário devido e o início, prazos perdidos
+        self._lags: Deque[float] = deque(maxlen=1000)
+        self.executed = 0
+        self.missed_deadlines = 0
+        self.failures = 0
+
+    # Cadastro de tarefas
+
+    def add(self, key: Hashable, func: Callable[[], Any], interval: float = None, daily_at: str = None,
+            due: float = None):
+        """Agenda uma tarefa periódica (a cada interval segundos ou diariamente às daily_at)"""
+        if interval is None and daily_at is None:
+            raise ValueError("Informe interval ou daily_at")
+        if due is None:
+            due = next_daily(daily_at) if daily_at else time.time() + interval
+        self._put(ScheduledTask(key, func, None, interval, daily_at, due))
+
+    def register_group(self, group: str, handler: Callable[[List[Hashable]], Optional[Dict[Hashable, float]]]):
+        """Registra o handler de um grupo: recebe as chaves vencidas e pode devolver novos intervalos por chave"""
+        self._handlers[group] = handler
+
+    def add_item(self, group: str, key: Hashable, interval: float, due: float = None):
+        """Agenda (ou atualiza) um item de grupo"""
+        with self._condition:
+            task = self._tasks.get(key)
+            if task is not None:
+                task.interval = interval
+                if due is not None and not task.running:
+                    self._push(task, due)
+                return
+        self._put(ScheduledTask(key, None, group, interval, None, time.time() if due is None else due))
+
+    def set_interval(self, key: Hashable, interval: float) -> bool:
+        """Altera o intervalo de uma tarefa já agendada; o próximo horário é recalculado com o novo intervalo"""
+        with self._condition:
+            task = self._tasks.get(key)
+            if task is None:
+                return False
+            if task.interval == interval:
+                return True
+            if not task.running:
+                # Mesma referência (última execução ou coleta) com o novo intervalo
+                base = task.due - task.interval if task.interval else time.time()
+                self._push(task, base + interval)
+            task.interval = interval
+            return True
+
+    def postpone(self, key: Hashable, interval: float = None):
+        """Empurra o próximo horário para agora + intervalo (ex.: produto atualizado por outro caminho)"""
+        with self._condition:
+            task = self._tasks.get(key)
+            if task is not None and not task.running:
+                if interval is not None:
+                    task.interval = interval
+                task.last_run = time.time()
+                self._push(task, task.last_run + task.interval)
+
+    def cancel(self, key: Hashable):
+        with self._condition:
+            self._tasks.pop(key, None)
+
+    def keys(self, group: str = None) -> List[Hashable]:
+        with self._condition:
+            return [key for key, task in self._tasks.items() if group is None or task.group == group]
+
+    def get_task(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Intervalo e próximo horário de uma tarefa"""
+        with self._condition:
+            task = self._tasks.get(key)
+            if task is None:
+                return None
+            return {
+                'interval_seconds': task.interval,
+                'daily_at': task.daily_at,
+                'next_run': datetime.utcfromtimestamp(task.due).isoformat(),
+                'last_run': datetime.utcfromtimestamp(task.last_run).isoformat() if task.last_run else None,
+                'running': task.running
+            }
+
+    def _put(self, task: ScheduledTask):
+        with self._condition:
+            self._tasks[task.key] = task
+            self._push(task, task.due)
+
+    def _push(self, task: ScheduledTask, due: float):
+        # Chamado com o lock: nova entrada no heap; as anteriores da tarefa ficam obsoletas
+        task.due = due
+        task.version += 1
+        heapq.heappush(self._heap, (due, next(self._sequence), task.key, task.version))
+        self._condition.notify()
+
+    # Execução
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scheduler')
+        self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"Agendador iniciado com {len(self._tasks)} tarefas e {self.max_workers} workers")
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._tasks.clear()
+            self._heap.clear()
+            self._condition.notify()
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        logger.info("Agendador parado")
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                due_tasks = self._pop_due(time.time())
+                if not due_tasks:
+                    # Dorme até o próximo item (ou até alguém agendar algo antes dele)
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._condition.wait(timeout)
+                    continue
+
+            self._dispatch(due_tasks)
+
+    def _pop_due(self, now: float) -> List[ScheduledTask]:
+        """Remove do heap as tarefas vencidas (e itens de grupo que vencem dentro da janela de lote)"""
+        due_tasks = []
+        has_group = False
+        while self._heap:
+            due, _, key, version = self._heap[0]
+            task = self._tasks.get(key)
+            if task is None or task.version != version or task.running:
+                heapq.heappop(self._heap)  # entrada obsoleta
+                continue
+            # Itens de grupo próximos do vencimento vão no mesmo lote
+            limit = now + self.batch_window if has_group and task.group else now
+            if due > limit:
+                break
+            heapq.heappop(self._heap)
+            task.running = True
+            has_group = has_group or task.group is not None
+            due_tasks.append(task)
+        return due_tasks
+
+    def _dispatch(self, tasks: List[ScheduledTask]):
+        now = time.time()
+        groups: Dict[str, List[ScheduledTask]] = {}
+        for task in tasks:
+            lag = max(0.0, now - task.due)
+            self._lags.append(lag)
+            if lag > self.late_seconds:
+                self.missed_deadlines += 1
+            if task.group:
+                groups.setdefault(task.group, []).append(task)
+            else:
+                self._submit(self._run_task, task)
+        for group, group_tasks in groups.items():
+            self._submit(self._run_group, group, group_tasks)
+
+    def _submit(self, func: Callable, *args):
+        executor = self._executor
+        if executor is None:
+            return
+        try:
+            executor.submit(func, *args)
+        except RuntimeError:
+            # Agendador parado entre a retirada do heap e o envio
+            pass
+
+    def _run_task(self, task: ScheduledTask):
+        try:
+            task.func()
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Erro na tarefa agendada {task.key}: {e}")
+        finally:
+            self._reschedule([task], {})
+
+    def _run_group(self, group: str, tasks: List[ScheduledTask]):
+        intervals = {}
+        try:
+            intervals = self._handlers[group]([task.key for task in tasks]) or {}
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Erro no lote agendado {group} ({len(tasks)} itens): {e}")
+        finally:
+            self._reschedule(tasks, intervals)
+
+    def _reschedule(self, tasks: List[ScheduledTask], intervals: Dict[Hashable, float]):
+        """Próximo horário contado do fim da execução (um atraso não gera execuções acumuladas)"""
+        now = time.time()
+        with self._condition:
+            self.executed += len(tasks)
+            for task in tasks:
+                task.running = False
+                task.last_run = now
+                if task.key in intervals:
+                    task.interval = intervals[task.key]
+                if self._tasks.get(task.key) is task:
+                    self._push(task, task.next_due(now))
+
+    # Métricas
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Tarefas, atraso (lag) entre o horário devido e o início e prazos perdidos"""
+        now = time.time()
+        with self._condition:
+            tasks = list(self._tasks.values())
+            lags = sorted(self._lags)
+        overdue = [now - task.due for task in tasks if not task.running and task.due <= now]
+        return {
+            'running': self._running,
+            'tasks': len(tasks),
+            'in_progress': sum(1 for task in tasks if task.running),
+            'overdue': len(overdue),
+            'queue_lag_seconds': round(max(overdue, default=0.0), 1),
+            'lag_p50_seconds': round(lags[len(lags) // 2], 2) if lags else 0.0,
+            'lag_p95_seconds': round(lags[int(len(lags) * 0.95) - 1], 2) if lags else 0.0,
+            'lag_max_seconds': round(lags[-1], 2) if lags else 0.0,
+            'executed': self.executed,
+            'missed_deadlines': self.missed_deadlines,
+            'failures': self.failures,
+            'next_due_in_seconds': round(min((task.due for task in tasks if not task.running), default=now) - now, 1)
+        }
+
+# Instância global
+scheduler = Scheduler()
+
+def get_scheduler() -> Scheduler:
+    """Retorna a instância global do agendador"""
+    return scheduler
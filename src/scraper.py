@@ -4,17 +4,15 @@ Suporta tanto scraping estático (requests/BeautifulSoup) quanto dinâmico (Play
 """
 
 import logging
-import json
 import random
 import time
 import re
 from abc import ABC, abstractmethod
 from typing import Dict, Optional, List
-from urllib.parse import urlparse, urljoin
+from urllib.parse import urljoin, urlparse
 
 import requests
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright, Page, Browser
+from playwright.sync_api import sync_playwright, Page
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
@@ -23,9 +21,24 @@ from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
 from config.settings import Config
+from src.browser_pool import BrowserPool, get_browser_pool
+from src.refresh import get_domain_limiter
+from src.http_fetcher import AsyncHttpFetcher, get_http_fetcher
+from src.http_cache import HttpCache, get_http_cache
+from src.extraction import Extraction, extract_document
+from src.structured_data import Offer, extract_offer
+from src.routing import DYNAMIC, STATIC, ScrapeRouter, get_scrape_router
+from src.resource_filter import PageMetrics, get_resource_filter
 
 logger = logging.getLogger(__name__)
 
+# Seletores que indicam que o preço já foi renderizado (prontidão da página dinâmica)
+PRICE_READY_SELECTORS = {
+    'nike': ['span[data-testid="main-price"]', '[data-automation-id="product-price"]', '.product-price'],
+    'adidas': ['[data-testid="main-price"]', '[data-auto-id="price"]', '.product-price'],
+    'generic': ['[itemprop="price"]', '.price', '.product-price', '[class*="price"]'],
+}
+
 class ProductData:
     """Classe para representar dados de um produto"""
     def __init__(self, name: str, price: float, original_price: float = None, 
@@ -39,6 +52,17 @@ class ProductData:
     
     def __repr__(self):
         return f"ProductData(name='{self.name}', price={self.price}, url='{self.url}')"
+    
+    def to_dict(self) -> Dict:
+        """Converte os dados do produto para dicionário"""
+        return {
+            'name': self.name,
+            'price': self.price,
+            'original_price': self.original_price,
+            'url': self.url,
+            'image_url': self.image_url,
+            'availability': self.availability
+        }
 
 class BaseScraper(ABC):
     """Classe base abstrata para todos os scrapers"""
@@ -83,36 +107,125 @@ class BaseScraper(ABC):
         pass
 
 class StaticScraper(BaseScraper):
-    """Scraper para conteúdo estático usando requests e BeautifulSoup"""
+    """Scraper para conteúdo estático usando requests/httpx e BeautifulSoup"""
+    
+    def __init__(self, fetcher: AsyncHttpFetcher = None, cache: HttpCache = None):
+        super().__init__()
+        # Cliente HTTP assíncrono compartilhado (conexões keep-alive por host).
+        # Quando desabilitado ou sem httpx, usa a sessão requests.
+        self.fetcher = fetcher or get_http_fetcher()
+        # Validadores e hash do conteúdo para GET condicional
+        self.cache = cache or get_http_cache()
+    
+    def _request_headers(self, url: str) -> Dict[str, str]:
+        """Headers da sessão sem os específicos de conexão (inválidos em HTTP/2),
+        acrescidos de If-None-Match/If-Modified-Since quando há cache"""
+        headers = {k: v for k, v in self.session.headers.items() if k.lower() != 'connection'}
+        headers.update(self.cache.conditional_headers(url))
+        return headers
+    
+    def fetch_page(self, url: str):
+        """GET pelo cliente compartilhado (httpx) ou pela sessão requests, sem politeness própria"""
+        if self.fetcher.enabled:
+            return self.fetcher.fetch_sync(url, self._request_headers(url), polite=False)
+        return self.session.get(url, headers=self._request_headers(url), timeout=30)
     
     def scrape_product(self, url: str) -> Optional[ProductData]:
         """Faz scraping de um produto usando requests/BeautifulSoup"""
         try:
             logger.info(f"Fazendo scraping estático de: {url}")
             
-            # Adiciona delay aleatório
-            self.random_delay()
-            
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Detecta o site e usa a lógica específica
-            domain = urlparse(url).netloc.lower()
+            # O intervalo entre requisições é aplicado por domínio pelo
+            # DomainLimiter em ScraperManager.scrape_product
+            response = self.fetch_page(url)
             
-            if 'nike' in domain:
-                return self._scrape_nike_static(soup, url)
-            elif 'adidas' in domain:
-                return self._scrape_adidas_static(soup, url)
-            else:
-                return self._scrape_generic(soup, url)
+            return self.process_response(url, response.status_code, response.headers, response.content)
                 
         except Exception as e:
             logger.error(f"Erro no scraping estático de {url}: {e}")
             return None
     
-    def _scrape_nike_static(self, soup: BeautifulSoup, url: str) -> Optional[ProductData]:
+    def process_response(self, url: str, status_code: int, headers, content: bytes) -> Optional[ProductData]:
+        """Valida o status HTTP e extrai os dados do produto
+        
+        Respostas 304 ou com o mesmo hash de conteúdo da última visita são
+        tratadas como "preço inalterado": o parsing é pulado e os dados em
+        cache são devolvidos.
+        """
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        entry = self.cache.get(url)
+        self.cache.record('requests')
+        
+        if status_code == 304 and entry and entry.get('product'):
+            self.cache.record('not_modified')
+            self.cache.record('bytes_saved', entry.get('content_length') or 0)
+            self.cache.refresh_validators(url, headers)
+            logger.debug(f"Página não modificada (304): {url}")
+            return ProductData(**entry['product'])
+        
+        if status_code >= 400 or status_code == 304:
+            logger.error(f"Erro no scraping estático de {url}: HTTP {status_code}")
+            return None
+        
+        self.cache.record('bytes_downloaded', len(content))
+        content_hash = self.cache.content_hash(content)
+        
+        if entry and entry.get('product') and entry.get('content_hash') == content_hash:
+            self.cache.record('hash_hits')
+            self.cache.refresh_validators(url, headers)
+            logger.debug(f"Conteúdo inalterado (hash): {url}")
+            return ProductData(**entry['product'])
+        
+        self.cache.record('misses')
+        product_data = self.parse_html(content, url)
+        
+        if product_data:
+            self.cache.store(url, headers, content_hash, len(content), product_data.to_dict())
+        
+        return product_data
+    
+    def parse_html(self, content: bytes, url: str) -> Optional[ProductData]:
+        """Extrai os dados do produto a partir do HTML"""
+        # Caminho rápido: JSON-LD / estado embutido lidos direto dos bytes, sem DOM
+        product_data = self._from_offer(extract_offer(content, url), url)
+        if product_data:
+            return product_data
+        
+        # Parse único compartilhado por todos os extratores do site
+        doc = extract_document(content, url)
+        
+        # Detecta o site e usa a lógica específica
+        domain = urlparse(url).netloc.lower()
+        
+        if 'nike' in domain:
+            return self._scrape_nike_static(doc, url)
+        elif 'adidas' in domain:
+            return self._scrape_adidas_static(doc, url)
+        else:
+            return self._scrape_generic(doc, url)
+    
+    def _from_offer(self, offer: Optional[Offer], url: str) -> Optional[ProductData]:
+        """Converte uma oferta estruturada completa em ProductData
+        
+        Ofertas de confiança baixa (estado sem relação comprovada com a página)
+        ficam para os seletores do DOM ou para o scraper dinâmico.
+        """
+        if not offer or not offer.complete or offer.confidence == 'low':
+            return None
+        
+        original_price = offer.high_price if offer.high_price and offer.high_price > offer.price else None
+        availability = (offer.availability or '').rsplit('/', 1)[-1]
+        
+        return ProductData(
+            name=offer.name.strip(),
+            price=offer.price,
+            original_price=original_price,
+            url=url,
+            image_url=urljoin(url, offer.image) if offer.image else "",
+            availability=availability
+        )
+    
+    def _scrape_nike_static(self, doc: Extraction, url: str) -> Optional[ProductData]:
         """Scraping específico para Nike (método estático)"""
         try:
             # Seletores comuns da Nike
@@ -134,8 +247,8 @@ class StaticScraper(BaseScraper):
                 '.price-current'
             ]
             
-            name = self._find_text_by_selectors(soup, name_selectors)
-            price_text = self._find_text_by_selectors(soup, price_selectors)
+            name = doc.select_text(name_selectors)
+            price_text = doc.select_text(price_selectors)
             
             if not name or not price_text:
                 logger.warning(f"Dados incompletos para Nike: {url}")
@@ -143,11 +256,8 @@ class StaticScraper(BaseScraper):
             
             price = self.extract_price(price_text)
             
-            # Busca imagem
-            image_url = ""
-            img_tag = soup.find('img', {'alt': re.compile(name[:20], re.I)})
-            if img_tag and img_tag.get('src'):
-                image_url = urljoin(url, img_tag['src'])
+            # Busca imagem (coletada na mesma passada do parse)
+            image_url = doc.find_image(name)
             
             return ProductData(
                 name=name.strip(),
@@ -160,7 +270,7 @@ class StaticScraper(BaseScraper):
             logger.error(f"Erro no scraping Nike estático: {e}")
             return None
     
-    def _scrape_adidas_static(self, soup: BeautifulSoup, url: str) -> Optional[ProductData]:
+    def _scrape_adidas_static(self, doc: Extraction, url: str) -> Optional[ProductData]:
         """Scraping específico para Adidas (método estático)"""
         try:
             # Seletores comuns da Adidas
@@ -180,8 +290,8 @@ class StaticScraper(BaseScraper):
                     '.product-price'
             ]
             
-            name = self._find_text_by_selectors(soup, name_selectors)
-            price_text = self._find_text_by_selectors(soup, price_selectors)
+            name = doc.select_text(name_selectors)
+            price_text = doc.select_text(price_selectors)
             
             if not name or not price_text:
                 logger.warning(f"Dados incompletos para Adidas: {url}")
@@ -189,11 +299,8 @@ class StaticScraper(BaseScraper):
             
             price = self.extract_price(price_text)
             
-            # Busca imagem
-            image_url = ""
-            img_tag = soup.find('img', {'alt': re.compile(name[:20], re.I)})
-            if img_tag and img_tag.get('src'):
-                image_url = urljoin(url, img_tag['src'])
+            # Busca imagem (coletada na mesma passada do parse)
+            image_url = doc.find_image(name)
             
             return ProductData(
                 name=name.strip(),
@@ -206,7 +313,7 @@ class StaticScraper(BaseScraper):
             logger.error(f"Erro no scraping Adidas estático: {e}")
             return None
     
-    def _scrape_generic(self, soup: BeautifulSoup, url: str) -> Optional[ProductData]:
+    def _scrape_generic(self, doc: Extraction, url: str) -> Optional[ProductData]:
         """Scraping genérico para outros sites"""
         try:
             # Seletores genéricos comuns
@@ -221,8 +328,8 @@ class StaticScraper(BaseScraper):
                 '[id*="price"]', '[id*="cost"]', '[id*="value"]'
             ]
             
-            name = self._find_text_by_selectors(soup, name_selectors)
-            price_text = self._find_text_by_selectors(soup, price_selectors)
+            name = doc.select_text(name_selectors)
+            price_text = doc.select_text(price_selectors)
             
             if not name or not price_text:
                 logger.warning(f"Dados incompletos para site genérico: {url}")
@@ -240,18 +347,14 @@ class StaticScraper(BaseScraper):
             logger.error(f"Erro no scraping genérico: {e}")
             return None
     
-    def _find_text_by_selectors(self, soup: BeautifulSoup, selectors: List[str]) -> str:
+    def _find_text_by_selectors(self, doc: Extraction, selectors: List[str]) -> str:
         """Busca texto usando uma lista de seletores CSS"""
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element and element.get_text(strip=True):
-                return element.get_text(strip=True)
-        return ""
+        return doc.select_text(selectors)
 
 class DynamicScraper(BaseScraper):
     """Scraper para conteúdo dinâmico usando Playwright"""
     
-    def __init__(self, browser_type: str = "chromium"):
+    def __init__(self, browser_type: str = "chromium", pool: BrowserPool = None):
         """
         Inicializa o scraper dinâmico.
 
@@ -261,11 +364,13 @@ class DynamicScraper(BaseScraper):
                 apresentam erros específicos (como ERR_HTTP2_PROTOCOL_ERROR) em
                 navegadores baseados em Chromium, por isso permitimos a troca para
                 Firefox ou WebKit de forma controlada.
+            pool (BrowserPool): Pool de navegadores usado fora do modo context manager.
+                O padrão é o pool global, que mantém os navegadores abertos entre
+                produtos em vez de lançar um navegador por URL.
         """
         super().__init__()
-        # O fallback estático é compartilhado entre instâncias. Quando o scraping
-        # dinâmico falha ou retorna dados incompletos, reutilizamos o StaticScraper
-        # para tentar extrair as informações com BeautifulSoup.
+        # Quando a lógica dinâmica do site falha, os extratores do StaticScraper
+        # são aplicados ao HTML renderizado (sem nova requisição).
         self.static_scraper = StaticScraper()
         self.playwright = None
         self.browser = None
@@ -273,6 +378,8 @@ class DynamicScraper(BaseScraper):
         # 'firefox' e 'webkit'. Se um valor inválido for passado, o Playwright
         # lançará um erro quando tentarmos acessar o atributo correspondente.
         self.browser_type = browser_type
+        self.pool = pool or get_browser_pool()
+        self.resource_filter = get_resource_filter()
     
     def __enter__(self):
         # Inicia o Playwright e lança o navegador apropriado. Permitimos
@@ -300,48 +407,72 @@ class DynamicScraper(BaseScraper):
         try:
             logger.info(f"Fazendo scraping dinâmico de: {url}")
             
-            page = self.browser.new_page()
-            
-            # Configura User-Agent
-            page.set_extra_http_headers({
-                'User-Agent': random.choice(Config.USER_AGENTS)
-            })
-            
-            # Navega para a página
-            page.goto(url, wait_until='networkidle', timeout=30000)
-            
-            # Adiciona delay para carregamento completo
-            page.wait_for_timeout(3000)
-            
-            # Detecta o site e usa a lógica específica
-            domain = urlparse(url).netloc.lower()
-            
-            if 'nike' in domain:
-                result = self._scrape_nike_dynamic(page, url)
-            elif 'adidas' in domain:
-                result = self._scrape_adidas_dynamic(page, url)
+            if self.browser is not None:
+                # Modo context manager: usa o navegador próprio desta instância
+                page = self.browser.new_page()
+                
+                # Configura User-Agent
+                page.set_extra_http_headers({
+                    'User-Agent': random.choice(Config.USER_AGENTS)
+                })
+                
+                try:
+                    result = self._scrape_page(page, url)
+                finally:
+                    page.close()
             else:
-                result = self._scrape_generic_dynamic(page, url)
+                # Usa um contexto isolado de um navegador já aberto no pool
+                result = self.pool.run(self.browser_type, lambda page: self._scrape_page(page, url))
 
-            page.close()
-            # If dynamic scraping failed or returned incomplete data, fall back to
-            # the static scraper. This avoids crashing when dynamic scraping
-            # cannot find the data and provides a second chance to extract the
-            # information using BeautifulSoup. The static scraper lives on
-            # self.static_scraper, initialized in __init__.
-            if result is None:
-                logger.info(f"Falling back to static scraping for: {url}")
-                try:
-                    return self.static_scraper.scrape_product(url)
-                except Exception as e:
-                    logger.error(f"Erro no fallback scraping estático de {url}: {e}")
-                    return None
             return result
                 
         except Exception as e:
             logger.error(f"Erro no scraping dinâmico de {url}: {e}")
             return None
     
+    def _scrape_page(self, page: Page, url: str) -> Optional[ProductData]:
+        """Navega até a URL e extrai os dados com a lógica do site"""
+        # Bloqueia imagens, fontes, mídia e rastreadores e mede a página
+        metrics = self.resource_filter.install(page, url)
+        try:
+            return self._load_and_scrape(page, url, metrics)
+        finally:
+            self.resource_filter.record(metrics)
+    
+    def _wait_until_ready(self, page: Page, url: str, metrics: PageMetrics):
+        """Aguarda o preço ou o JSON-LD do produto aparecer (em vez de networkidle + sleep)"""
+        domain = urlparse(url).netloc.lower()
+        site = next((s for s in ('nike', 'adidas') if s in domain), 'generic')
+        selector = ', '.join(PRICE_READY_SELECTORS[site] + ['script[type="application/ld+json"]'])
+        
+        try:
+            page.wait_for_selector(selector, state='attached', timeout=Config.PAGE_READY_TIMEOUT)
+            metrics.mark_ready()
+        except Exception:
+            logger.debug(f"Preço não apareceu em {Config.PAGE_READY_TIMEOUT} ms: {url}")
+    
+    def _load_and_scrape(self, page: Page, url: str, metrics: PageMetrics) -> Optional[ProductData]:
+        # Navega para a página e aguarda apenas o necessário para o preço
+        page.goto(url, wait_until='domcontentloaded', timeout=30000)
+        self._wait_until_ready(page, url, metrics)
+        
+        # Detecta o site e usa a lógica específica
+        domain = urlparse(url).netloc.lower()
+        
+        if 'nike' in domain:
+            result = self._scrape_nike_dynamic(page, url)
+        elif 'adidas' in domain:
+            result = self._scrape_adidas_dynamic(page, url)
+        else:
+            result = self._scrape_generic_dynamic(page, url)
+        
+        # Se a lógica do site falhar, aplica os extratores estáticos ao HTML já
+        # renderizado em vez de baixar a página de novo
+        if result is None:
+            logger.info(f"Usando extração estática sobre o HTML renderizado: {url}")
+            result = self.static_scraper.parse_html(page.content().encode('utf-8'), url)
+        return result
+    
     def _scrape_nike_dynamic(self, page: Page, url: str) -> Optional[ProductData]:
         """Scraping específico para Nike (método dinâmico)"""
         try:
@@ -372,37 +503,9 @@ class DynamicScraper(BaseScraper):
             name = self._find_text_by_selectors_dynamic(page, name_selectors)
             price_text = self._find_text_by_selectors_dynamic(page, price_selectors)
 
-            # Se não encontrarmos nome ou preço via seletores, tente extrair a partir de JSON-LD
+            # Se não encontrarmos nome ou preço via seletores, usa JSON-LD / estado embutido
             if not name or not price_text:
-                try:
-                    html = page.content()
-                    soup_fallback = BeautifulSoup(html, 'html.parser')
-                    for script_tag in soup_fallback.find_all('script', {'type': 'application/ld+json'}):
-                        try:
-                            data = json.loads(script_tag.string or script_tag.get_text())
-                        except Exception:
-                            continue
-                        # Alguns sites embutem uma lista de objetos no JSON-LD
-                        if isinstance(data, list):
-                            for entry in data:
-                                if isinstance(entry, dict) and entry.get('@type') == 'Product':
-                                    if not name:
-                                        name = entry.get('name') or ''
-                                    if not price_text:
-                                        offers = entry.get('offers', {})
-                                        price_text = offers.get('price') or offers.get('priceSpecification', {}).get('price') or ''
-                                    if name and price_text:
-                                        break
-                        elif isinstance(data, dict) and data.get('@type') == 'Product':
-                            if not name:
-                                name = data.get('name') or ''
-                            if not price_text:
-                                offers = data.get('offers', {})
-                                price_text = offers.get('price') or offers.get('priceSpecification', {}).get('price') or ''
-                        if name and price_text:
-                            break
-                except Exception:
-                    pass
+                name, price_text = self._fill_from_structured_data(page, name, price_text)
 
             if not name or not price_text:
                 logger.warning(f"Dados incompletos para Nike dinâmico: {url}")
@@ -458,37 +561,9 @@ class DynamicScraper(BaseScraper):
             name = self._find_text_by_selectors_dynamic(page, name_selectors)
             price_text = self._find_text_by_selectors_dynamic(page, price_selectors)
 
-            # Se não encontrarmos nome ou preço via seletores, tente extrair a partir de JSON-LD
+            # Se não encontrarmos nome ou preço via seletores, usa JSON-LD / estado embutido
             if not name or not price_text:
-                try:
-                    html = page.content()
-                    soup_fallback = BeautifulSoup(html, 'html.parser')
-                    for script_tag in soup_fallback.find_all('script', {'type': 'application/ld+json'}):
-                        try:
-                            data = json.loads(script_tag.string or script_tag.get_text())
-                        except Exception:
-                            continue
-                        # Alguns sites embutem uma lista de objetos no JSON-LD
-                        if isinstance(data, list):
-                            for entry in data:
-                                if isinstance(entry, dict) and entry.get('@type') == 'Product':
-                                    if not name:
-                                        name = entry.get('name') or ''
-                                    if not price_text:
-                                        offers = entry.get('offers', {})
-                                        price_text = offers.get('price') or offers.get('priceSpecification', {}).get('price') or ''
-                                    if name and price_text:
-                                        break
-                        elif isinstance(data, dict) and data.get('@type') == 'Product':
-                            if not name:
-                                name = data.get('name') or ''
-                            if not price_text:
-                                offers = data.get('offers', {})
-                                price_text = offers.get('price') or offers.get('priceSpecification', {}).get('price') or ''
-                        if name and price_text:
-                            break
-                except Exception:
-                    pass
+                name, price_text = self._fill_from_structured_data(page, name, price_text)
 
             if not name or not price_text:
                 logger.warning(f"Dados incompletos para Adidas dinâmico: {url}")
@@ -551,6 +626,20 @@ class DynamicScraper(BaseScraper):
             logger.error(f"Erro no scraping genérico dinâmico: {e}")
             return None
     
+    def _fill_from_structured_data(self, page: Page, name: str, price_text: str):
+        """Completa nome e preço com a oferta de JSON-LD / estado embutido da página"""
+        try:
+            offer = extract_offer(page.content(), page.url)
+        except Exception as e:
+            logger.debug(f"Erro ao ler dados estruturados: {e}")
+            return name, price_text
+        
+        if offer and offer.confidence != 'low':
+            name = name or offer.name or ''
+            if not price_text and offer.price:
+                price_text = f"{offer.price:.2f}"
+        return name, price_text
+    
     def _find_text_by_selectors_dynamic(self, page: Page, selectors: List[str]) -> str:
         """Busca texto usando uma lista de seletores CSS no Playwright"""
         for selector in selectors:
@@ -573,40 +662,69 @@ class DynamicScraper(BaseScraper):
     # on a DynamicScraper instance. They simply forward the call to the corresponding
     # method on the static scraper. If static scraping also fails, the error will
     # be propagated by the StaticScraper implementation.
-    def _scrape_nike_static(self, soup: BeautifulSoup, url: str) -> Optional[ProductData]:
+    def _scrape_nike_static(self, doc: Extraction, url: str) -> Optional[ProductData]:
         """Delegates Nike static scraping to the StaticScraper instance."""
-        return self.static_scraper._scrape_nike_static(soup, url)
+        return self.static_scraper._scrape_nike_static(doc, url)
 
-    def _scrape_adidas_static(self, soup: BeautifulSoup, url: str) -> Optional[ProductData]:
+    def _scrape_adidas_static(self, doc: Extraction, url: str) -> Optional[ProductData]:
         """Delegates Adidas static scraping to the StaticScraper instance."""
-        return self.static_scraper._scrape_adidas_static(soup, url)
+        return self.static_scraper._scrape_adidas_static(doc, url)
 
 class ScraperManager:
     """Gerenciador de scrapers que decide qual usar baseado no site"""
     
-    def __init__(self):
+    def __init__(self, router: ScrapeRouter = None):
         self.static_scraper = StaticScraper()
-        # Sites que requerem scraping dinâmico
-        self.dynamic_sites = ['nike.com', 'adidas.com', 'adidas.com.br']
+        # Decide, com base no histórico de cada domínio/padrão de URL, se o
+        # navegador é necessário (substitui a lista fixa de sites dinâmicos)
+        self.router = router or get_scrape_router()
+        # Scrapers dinâmicos por tipo de navegador; os navegadores ficam no pool global
+        self.dynamic_scrapers: Dict[str, DynamicScraper] = {}
+        # Limite de concorrência e intervalo entre requisições por domínio
+        self.domain_limiter = get_domain_limiter()
+    
+    def get_dynamic_scraper(self, browser_type: str) -> DynamicScraper:
+        """Retorna o scraper dinâmico (apoiado no pool) para o tipo de navegador"""
+        if browser_type not in self.dynamic_scrapers:
+            self.dynamic_scrapers[browser_type] = DynamicScraper(browser_type=browser_type)
+        return self.dynamic_scrapers[browser_type]
     
     def scrape_product(self, url: str) -> Optional[ProductData]:
         """Faz scraping de um produto usando o scraper apropriado"""
+        with self.domain_limiter.slot(url):
+            return self._scrape_product(url)
+    
+    def needs_dynamic(self, url: str) -> bool:
+        """Verifica se o roteador enviaria a URL direto ao navegador"""
+        return self.router.plan(url)[0] == DYNAMIC
+    
+    def _scrape_product(self, url: str) -> Optional[ProductData]:
+        """Escolhe entre scraping estático e dinâmico para a URL"""
+        return self._run_plan(url, self.router.plan(url))
+    
+    def _run_plan(self, url: str, plan: List[str]) -> Optional[ProductData]:
+        """Tenta os métodos na ordem do plano, registrando sucesso e latência"""
         domain = urlparse(url).netloc.lower()
         
-        # Verifica se precisa de scraping dinâmico
-        needs_dynamic = any(site in domain for site in self.dynamic_sites)
+        for method in plan:
+            started = time.monotonic()
+            
+            if method == STATIC:
+                logger.info(f"Usando scraper estático para: {domain}")
+                product_data = self.static_scraper.scrape_product(url)
+            else:
+                logger.info(f"Usando scraper dinâmico para: {domain}")
+                # Escolhe o tipo de navegador baseado no domínio. Determinados sites,
+                # como o Adidas, retornam erros de protocolo HTTP2 quando acessados
+                # com Chromium headless. Nesses casos utilizamos o Firefox.
+                browser_type = 'firefox' if 'adidas' in domain else 'chromium'
+                product_data = self.get_dynamic_scraper(browser_type).scrape_product(url)
+            
+            self.router.record(url, method, product_data is not None, time.monotonic() - started)
+            if product_data:
+                return product_data
         
-        if needs_dynamic:
-            logger.info(f"Usando scraper dinâmico para: {domain}")
-            # Escolhe o tipo de navegador baseado no domínio. Determinados sites,
-            # como o Adidas, retornam erros de protocolo HTTP2 quando acessados
-            # com Chromium headless. Nesses casos utilizamos o Firefox.
-            browser_type = 'firefox' if 'adidas' in domain else 'chromium'
-            with DynamicScraper(browser_type=browser_type) as dynamic_scraper:
-                return dynamic_scraper.scrape_product(url)
-        else:
-            logger.info(f"Usando scraper estático para: {domain}")
-            return self.static_scraper.scrape_product(url)
+        return None
     
     def test_scraper(self, url: str) -> Dict:
         """Testa o scraper em uma URL e retorna informações de debug"""
@@ -619,9 +737,7 @@ class ScraperManager:
         }
         
         try:
-            domain = urlparse(url).netloc.lower()
-            needs_dynamic = any(site in domain for site in self.dynamic_sites)
-            result['scraper_type'] = 'dynamic' if needs_dynamic else 'static'
+            result['scraper_type'] = 'dynamic' if self.needs_dynamic(url) else 'static'
             
             product_data = self.scrape_product(url)
             
@@ -0,0 +1,350 @@
+"""
+Extração rápida de dados estruturados para o Bot de Monitoramento de Preços
+Localiza blocos JSON-LD e estados de hidratação (__NEXT_DATA__ etc.) varrendo os bytes do HTML,
+sem montar uma árvore DOM, e normaliza a oferta do produto
+"""
+
+import json
+import logging
+import re
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Varredura em bytes (executada pelo motor de regex em C)
+_SCRIPT_OPEN_RE = re.compile(rb'<script\b([^>]*)>', re.IGNORECASE)
+_SCRIPT_CLOSE_RE = re.compile(rb'</script\s*>', re.IGNORECASE)
+_LDJSON_TYPE_RE = re.compile(rb'type\s*=\s*["\']?application/ld\+json', re.IGNORECASE)
+_STATE_ID_RE = re.compile(rb'id\s*=\s*["\']?(__NEXT_DATA__|__NUXT_DATA__|__APOLLO_STATE__)', re.IGNORECASE)
+_SRC_ATTR_RE = re.compile(rb'\bsrc\s*=', re.IGNORECASE)
+_STATE_ASSIGN_RE = re.compile(
+    rb'window\.(__PRELOADED_STATE__|__INITIAL_STATE__|__STATE__|__NEXT_DATA__)\s*=\s*'
+)
+_OG_IMAGE_RE = re.compile(
+    rb'<meta\s[^>]*property\s*=\s*["\']og:image["\'][^>]*content\s*=\s*["\']([^"\']+)', re.IGNORECASE
+)
+_LINK_TAG_RE = re.compile(rb'<link\s[^>]*>', re.IGNORECASE)
+_CANONICAL_REL_RE = re.compile(rb'rel\s*=\s*["\']?canonical', re.IGNORECASE)
+_HREF_ATTR_RE = re.compile(rb'href\s*=\s*["\']([^"\']+)', re.IGNORECASE)
+# Milhar no formato brasileiro sem centavos: 1.299 / 12.499
+_BRL_THOUSANDS_RE = re.compile(r'\d{1,3}(\.\d{3})+')
+
+# Chaves usadas pelos estados de hidratação das lojas
+_STATE_PRICE_KEYS = ('currentPrice', 'salePrice', 'sale_price', 'finalPrice', 'price')
+_STATE_FULL_PRICE_KEYS = ('fullPrice', 'initialPrice', 'listPrice', 'originalPrice', 'standard_price')
+_STATE_NAME_KEYS = ('fullTitle', 'title', 'name', 'productName', 'displayName')
+_STATE_SKU_KEYS = ('styleColor', 'sku', 'productId', 'model_number')
+_STATE_URL_KEYS = ('url', 'canonicalUrl', 'pdpUrl', 'productUrl')
+
+# SKUs numéricos menores que isto ("90", "1234") aparecem por acaso nos slugs das URLs
+_MIN_NUMERIC_SKU_LENGTH = 6
+_SLUG_SPLIT_RE = re.compile(r'[-/_.]+')
+
+# Objetos com nome e preço examinados por estado (recomendações, variantes, kits...)
+_MAX_STATE_CANDIDATES = 50
+
+# Limite de nós visitados por documento de estado (evita percorrer estados enormes)
+_MAX_STATE_NODES = 20000
+
+_decoder = json.JSONDecoder()
+
+class Offer:
+    """Oferta normalizada de um produto"""
+
+    def __init__(self, name: str = None, price: float = None, low_price: float = None,
+                 high_price: float = None, currency: str = None, availability: str = None,
+                 sku: str = None, image: str = None, source: str = None, url: str = None,
+                 confidence: str = 'high'):
+        self.name = name
+        self.price = price
+        self.low_price = low_price
+        self.high_price = high_price
+        self.currency = currency
+        self.availability = availability
+        self.sku = sku
+        self.image = image
+        self.source = source
+        self.url = url
+        # 'low': oferta de estado sem relação comprovada com a página (pode ser recomendação)
+        self.confidence = confidence
+
+    @property
+    def complete(self) -> bool:
+        """Há nome e preço suficientes para dispensar o DOM"""
+        return bool(self.name) and self.price is not None and self.price > 0
+
+    def __repr__(self):
+        return f"Offer(name='{self.name}', price={self.price}, source='{self.source}')"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte a oferta para dicionário"""
+        return {
+            'name': self.name,
+            'price': self.price,
+            'low_price': self.low_price,
+            'high_price': self.high_price,
+            'currency': self.currency,
+            'availability': self.availability,
+            'sku': self.sku,
+            'image': self.image,
+            'source': self.source,
+            'url': self.url,
+            'confidence': self.confidence
+        }
+
+def _to_float(value) -> Optional[float]:
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = re.sub(r'[^\d.,]', '', str(value))
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')  # 1.234,56 / 99,90
+    elif _BRL_THOUSANDS_RE.fullmatch(text):
+        text = text.replace('.', '')  # R$ 1.299
+
+    try:
+        return float(text) if text else None
+    except ValueError:
+        return None
+
+def _first_image(value) -> Optional[str]:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list) and value:
+        return _first_image(value[0])
+    if isinstance(value, dict):
+        return value.get('url') or value.get('contentUrl')
+    return None
+
+def iter_script_blocks(content: Union[bytes, str]) -> Iterator[tuple]:
+    """Gera (tipo, texto) para blocos JSON-LD e estados de hidratação
+
+    Só os trechos desses scripts são decodificados; o restante do documento
+    é apenas varrido em bytes.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    pos = 0
+    while True:
+        match = _SCRIPT_OPEN_RE.search(content, pos)
+        if not match:
+            return
+
+        attrs = match.group(1)
+        close = _SCRIPT_CLOSE_RE.search(content, match.end())
+        if not close:
+            return
+        pos = close.end()
+
+        if _LDJSON_TYPE_RE.search(attrs):
+            yield 'jsonld', content[match.end():close.start()].decode('utf-8', errors='replace')
+        elif _STATE_ID_RE.search(attrs):
+            yield 'state', content[match.end():close.start()].decode('utf-8', errors='replace')
+        elif not _SRC_ATTR_RE.search(attrs):
+            body = content[match.end():close.start()]
+            assign = _STATE_ASSIGN_RE.search(body)
+            if assign:
+                yield 'state', body[assign.end():].decode('utf-8', errors='replace')
+
+def _load_json(text: str) -> Optional[Any]:
+    """Decodifica o primeiro valor JSON do texto (ignora ';' e código após o objeto)"""
+    text = text.strip()
+    if not text:
+        return None
+    try:
+        return _decoder.raw_decode(text)[0]
+    except ValueError:
+        return None
+
+def _is_product(node: Dict[str, Any]) -> bool:
+    node_type = node.get('@type')
+    types = node_type if isinstance(node_type, list) else [node_type]
+    return any(isinstance(t, str) and t.lower() in ('product', 'productgroup') for t in types)
+
+def _offer_from_jsonld(node: Dict[str, Any]) -> Offer:
+    offer = Offer(
+        name=node.get('name'),
+        sku=node.get('sku') or node.get('mpn'),
+        image=_first_image(node.get('image')),
+        source='jsonld'
+    )
+
+    offers = node.get('offers') or []
+    if isinstance(offers, dict):
+        offers = [offers]
+
+    prices = []
+    for entry in offers:
+        if not isinstance(entry, dict):
+            continue
+        price = _to_float(entry.get('price'))
+        if price is None and isinstance(entry.get('priceSpecification'), dict):
+            price = _to_float(entry['priceSpecification'].get('price'))
+        low = _to_float(entry.get('lowPrice'))
+        high = _to_float(entry.get('highPrice'))
+
+        if price is not None:
+            prices.append(price)
+        if low is not None:
+            offer.low_price = low if offer.low_price is None else min(offer.low_price, low)
+        if high is not None:
+            offer.high_price = high if offer.high_price is None else max(offer.high_price, high)
+
+        offer.currency = offer.currency or entry.get('priceCurrency')
+        offer.availability = offer.availability or entry.get('availability') or entry.get('Availability')
+        offer.sku = offer.sku or entry.get('sku')
+
+    if prices:
+        offer.price = min(prices)
+    elif offer.low_price is not None:
+        offer.price = offer.low_price
+
+    return offer
+
+def _find_jsonld_offer(data: Any) -> Optional[Offer]:
+    """Procura o primeiro nó Product (incluindo @graph e listas)"""
+    queue = deque([data])
+    while queue:
+        node = queue.popleft()
+        if isinstance(node, dict):
+            if _is_product(node):
+                return _offer_from_jsonld(node)
+            queue.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            queue.extend(node)
+    return None
+
+def _find_state_offers(data: Any) -> List[Offer]:
+    """Objetos com nome e preço do estado de hidratação, em ordem de profundidade
+
+    O estado também traz recomendações, variantes e kits: quem escolhe a oferta
+    do produto da página é extract_offers.
+    """
+    queue = deque([data])
+    offers = []
+    visited = 0
+    while queue and visited < _MAX_STATE_NODES and len(offers) < _MAX_STATE_CANDIDATES:
+        node = queue.popleft()
+        visited += 1
+        if isinstance(node, dict):
+            price = next((_to_float(node[k]) for k in _STATE_PRICE_KEYS
+                          if k in node and not isinstance(node[k], (dict, list))), None)
+            name = next((node[k] for k in _STATE_NAME_KEYS if isinstance(node.get(k), str)), None)
+
+            if price and name:
+                high = next((_to_float(node[k]) for k in _STATE_FULL_PRICE_KEYS
+                             if k in node and not isinstance(node[k], (dict, list))), None)
+                sku = next((str(node[k]) for k in _STATE_SKU_KEYS if node.get(k)), None)
+                offers.append(Offer(
+                    name=name,
+                    price=price,
+                    high_price=high,
+                    currency=node.get('currency') or node.get('priceCurrency'),
+                    sku=sku,
+                    image=_first_image(node.get('image') or node.get('imageUrl') or node.get('squarishURL')),
+                    source='state',
+                    url=next((node[k] for k in _STATE_URL_KEYS if isinstance(node.get(k), str)), None)
+                ))
+                continue
+            queue.extend(v for v in node.values() if isinstance(v, (dict, list)))
+        elif isinstance(node, list):
+            queue.extend(node)
+    return offers
+
+def _url_path(url: str) -> str:
+    return urlparse(url).path.rstrip('/').lower()
+
+def _canonical_url(content: bytes) -> Optional[str]:
+    for tag in _LINK_TAG_RE.finditer(content):
+        if _CANONICAL_REL_RE.search(tag.group(0)):
+            href = _HREF_ATTR_RE.search(tag.group(0))
+            if href:
+                return href.group(1).decode('utf-8', errors='replace')
+    return None
+
+def _slug_tokens(text: str) -> List[str]:
+    return [token for token in _SLUG_SPLIT_RE.split(text.lower()) if token]
+
+def _sku_in_path(sku: str, path: str) -> bool:
+    """SKU presente no slug da URL como sequência de tokens inteiros (dv1234-001, não 90 em air-max-90)"""
+    if sku.isdigit() and len(sku) < _MIN_NUMERIC_SKU_LENGTH:
+        return False
+    wanted = _slug_tokens(sku)
+    tokens = _slug_tokens(path)
+    size = len(wanted)
+    return bool(wanted) and any(tokens[i:i + size] == wanted for i in range(len(tokens) - size + 1))
+
+def _matches_page(offer: Offer, skus: Set[str], paths: Set[str]) -> bool:
+    """Oferta de estado que pertence ao produto da página (SKU do JSON-LD ou URL)"""
+    if offer.sku:
+        sku = offer.sku.lower()
+        if sku in skus or any(_sku_in_path(sku, path) for path in paths):
+            return True
+    return bool(offer.url) and _url_path(offer.url) in paths
+
+def extract_offers(content: Union[bytes, str], url: str = None) -> List[Offer]:
+    """Retorna as ofertas encontradas (JSON-LD primeiro, depois estados)
+
+    Do estado de hidratação só entram ofertas cujo SKU ou URL batem com a página
+    (JSON-LD, URL canônica ou url). Sem correspondência, a primeira oferta do
+    estado só é usada quando não há JSON-LD, e com confiança baixa.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    jsonld, states = [], []
+    for kind, text in iter_script_blocks(content):
+        data = _load_json(text)
+        if data is None:
+            continue
+        if kind == 'jsonld':
+            offer = _find_jsonld_offer(data)
+            if offer:
+                jsonld.append(offer)
+        else:
+            states.extend(_find_state_offers(data))
+
+    if not states:
+        return jsonld
+
+    skus = {offer.sku.lower() for offer in jsonld if offer.sku}
+    paths = {_url_path(page_url) for page_url in (url, _canonical_url(content)) if page_url}
+    paths.discard('')
+    matched = [offer for offer in states if _matches_page(offer, skus, paths)]
+    if matched or jsonld:
+        return jsonld + matched
+
+    fallback = states[0]
+    fallback.confidence = 'low'
+    return [fallback]
+
+def extract_offer(content: Union[bytes, str], url: str = None) -> Optional[Offer]:
+    """Retorna a melhor oferta do documento, ou None
+
+    Prefere uma oferta completa (nome + preço) de JSON-LD; caso contrário
+    completa os campos faltantes com as demais fontes.
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+
+    offers = extract_offers(content, url)
+    if not offers:
+        return None
+
+    best = next((o for o in offers if o.complete), offers[0])
+    for other in offers:
+        if other is best:
+            continue
+        for field in ('name', 'price', 'currency', 'availability', 'sku', 'image', 'high_price', 'low_price'):
+            if getattr(best, field) is None:
+                setattr(best, field, getattr(other, field))
+
+    if best.image is None:
+        match = _OG_IMAGE_RE.search(content)
+        if match:
+            best.image = match.group(1).decode('utf-8', errors='replace')
+    return best
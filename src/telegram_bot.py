@@ -6,7 +6,7 @@ Gerencia comandos do bot e envio de notificações
 import logging
 import asyncio
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -14,18 +14,27 @@ from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQu
 from telegram.constants import ParseMode
 
 from src.database import DatabaseManager
-from src.scraper import ScraperManager
+from src.jobs import DONE, submit_product_add, submit_product_refresh
+from src.notifications import NotificationDispatcher
 from config.settings import Config
 
 logger = logging.getLogger(__name__)
 
+# Emoji das mensagens por tipo de alerta
+ALERT_EMOJIS = {
+    'static': '💰',
+    'percentage': '📊',
+    'lowest_ever': '🎯'
+}
+
 class TelegramBot:
     """Classe principal do bot do Telegram"""
     
     def __init__(self):
         self.application = None
-        self.scraper_manager = ScraperManager()
         self.user_states = {}  # Para controlar estados de conversação
+        # Fila de saída dos alertas, drenada no event loop do bot
+        self.notifier = NotificationDispatcher(self)
     
     def setup_bot(self):
         """Configura o bot do Telegram"""
@@ -35,7 +44,11 @@ class TelegramBot:
         
         try:
             # Cria a aplicação
-            self.application = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
+            self.application = Application.builder()\
+                .token(Config.TELEGRAM_BOT_TOKEN)\
+                .post_init(self._post_init)\
+                .post_shutdown(self.notifier.stop)\
+                .build()
             
             # Adiciona handlers de comandos
             self.application.add_handler(CommandHandler("start", self.start_command))
@@ -59,6 +72,10 @@ class TelegramBot:
             logger.error(f"Erro ao configurar bot do Telegram: {e}")
             return False
     
+    async def _post_init(self, application: Application):
+        """Inicia o despacho de notificações no loop do bot, já em execução"""
+        self.notifier.start(application)
+    
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /start"""
         chat_id = update.effective_chat.id
@@ -202,9 +219,8 @@ Para começar, envie uma URL de produto ou use /add!
         chat_id = str(update.effective_chat.id)
         
         try:
-            # Busca alertas do usuário
-            all_alerts = DatabaseManager.get_active_alerts()
-            user_alerts = [alert for alert in all_alerts if alert.chat_id == chat_id]
+            # Busca alertas do usuário (filtrados no banco, com o produto carregado)
+            user_alerts = DatabaseManager.get_alert_views(chat_id=chat_id)
             
             if not user_alerts:
                 await update.message.reply_text(
@@ -217,18 +233,18 @@ Para começar, envie uma URL de produto ou use /add!
             message = "🔔 *Seus Alertas:*\n\n"
             
             for i, alert in enumerate(user_alerts, 1):
-                product = alert.product
-                message += f"*{i}. {product.name[:30]}...*\n"
+                product = alert['product']
+                message += f"*{i}. {product['name'][:30]}...*\n"
                 
-                if alert.alert_type == 'static':
-                    message += f"📉 Preço abaixo de R$ {alert.threshold_price:.2f}\n"
-                elif alert.alert_type == 'percentage':
-                    message += f"📊 Queda de {alert.percentage_threshold}%\n"
-                elif alert.alert_type == 'lowest_ever':
+                if alert['alert_type'] == 'static':
+                    message += f"📉 Preço abaixo de R$ {alert['threshold_price']:.2f}\n"
+                elif alert['alert_type'] == 'percentage':
+                    message += f"📊 Queda de {alert['percentage_threshold']}%\n"
+                elif alert['alert_type'] == 'lowest_ever':
                     message += f"🎯 Novo mínimo histórico\n"
                 
-                message += f"💰 Preço atual: R$ {product.current_price:.2f}\n"
-                message += f"🆔 ID: `{alert.id}`\n\n"
+                message += f"💰 Preço atual: R$ {product['current_price']:.2f}\n"
+                message += f"🆔 ID: `{alert['id']}`\n\n"
             
             # Botões inline
             keyboard = [
@@ -311,42 +327,37 @@ Acesse http://localhost:5000 para mais detalhes!
                 parse_mode=ParseMode.MARKDOWN
             )
             
-            # Faz scraping
-            product_data = self.scraper_manager.scrape_product(product.url)
+            # Atualização na fila de jobs (compartilhada com a interface web); aguarda sem bloquear o event loop
+            job, _ = submit_product_refresh(product_id)
+            await asyncio.wrap_future(job.future)
             
-            if not product_data:
+            if job.status != DONE:
                 await loading_msg.edit_text(
                     "❌ Não foi possível atualizar o produto. "
                     "Verifique se a URL ainda está válida."
                 )
                 return
             
-            # Atualiza no banco
-            old_price = product.current_price
-            success = DatabaseManager.update_product_price(product_id, product_data.price)
+            old_price = job.result['old_price']
+            new_price = job.result['new_price']
+            price_change = new_price - old_price
+            change_emoji = "📈" if price_change > 0 else "📉" if price_change < 0 else "➡️"
+            price_stats = DatabaseManager.get_price_stats(product_id)
             
-            if success:
-                price_change = product_data.price - old_price
-                change_emoji = "📈" if price_change > 0 else "📉" if price_change < 0 else "➡️"
-                
-                message = f"""
+            message = f"""
 ✅ *Produto Atualizado!*
 
 📦 *{product.name[:40]}...*
 
 💰 *Preço:*
 • Anterior: R$ {old_price:.2f}
-• Atual: R$ {product_data.price:.2f}
+• Atual: R$ {new_price:.2f}
 • Variação: {change_emoji} R$ {abs(price_change):.2f}
-
+{self._format_price_stats(price_stats)}
 🕒 Atualizado agora
-                """
-                
-                await loading_msg.edit_text(message, parse_mode=ParseMode.MARKDOWN)
-            else:
-                await loading_msg.edit_text(
-                    "❌ Erro ao salvar os dados atualizados."
-                )
+            """
+            
+            await loading_msg.edit_text(message, parse_mode=ParseMode.MARKDOWN)
                 
         except ValueError:
             await update.message.reply_text(
@@ -418,10 +429,11 @@ Acesse http://localhost:5000 para mais detalhes!
         )
         
         try:
-            # Faz scraping do produto
-            product_data = self.scraper_manager.scrape_product(url)
+            # Coleta e cadastro na fila de jobs; URLs enviadas ao mesmo tempo viram um único job
+            job, _ = submit_product_add(url)
+            await asyncio.wrap_future(job.future)
             
-            if not product_data:
+            if job.status != DONE:
                 await loading_msg.edit_text(
                     "❌ Não foi possível extrair dados do produto.\n\n"
                     "Possíveis causas:\n"
@@ -432,43 +444,30 @@ Acesse http://localhost:5000 para mais detalhes!
                 )
                 return
             
-            # Adiciona ao banco de dados
-            product = DatabaseManager.add_product(
-                name=product_data.name,
-                url=url,
-                price=product_data.price,
-                image_url=product_data.image_url,
-                original_price=product_data.original_price
-            )
-            
-            if product:
-                message = f"""
+            product = job.result
+            message = f"""
 ✅ *Produto Adicionado com Sucesso!*
 
-📦 *{product_data.name[:40]}...*
-💰 *Preço:* R$ {product_data.price:.2f}
-🆔 *ID:* `{product.id}`
+📦 *{product['name'][:40]}...*
+💰 *Preço:* R$ {product['price']:.2f}
+🆔 *ID:* `{product['product_id']}`
 
 O produto está sendo monitorado!
 Use /alerts para criar alertas de preço.
-                """
-                
-                # Botões inline
-                keyboard = [
-                    [InlineKeyboardButton("🔔 Criar Alerta", callback_data=f"alert_{product.id}")],
-                    [InlineKeyboardButton("🌐 Ver no Site", url=url)]
-                ]
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                
-                await loading_msg.edit_text(
-                    message,
-                    parse_mode=ParseMode.MARKDOWN,
-                    reply_markup=reply_markup
-                )
-            else:
-                await loading_msg.edit_text(
-                    "❌ Erro ao salvar produto no banco de dados."
-                )
+            """
+            
+            # Botões inline
+            keyboard = [
+                [InlineKeyboardButton("🔔 Criar Alerta", callback_data=f"alert_{product['product_id']}")],
+                [InlineKeyboardButton("🌐 Ver no Site", url=url)]
+            ]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+            
+            await loading_msg.edit_text(
+                message,
+                parse_mode=ParseMode.MARKDOWN,
+                reply_markup=reply_markup
+            )
                 
         except Exception as e:
             logger.error(f"Erro ao processar URL {url}: {e}")
@@ -515,38 +514,69 @@ Use /alerts para criar alertas de preço.
         except:
             return False
     
-    async def send_price_alert(self, chat_id: str, product, old_price: float, new_price: float, alert_type: str):
-        """Envia alerta de preço via Telegram"""
-        if not self.application:
-            return False
+    def _format_price_stats(self, price_stats) -> str:
+        """Linhas com mínimo histórico e média de 30 dias (vazio sem estatísticas)"""
+        if not price_stats or price_stats.lowest_price is None:
+            return ""
         
-        try:
-            price_change = new_price - old_price
-            change_percent = (price_change / old_price) * 100
-            
-            # Emoji baseado no tipo de alerta
-            alert_emojis = {
-                'static': '💰',
-                'percentage': '📊',
-                'lowest_ever': '🎯'
-            }
-            
-            emoji = alert_emojis.get(alert_type, '🔔')
-            
-            message = f"""
+        lines = f"\n📊 *Histórico:*\n• Menor preço: R$ {price_stats.lowest_price:.2f}\n"
+        if price_stats.avg_30d is not None:
+            lines += f"• Média 30 dias: R$ {price_stats.avg_30d:.2f}\n"
+        return lines
+    
+    def _format_price_alert(self, product_name: str, old_price: float, new_price: float, alert_type: str,
+                            price_stats=None) -> str:
+        """Mensagem de um alerta de preço (price_stats já carregado: chamado no event loop do bot)"""
+        price_change = new_price - old_price
+        change_percent = (price_change / old_price) * 100 if old_price else 0
+        emoji = ALERT_EMOJIS.get(alert_type, '🔔')
+        
+        return f"""
 {emoji} *ALERTA DE PREÇO!*
 
-📦 *{product.name[:40]}...*
+📦 *{product_name[:40]}...*
 
 💰 *Preço:*
 • Anterior: R$ {old_price:.2f}
 • Atual: R$ {new_price:.2f}
 • Economia: R$ {abs(price_change):.2f} ({abs(change_percent):.1f}%)
-
+{self._format_price_stats(price_stats)}
 🕒 {alert_type.replace('_', ' ').title()}
 
 🛒 Aproveite a oferta!
-            """
+        """
+    
+    def format_notifications(self, items: List[Dict]) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+        """Texto e botões de uma entrega: o alerta completo ou um digest com vários alertas"""
+        if len(items) == 1:
+            item = items[0]
+            message = self._format_price_alert(item['product_name'], item['old_price'], item['new_price'],
+                                               item['alert_type'], item.get('price_stats'))
+            keyboard = [[InlineKeyboardButton("🛒 Ver Produto", url=item['product_url'])]]
+            return message, InlineKeyboardMarkup(keyboard)
+        
+        # Vários alertas para o mesmo chat: uma mensagem só (limite de envio por chat)
+        lines = [f"🔔 *{len(items)} ALERTAS DE PREÇO!*\n"]
+        shown = items[:Config.NOTIFY_DIGEST_MAX_ITEMS]
+        for item in shown:
+            emoji = ALERT_EMOJIS.get(item['alert_type'], '🔔')
+            lines.append(
+                f"{emoji} [{item['product_name'][:35]}]({item['product_url']})\n"
+                f"   R$ {item['old_price']:.2f} → *R$ {item['new_price']:.2f}*"
+            )
+        if len(items) > len(shown):
+            lines.append(f"\n… e mais {len(items) - len(shown)} alertas. Use /alerts para ver todos.")
+        lines.append("\n🛒 Aproveite as ofertas!")
+        return "\n".join(lines), None
+    
+    async def send_price_alert(self, chat_id: str, product, old_price: float, new_price: float, alert_type: str):
+        """Envia alerta de preço via Telegram (envio direto, fora da fila de notificações)"""
+        if not self.application:
+            return False
+        
+        try:
+            price_stats = await asyncio.to_thread(DatabaseManager.get_price_stats, product.id)
+            message = self._format_price_alert(product.name, old_price, new_price, alert_type, price_stats)
             
             # Botão para ver no site
             keyboard = [[InlineKeyboardButton("🛒 Ver Produto", url=product.url)]]
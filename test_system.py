@@ -7,16 +7,24 @@ Testa todos os componentes principais do sistema
 import sys
 import os
 import logging
+import random
+import tempfile
+from datetime import datetime, timedelta
 from pathlib import Path
 
 # Adiciona o diretório src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from config.settings import Config
+from src import database
 from src.database import init_database, DatabaseManager
 from src.scraper import ScraperManager
 from src.alert_manager import get_alert_manager
 
+# Os testes nunca abrem o banco real (data/price_monitor.db): init_database() sem URL,
+# inclusive o chamado por create_app(), usa este arquivo temporário
+Config.DATABASE_URL = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_system.db')}"
+
 def setup_test_logging():
     """Configura logging para testes"""
     logging.basicConfig(
@@ -28,156 +36,672 @@ def test_database():
     """Testa funcionalidades do banco de dados"""
     print("🗄️  Testando banco de dados...")
     
+    # Inicializa banco
+    init_database()
+    print("   ✅ Inicialização do banco: OK")
+    
+    product = DatabaseManager.add_product('Produto Banco', 'https://loja.com.br/banco', 100.0)
+    assert product is not None, "produto não cadastrado"
+    
+    # Testa estatísticas
+    stats = DatabaseManager.get_database_stats()
+    print(f"   📊 Estatísticas: {stats}")
+    assert stats['total_products'] >= 1
+    
+    # Testa busca de produtos
+    products = DatabaseManager.get_all_products()
+    print(f"   📦 Produtos encontrados: {len(products)}")
+    assert product.id in {item.id for item in products}
+
+def test_query_indexes():
+    """Verifica com EXPLAIN QUERY PLAN que as consultas do DatabaseManager usam índices"""
+    print("🔎 Testando índices das consultas...")
+    
+    from sqlalchemy import event
+    
+    # Banco temporário com as migrações aplicadas
+    db_path = os.path.join(tempfile.mkdtemp(), 'explain.db')
+    init_database(f'sqlite:///{db_path}')
+    
+    statements = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+    
     try:
-        # Inicializa banco
+        product = DatabaseManager.add_product('Produto EXPLAIN', 'https://loja.com.br/explain', 100.0)
+        DatabaseManager.add_product('Produto EXPLAIN 2', 'https://loja.com.br/explain-2', 120.0)
+        DatabaseManager.add_alert(product.id, '123', 'static', threshold_price=90.0)
+        
+        event.listen(database.engine, 'before_cursor_execute', capture)
+        queries = {
+            'get_product_by_id': lambda: DatabaseManager.get_product_by_id(product.id),
+            'get_product_by_url': lambda: DatabaseManager.get_product_by_url(product.url),
+            'get_price_history': lambda: DatabaseManager.get_price_history(product.id),
+            'get_lowest_price': lambda: DatabaseManager.get_lowest_price(product.id),
+            'get_price_stats': lambda: DatabaseManager.get_price_stats(product.id),
+            'get_active_alerts': lambda: DatabaseManager.get_active_alerts(),
+            'get_active_alerts(product_id)': lambda: DatabaseManager.get_active_alerts(product.id),
+            'get_alert_entries(product_ids)': lambda: DatabaseManager.get_alert_entries([product.id]),
+            'get_alert_trigger_times': lambda: DatabaseManager.get_alert_trigger_times(),
+            'get_due_notifications': lambda: DatabaseManager.get_due_notifications(datetime.utcnow()),
+            'get_alert_views(chat_id)': lambda: DatabaseManager.get_alert_views(chat_id='123'),
+            'get_product_view': lambda: DatabaseManager.get_product_view(product.id),
+            'get_products_page(last_updated)': lambda: DatabaseManager.get_products_page(
+                order='last_updated', cursor=DatabaseManager.get_products_page(order='last_updated', limit=1)[1]),
+            'get_price_history_page': lambda: DatabaseManager.get_price_history_page(product.id, since=datetime(2020, 1, 1)),
+            'get_database_stats': lambda: DatabaseManager.get_database_stats(),
+        }
+        
+        full_scans = []
+        with database.engine.connect() as conn:
+            for name, query in queries.items():
+                statements.clear()
+                query()
+                for statement, parameters in statements:
+                    plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                    for row in plan:
+                        detail = row[-1]
+                        # "SCAN tabela" sem índice = leitura da tabela inteira
+                        # ("SCAN CONSTANT ROW" é o SELECT sem FROM das subconsultas agregadas)
+                        if detail.startswith('SCAN') and 'INDEX' not in detail and detail != 'SCAN CONSTANT ROW':
+                            full_scans.append(f"{name}: {detail}")
+                print(f"   ✅ {name}")
+        
+        for scan in full_scans:
+            print(f"   ❌ Consulta sem índice: {scan}")
+        
+        assert not full_scans, f"Consultas sem índice: {full_scans}"
+        
+    finally:
+        event.remove(database.engine, 'before_cursor_execute', capture)
         init_database()
-        print("   ✅ Inicialização do banco: OK")
+
+def test_query_counts():
+    """Verifica que páginas e comandos do bot fazem um número fixo de consultas (sem N+1)"""
+    print("🧮 Testando número de consultas por página...")
+    
+    import asyncio
+    from types import SimpleNamespace
+    from sqlalchemy import event
+    from web.app import create_app
+    from src.telegram_bot import TelegramBot
+    
+    # create_app() inicializa o banco de teste: cria a aplicação antes de trocar para o temporário
+    app = create_app()
+    db_path = os.path.join(tempfile.mkdtemp(), 'queries.db')
+    init_database(f'sqlite:///{db_path}')
+    
+    statements = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    replies = []
+    
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+    
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=123), message=SimpleNamespace(reply_text=reply_text))
+    bot = TelegramBot()
+    
+    def add_products(start, count):
+        for i in range(start, start + count):
+            product = DatabaseManager.add_product(f'Produto {i}', f'https://loja.com.br/p/{i}', 100.0 + i)
+            DatabaseManager.add_price_history(product.id, 90.0 + i)
+            DatabaseManager.add_alert(product.id, '123', 'static', threshold_price=80.0)
+            DatabaseManager.add_alert(product.id, '456', 'lowest_ever')
+        return product.id
+    
+    def count_queries(client, product_id):
+        counts = {}
+        pages = {'/': '/', '/products': '/products', '/alerts': '/alerts',
+                 '/product/<id>': f'/product/{product_id}'}
+        for name, url in pages.items():
+            statements.clear()
+            response = client.get(url)
+            assert response.status_code == 200, f"{url}: HTTP {response.status_code}"
+            counts[name] = len(statements)
         
-        # Testa estatísticas
-        stats = DatabaseManager.get_database_stats()
-        print(f"   📊 Estatísticas: {stats}")
+        for name, command in (('/alerts (bot)', bot.alerts_command), ('/list (bot)', bot.list_command)):
+            statements.clear()
+            replies.clear()
+            asyncio.run(command(update, None))
+            assert replies and '❌' not in replies[0], f"{name}: {replies}"
+            counts[name] = len(statements)
+        return counts
+    
+    try:
+        with app.test_client() as client:
+            product_id = add_products(0, 2)
+            event.listen(database.engine, 'before_cursor_execute', capture)
+            small = count_queries(client, product_id)
+            event.remove(database.engine, 'before_cursor_execute', capture)
+            
+            # Cinco vezes mais produtos e alertas: o número de consultas não pode mudar
+            product_id = add_products(2, 8)
+            event.listen(database.engine, 'before_cursor_execute', capture)
+            large = count_queries(client, product_id)
         
-        # Testa busca de produtos
-        products = DatabaseManager.get_all_products()
-        print(f"   📦 Produtos encontrados: {len(products)}")
+        for name, count in small.items():
+            status = "✅" if large[name] == count else "❌"
+            print(f"   {status} {name}: {count} consultas (2 produtos) / {large[name]} (10 produtos)")
         
-        return True
+        assert small == large, f"Número de consultas cresce com os dados: {small} != {large}"
+        assert DatabaseManager.get_alert_type_counts() == {'static': 10, 'lowest_ever': 10}
         
-    except Exception as e:
-        print(f"   ❌ Erro no banco de dados: {e}")
-        return False
+    finally:
+        if event.contains(database.engine, 'before_cursor_execute', capture):
+            event.remove(database.engine, 'before_cursor_execute', capture)
+        init_database()
+
+def test_query_cache():
+    """Testa o cache de consultas: uma invalidação durante a carga impede guardar o valor antigo"""
+    print("🗃️ Testando cache de consultas...")
+    
+    from src.database import QueryCache
+    
+    cache = QueryCache(ttl=60, max_entries=10, enabled=True)
+    
+    def stale_loader():
+        # Uma gravação concorrente invalida a chave enquanto a leitura antiga está em andamento
+        cache.invalidate(('product', 1))
+        return 'antigo'
+    
+    assert cache.get_or_load(('product', 1), stale_loader) == 'antigo'
+    assert cache.get_or_load(('product', 1), lambda: 'novo') == 'novo', "valor carregado antes da invalidação foi guardado"
+    assert cache.get_or_load(('product', 1), lambda: 'outro') == 'novo'
+    
+    def clearing_loader():
+        cache.clear()
+        return 'antigo'
+    
+    cache.get_or_load(('product', 2), clearing_loader)
+    assert cache.get_or_load(('product', 2), lambda: 'novo') == 'novo', "valor carregado antes do clear foi guardado"
+    
+    print("   ✅ Cargas concorrentes com invalidação não repovoam o cache")
 
 def test_scraper():
     """Testa o sistema de scraping"""
     print("🕷️  Testando scraper...")
     
-    try:
-        scraper = ScraperManager()
-        
-        # URLs de teste
-        test_urls = [
-            "https://www.nike.com.br/produto/tenis-nike-air-max-90-masculino",
-            "https://www.adidas.com.br/tenis-ultraboost-22"
-        ]
+    scraper = ScraperManager()
+    
+    # URLs de teste (dependem da rede: falhas de coleta são apenas informadas)
+    test_urls = [
+        "https://www.nike.com.br/produto/tenis-nike-air-max-90-masculino",
+        "https://www.adidas.com.br/tenis-ultraboost-22"
+    ]
+    
+    for url in test_urls:
+        print(f"   🔍 Testando: {url[:50]}...")
         
-        for url in test_urls:
-            print(f"   🔍 Testando: {url[:50]}...")
+        try:
+            result = scraper.test_scraper(url)
             
-            try:
-                result = scraper.test_scraper(url)
+            if result['success']:
+                print(f"   ✅ Scraper {result['scraper_type']}: OK")
+                print(f"      Nome: {result['data']['name'][:40]}...")
+                print(f"      Preço: R$ {result['data']['price']:.2f}")
+            else:
+                print(f"   ⚠️  Scraper falhou: {result['error']}")
                 
-                if result['success']:
-                    print(f"   ✅ Scraper {result['scraper_type']}: OK")
-                    print(f"      Nome: {result['data']['name'][:40]}...")
-                    print(f"      Preço: R$ {result['data']['price']:.2f}")
-                else:
-                    print(f"   ⚠️  Scraper falhou: {result['error']}")
-                    
-            except Exception as e:
-                print(f"   ❌ Erro no teste: {e}")
-        
-        return True
-        
-    except Exception as e:
-        print(f"   ❌ Erro no scraper: {e}")
-        return False
+        except Exception as e:
+            print(f"   ❌ Erro no teste: {e}")
+
+def test_structured_data():
+    """Testa a escolha da oferta do estado de hidratação (só a do produto da página) e preços em reais"""
+    print("🧾 Testando dados estruturados...")
+    
+    import json
+    from src.structured_data import extract_offer
+    
+    state = {'props': {
+        'recommendations': [{'name': 'Outro Tênis', 'price': 199.9, 'styleColor': 'AA1111-001'}],
+        'product': {'name': 'Tênis Air Max', 'price': 'R$ 1.299', 'styleColor': 'DV1234-001'}
+    }}
+    html = f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(state)}</script></html>'
+    
+    offer = extract_offer(html, 'https://www.nike.com.br/tenis-air-max-dv1234-001')
+    assert offer.name == 'Tênis Air Max' and offer.price == 1299.0, f"oferta errada: {offer}"
+    assert offer.confidence == 'high'
+    
+    # Recomendação primeiro no estado e nenhuma relação com a página: confiança baixa
+    state['props'] = {'recommendations': state['props']['recommendations']}
+    html = f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(state)}</script></html>'
+    offer = extract_offer(html, 'https://www.nike.com.br/tenis-air-max-dv1234-001')
+    assert offer.confidence == 'low'
+    static_scraper = ScraperManager().static_scraper
+    assert static_scraper._from_offer(offer, 'https://www.nike.com.br/tenis-air-max-dv1234-001') is None, \
+        "oferta de confiança baixa aceita sem o DOM"
+    
+    # ID curto da recomendação aparece por acaso no slug ("air-max-90"): não é o produto da página
+    state['props'] = {'recommendations': [{'name': 'Outro Tênis', 'price': 199.9, 'productId': 90}]}
+    html = f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps(state)}</script></html>'
+    offer = extract_offer(html, 'https://www.nike.com.br/tenis-air-max-90-dv1234-001')
+    assert offer.confidence == 'low', "ID curto casado como substring da URL"
+    print("   ✅ Oferta do produto da página escolhida, recomendação marcada com confiança baixa, R$ 1.299 = 1299.0")
 
 def test_alert_system():
     """Testa o sistema de alertas"""
     print("🔔 Testando sistema de alertas...")
     
+    alert_manager = get_alert_manager()
+    
+    # Testa estatísticas
+    stats = alert_manager.get_alert_statistics()
+    print(f"   📊 Estatísticas de alertas: {stats}")
+    assert stats, "estatísticas de alertas indisponíveis"
+    
+    # Testa sistema de alertas
+    test_result = alert_manager.test_alert_system()
+    assert test_result['success'], f"sistema de alertas com problemas: {test_result['errors']}"
+    
+    print("   ✅ Sistema de alertas: OK")
+    print(f"      Produtos verificados: {test_result['products_checked']}")
+    print(f"      Produtos atualizados: {test_result['products_updated']}")
+    print(f"      Alertas disparados: {test_result['alerts_triggered']}")
+    # Atualizações dependem da rede: erros por produto são apenas informados
+    for error in test_result['errors']:
+        print(f"      ⚠️  {error}")
+
+def test_price_write_failure():
+    """Testa se um lote de preços não gravado aparece como falha nas estatísticas e nos jobs"""
+    print("💾 Testando falha na gravação de preços...")
+    
+    from types import SimpleNamespace
+    
+    db_path = os.path.join(tempfile.mkdtemp(), 'write_failure.db')
+    init_database(f'sqlite:///{db_path}')
+    
+    alert_manager = get_alert_manager()
+    limiter = alert_manager.refresh_engine.limiter
+    delays = (limiter.min_delay, limiter.max_delay)
+    scrape_product = alert_manager.scraper_manager.scrape_product
+    apply_price_updates = DatabaseManager.apply_price_updates
+    
     try:
-        alert_manager = get_alert_manager()
+        products = [DatabaseManager.add_product(f'Produto {i}', f'https://loja.com.br/falha/{i}', 100.0)
+                    for i in range(3)]
+        limiter.min_delay = limiter.max_delay = 0
+        alert_manager.scraper_manager.scrape_product = lambda url: SimpleNamespace(price=90.0)
+        # Erro de banco: apply_price_updates desfaz a transação e não devolve nenhum produto
+        DatabaseManager.apply_price_updates = staticmethod(lambda results: {})
         
-        # Testa estatísticas
-        stats = alert_manager.get_alert_statistics()
-        print(f"   📊 Estatísticas de alertas: {stats}")
+        alert_manager.refresh_due_products([('product', product.id) for product in products])
+        stats = alert_manager.last_cycle_stats
+        assert stats['updated'] == 0 and stats['failed'] == 3, f"gravação falha contada como sucesso: {stats}"
         
-        # Testa sistema de alertas
-        test_result = alert_manager.test_alert_system()
+        try:
+            alert_manager.refresh_product_now(products[0].id)
+            raise AssertionError("job de atualização concluído sem gravar o preço")
+        except RuntimeError:
+            pass
+        print(f"   ✅ {stats['write_failed']} preços não gravados contados como falha; job de atualização falhou")
+    finally:
+        DatabaseManager.apply_price_updates = apply_price_updates
+        alert_manager.scraper_manager.scrape_product = scrape_product
+        limiter.min_delay, limiter.max_delay = delays
+        init_database()
+
+def test_alert_index():
+    """Testa se o índice de alertas dispara exatamente o que a avaliação por alerta dispara"""
+    print("🗂️  Testando índice de alertas...")
+    
+    from src.alert_index import AlertIndex, AlertEntry
+    
+    rng = random.Random(42)
+    alerts = []
+    for alert_id in range(1, 3001):
+        alert_type = rng.choice(['static', 'percentage', 'lowest_ever'])
+        alerts.append(AlertEntry(
+            alert_id, rng.randint(1, 200), '123', alert_type,
+            round(rng.uniform(50, 300), 2) if alert_type == 'static' else None,
+            rng.choice([None, 5, 10, 15, 25.5, 40]) if alert_type == 'percentage' else None
+        ))
+    
+    changes = []
+    for product_id in range(1, 201):
+        old_price = round(rng.uniform(80, 400), 2)
+        new_price = rng.choice([old_price, round(old_price * rng.uniform(0.5, 1.2), 2)])
+        changes.append((product_id, old_price, new_price, round(rng.uniform(60, 300), 2)))
+    
+    # Regras de cada tipo de alerta, avaliadas alerta por alerta (referência)
+    checks = {
+        'static': lambda alert, old, new, lowest: bool(alert.threshold_price) and new <= alert.threshold_price,
+        'percentage': lambda alert, old, new, lowest: (bool(alert.percentage_threshold) and old > 0
+                                                       and (old - new) / old * 100 >= alert.percentage_threshold),
+        'lowest_ever': lambda alert, old, new, lowest: lowest is not None and new < lowest - 0.01,
+    }
+    expected = {
+        alert.id
+        for product_id, old, new, lowest in changes
+        for alert in alerts
+        if alert.product_id == product_id and checks[alert.alert_type](alert, old, new, lowest)
+    }
+    fired = {alert.id for alert, _, _, _ in AlertIndex(alerts).evaluate(changes)}
+    
+    assert fired == expected, f"índice disparou {len(fired)} alertas, esperado {len(expected)}"
+    print(f"   ✅ {len(fired)} alertas disparados em {len(changes)} mudanças, iguais à avaliação por alerta")
+
+def test_price_stats_windows():
+    """Testa se as janelas de 7/30/90 dias andam com o tempo e se as estatísticas são reconstruídas ao iniciar"""
+    print("📉 Testando janelas das estatísticas de preço...")
+    
+    db_path = os.path.join(tempfile.mkdtemp(), 'windows.db')
+    init_database(f'sqlite:///{db_path}')
+    
+    try:
+        product = DatabaseManager.add_product('Produto Janela', 'https://loja.com.br/janela', 100.0)
+        DatabaseManager.update_product_price(product.id, 50.0)
+        DatabaseManager.update_product_price(product.id, 100.0)
+        stats = DatabaseManager.get_price_stats(product.id)
+        assert stats.min_7d == 50.0 and stats.min_30d == 50.0
         
-        if test_result['success']:
-            print("   ✅ Sistema de alertas: OK")
-            print(f"      Produtos verificados: {test_result['products_checked']}")
-            print(f"      Produtos atualizados: {test_result['products_updated']}")
-            print(f"      Alertas disparados: {test_result['alerts_triggered']}")
-        else:
-            print("   ⚠️  Sistema de alertas com problemas")
-            for error in test_result['errors']:
-                print(f"      ❌ {error}")
+        # Oito dias depois, com o preço parado: a promoção sai da janela de 7 dias
+        refreshed = DatabaseManager.refresh_window_stats(datetime.utcnow() + timedelta(days=8))
+        stats = DatabaseManager.get_price_stats(product.id)
+        assert refreshed == 1
+        assert stats.min_7d == 100.0 and stats.avg_7d == 100.0, f"janela de 7 dias parada: {stats.min_7d}"
+        assert stats.min_30d == 50.0
+        print(f"   ✅ min_7d 50.0 -> {stats.min_7d} após 8 dias sem mudanças, min_30d mantido em {stats.min_30d}")
         
-        return True
+        # Banco atualizado de uma versão sem a tabela de estatísticas: reconstruída ao iniciar
+        db = database.get_db()
+        try:
+            db.query(database.ProductPriceStats).delete()
+            db.commit()
+        finally:
+            db.close()
+        init_database(f'sqlite:///{db_path}')
+        assert DatabaseManager.get_lowest_price(product.id) == 50.0, "mínimo histórico perdido sem backfill"
+        print("   ✅ Estatísticas reconstruídas automaticamente na inicialização")
+    finally:
+        init_database()
+
+def test_alert_throttle():
+    """Testa se o throttling sobrevive a reinícios e respeita o intervalo de cada alerta"""
+    print("⏱️  Testando throttling persistente de alertas...")
+    
+    from sqlalchemy import event
+    from src.alert_throttle import AlertThrottle
+    
+    db_path = os.path.join(tempfile.mkdtemp(), 'throttle.db')
+    init_database(f'sqlite:///{db_path}')
+    
+    statements = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    try:
+        product = DatabaseManager.add_product('Produto Throttle', 'https://loja.com.br/throttle', 100.0)
+        recent = DatabaseManager.add_alert(product.id, '123', 'static', threshold_price=90.0)
+        short = DatabaseManager.add_alert(product.id, '123', 'percentage', percentage_threshold=10, throttle_seconds=60)
+        DatabaseManager.update_alert_triggered(recent.id, datetime.utcnow() - timedelta(minutes=10))
+        DatabaseManager.update_alert_triggered(short.id, datetime.utcnow() - timedelta(minutes=10))
         
-    except Exception as e:
-        print(f"   ❌ Erro no sistema de alertas: {e}")
-        return False
+        # Instância nova = processo reiniciado: o estado vem do banco
+        throttle = AlertThrottle(default_seconds=3600)
+        event.listen(database.engine, 'before_cursor_execute', capture)
+        checks = [throttle.is_throttled(alert) for alert in (recent, short) * 50]
+        event.remove(database.engine, 'before_cursor_execute', capture)
+        
+        assert checks[:2] == [True, False], f"throttling inesperado: {checks[:2]}"
+        assert len(statements) == 1, f"{len(statements)} consultas para 100 verificações"
+        print(f"   ✅ Disparo recente bloqueado após reinício, intervalo próprio respeitado, {len(statements)} consulta")
+    finally:
+        init_database()
 
-def test_web_interface():
-    """Testa a interface web"""
-    print("🌐 Testando interface web...")
+def test_notification_outbox():
+    """Testa a fila de notificações: digest por chat, intervalo por chat e nova tentativa com backoff"""
+    print("📨 Testando fila de notificações...")
+    
+    import asyncio
+    from types import SimpleNamespace
+    from telegram.error import NetworkError
+    from src.notifications import NotificationDispatcher
+    from src.telegram_bot import get_telegram_bot
+    
+    db_path = os.path.join(tempfile.mkdtemp(), 'outbox.db')
+    init_database(f'sqlite:///{db_path}')
+    digest_delay = Config.NOTIFY_DIGEST_DELAY_SECONDS
+    Config.NOTIFY_DIGEST_DELAY_SECONDS = 0
+    
+    sent = []
+    
+    async def send_message(chat_id, text, **kwargs):
+        if chat_id == '3':
+            raise NetworkError("falha simulada")
+        sent.append((chat_id, text))
+    
+    bot = SimpleNamespace(application=SimpleNamespace(bot=SimpleNamespace(send_message=send_message)),
+                          format_notifications=get_telegram_bot().format_notifications)
+    dispatcher = NotificationDispatcher(bot, global_rate=1000, chat_interval=60)
+    get_price_stats = DatabaseManager.get_price_stats
+    
+    def notification(chat_id, product, alert_type='static'):
+        return {'chat_id': chat_id, 'alert_id': None, 'product_id': product.id, 'alert_type': alert_type,
+                'old_price': 100.0, 'new_price': 80.0}
     
     try:
-        from web.app import create_app
+        first = DatabaseManager.add_product('Produto Outbox 1', 'https://loja.com.br/outbox-1', 100.0)
+        second = DatabaseManager.add_product('Produto Outbox 2', 'https://loja.com.br/outbox-2', 100.0)
+        dispatcher.enqueue([notification('1', first), notification('1', second, 'percentage'),
+                            notification('1', first, 'lowest_ever'), notification('2', first), notification('3', second)])
         
-        app = create_app()
+        # Formatação no event loop do bot: as estatísticas vêm da fila, sem consulta síncrona ao banco
+        DatabaseManager.get_price_stats = staticmethod(lambda product_id: 1 / 0)
+        try:
+            asyncio.run(dispatcher.drain_once())
+        finally:
+            DatabaseManager.get_price_stats = get_price_stats
+        assert sorted(chat for chat, _ in sent) == ['1', '2'], f"mensagens enviadas: {sent}"
+        assert '3 ALERTAS' in dict(sent)['1'], "alertas do mesmo chat deveriam virar um digest"
+        assert 'Menor preço: R$ 100.00' in dict(sent)['2'], "estatísticas de preço ausentes do alerta"
         
-        with app.test_client() as client:
-            # Testa página principal
-            response = client.get('/')
-            if response.status_code == 200:
-                print("   ✅ Dashboard: OK")
-            else:
-                print(f"   ❌ Dashboard falhou: {response.status_code}")
-            
-            # Testa API de estatísticas
-            response = client.get('/api/stats')
-            if response.status_code == 200:
-                print("   ✅ API de estatísticas: OK")
-            else:
-                print(f"   ❌ API falhou: {response.status_code}")
-            
-            # Testa página de produtos
-            response = client.get('/products')
-            if response.status_code == 200:
-                print("   ✅ Página de produtos: OK")
-            else:
-                print(f"   ❌ Página de produtos falhou: {response.status_code}")
+        # Chat 1 ainda no intervalo; chat 3 reagendado com backoff
+        dispatcher.enqueue([notification('1', second)])
+        asyncio.run(dispatcher.drain_once())
+        counts = DatabaseManager.get_outbox_counts()
+        assert len(sent) == 2 and counts == {'sent': 4, 'pending': 2}, f"fila inesperada: {counts}"
         
-        return True
+        # Notificação e last_triggered na mesma transação: uma linha inválida desfaz as duas gravações
+        alert = DatabaseManager.add_alert(first.id, '4', 'static', threshold_price=90.0)
+        row = dict(notification('4', first), alert_id=alert.id, next_attempt_at=datetime.utcnow())
+        assert not DatabaseManager.trigger_alerts([alert.id], datetime.utcnow(), [dict(row, chat_id=None)])
+        assert DatabaseManager.get_outbox_counts() == counts, "notificação gravada sem o alerta marcado"
+        assert DatabaseManager.get_active_alerts(first.id)[0].last_triggered is None, "alerta marcado sem a notificação"
+        assert DatabaseManager.trigger_alerts([alert.id], datetime.utcnow(), [row])
+        assert DatabaseManager.get_outbox_counts()['pending'] == 3
+        assert DatabaseManager.get_active_alerts(first.id)[0].last_triggered is not None
         
-    except Exception as e:
-        print(f"   ❌ Erro na interface web: {e}")
-        return False
+        print(f"   ✅ {len(sent)} mensagens para 6 notificações, intervalo por chat e backoff respeitados")
+    finally:
+        Config.NOTIFY_DIGEST_DELAY_SECONDS = digest_delay
+        init_database()
 
-def test_configuration():
-    """Testa configurações do sistema"""
-    print("⚙️  Testando configurações...")
+def test_event_bus():
+    """Testa a reconexão SSE: reenvio na mesma execução e ressincronização depois de um reinício"""
+    print("📡 Testando barramento de eventos...")
+    
+    import time
+    from src.events import EventBus
+    
+    before_restart = EventBus(history_size=100)
+    for price in (100.0, 90.0, 80.0):
+        last = before_restart.publish('price', {'product_id': 1, 'new_price': price})
+    
+    # Mesma execução: recebe só o que perdeu, sem ressincronizar
+    subscription = before_restart.subscribe(last_event_id=f"{before_restart.boot}-1")
+    assert [event.data['new_price'] for event in subscription.get(timeout=0)] == [90.0, 80.0]
+    assert subscription.take_dropped() == 0
+    
+    # Processo reiniciado: a sequência recomeça, o id antigo (maior) pede ressincronização
+    time.sleep(0.002)
+    after_restart = EventBus(history_size=100)
+    after_restart.publish('price', {'product_id': 1, 'new_price': 70.0})
+    subscription = after_restart.subscribe(last_event_id=last.id)
+    assert subscription.take_dropped() == 1, "cliente com id de antes do reinício não ressincronizou"
+    assert subscription.get(timeout=0) == []
+    print(f"   ✅ Reenvio de 2 eventos na reconexão; id {last.id} de antes do reinício gera resync")
+
+def test_domain_limiter():
+    """Testa que threads e corrotinas dividem as mesmas vagas por domínio"""
+    print("🚦 Testando limite por domínio compartilhado...")
+    
+    import asyncio
+    import threading
+    import time
+    from src.refresh import DomainLimiter
+    
+    limiter = DomainLimiter(limits={'nike.com.br': 1}, min_delay=0, max_delay=0)
+    held = threading.Event()
+    released = []
     
+    def hold_slot():
+        with limiter.slot('https://www.nike.com.br/tenis-1'):
+            held.set()
+            time.sleep(0.3)
+            released.append(time.monotonic())
+    
+    async def async_request():
+        async with limiter.async_slot('https://nike.com.br/tenis-2'):
+            return time.monotonic()
+    
+    worker = threading.Thread(target=hold_slot)
+    worker.start()
+    held.wait()
+    acquired = asyncio.run(async_request())
+    worker.join()
+    
+    assert acquired >= released[0], "corrotina ocupou a vaga do domínio enquanto a thread a usava"
+    print("   ✅ Busca assíncrona aguardou a vaga ocupada pelo ciclo de atualização")
+
+def test_scheduler():
+    """Testa o agendador: ordem por horário, lotes por grupo, troca de intervalo em execução e métricas de atraso"""
+    print("⏰ Testando agendador orientado a eventos...")
+    
+    import time
+    from src.scheduler import Scheduler
+    
+    scheduler = Scheduler(max_workers=2, batch_window=0.05, late_seconds=0.5)
+    batches = []
+    ticks = []
+    
+    scheduler.register_group('product', lambda keys: batches.append(sorted(product_id for _, product_id in keys)))
+    now = time.time()
+    for product_id, offset in ((1, 0.0), (2, 0.02), (3, 0.3), (4, -2.0)):
+        scheduler.add_item('product', ('product', product_id), interval=60, due=now + offset)
+    scheduler.add('tick', lambda: ticks.append(time.time()), interval=0.1, due=now)
+    
+    scheduler.start()
     try:
-        # Verifica configurações básicas
-        print(f"   📁 Banco de dados: {Config.DATABASE_URL}")
-        print(f"   🌐 Flask host: {Config.FLASK_HOST}:{Config.FLASK_PORT}")
-        print(f"   📝 Log level: {Config.LOG_LEVEL}")
-        
-        # Verifica token do Telegram
-        if Config.TELEGRAM_BOT_TOKEN:
-            print("   ✅ Token do Telegram: Configurado")
-        else:
-            print("   ⚠️  Token do Telegram: Não configurado")
+        time.sleep(0.6)
+        scheduler.set_interval('tick', 60)
+        executed = len(ticks)
+        time.sleep(0.3)
+        stats = scheduler.get_stats()
+    finally:
+        scheduler.stop()
+    
+    assert batches == [[1, 2, 4], [3]], f"lotes inesperados: {batches}"
+    assert executed >= 3, f"tarefa periódica executada {executed} vezes"
+    assert len(ticks) <= executed + 1, "novo intervalo não aplicado"
+    assert stats['missed_deadlines'] == 1, f"prazos perdidos: {stats['missed_deadlines']}"
+    assert stats['lag_max_seconds'] >= 2.0 and stats['executed'] >= 4 + executed
+    print(f"   ✅ {len(batches)} lotes na ordem dos horários, {executed} execuções periódicas, "
+          f"{stats['missed_deadlines']} prazo perdido (atraso máximo {stats['lag_max_seconds']}s)")
+
+def test_cadence():
+    """Testa a cadência adaptativa: voláteis e alertas próximos encurtam, estáveis esticam, operador prevalece"""
+    print("📈 Testando cadência adaptativa de atualização...")
+    
+    from sqlalchemy import insert
+    from src.cadence import CadenceModel
+    
+    db_path = os.path.join(tempfile.mkdtemp(), 'cadence.db')
+    init_database(f'sqlite:///{db_path}')
+    
+    try:
+        volatile = DatabaseManager.add_product('Produto Volátil', 'https://loja.com.br/volatil', 100.0)
+        stable = DatabaseManager.add_product('Produto Estável', 'https://loja.com.br/estavel', 100.0)
+        near_alert = DatabaseManager.add_product('Produto com Alerta', 'https://loja.com.br/alerta', 100.0)
+        pinned = DatabaseManager.add_product('Produto Fixo', 'https://loja.com.br/fixo', 100.0)
+        DatabaseManager.add_alert(near_alert.id, '123', 'static', threshold_price=99.0)
+        DatabaseManager.set_refresh_interval(pinned.id, 900)
         
-        # Verifica diretórios
-        directories = ['data', 'logs', 'web/templates', 'web/static']
-        for directory in directories:
-            if Path(directory).exists():
-                print(f"   ✅ Diretório {directory}: OK")
-            else:
-                print(f"   ❌ Diretório {directory}: Não encontrado")
+        now = datetime.utcnow()
+        db = database.get_db()
+        try:
+            # Volátil: uma mudança por hora no último dia; estável: cadastrado há 20 dias, sem mudanças
+            db.execute(insert(database.PriceHistory), [
+                {'product_id': volatile.id, 'price': 100.0 - hour, 'timestamp': now - timedelta(hours=hour)}
+                for hour in range(1, 24)
+            ])
+            db.query(database.PriceHistory).filter(database.PriceHistory.product_id == stable.id)\
+              .update({'timestamp': now - timedelta(days=20)})
+            db.commit()
+        finally:
+            db.close()
+        
+        model = CadenceModel(min_seconds=300, max_seconds=21600)
+        intervals = model.intervals(now=now)
         
-        return True
+        assert intervals[stable.id] == 21600, f"estável fora do teto: {intervals[stable.id]}"
+        assert 300 <= intervals[volatile.id] < 1800, f"volátil: {intervals[volatile.id]}"
+        assert intervals[near_alert.id] < 1800, f"alerta a 1% do preço: {intervals[near_alert.id]}"
+        assert intervals[pinned.id] == 900, "intervalo do operador ignorado"
         
-    except Exception as e:
-        print(f"   ❌ Erro nas configurações: {e}")
-        return False
+        model.record_detections([120.0, 600.0, 60.0])
+        stats = model.get_stats()
+        assert stats['detections'] == 3 and stats['detection_lag_max_seconds'] == 600.0
+        assert stats['products'] == 4 and stats['at_ceiling'] == 1
+        assert stats['requests_per_day'] == round(sum(86400 / seconds for seconds in intervals.values()))
+        print(f"   ✅ Intervalos: volátil {intervals[volatile.id]}s, alerta próximo {intervals[near_alert.id]}s, "
+              f"estável {intervals[stable.id]}s; {stats['requests_per_day']} requisições/dia")
+    finally:
+        init_database()
+
+def test_web_interface():
+    """Testa a interface web"""
+    print("🌐 Testando interface web...")
+    
+    from web.app import create_app
+    
+    app = create_app()
+    
+    with app.test_client() as client:
+        # Dashboard, API de estatísticas e página de produtos
+        for name, url in (('Dashboard', '/'), ('API de estatísticas', '/api/stats'), ('Página de produtos', '/products')):
+            response = client.get(url)
+            assert response.status_code == 200, f"{name} falhou: HTTP {response.status_code}"
+            print(f"   ✅ {name}: OK")
+
+def test_configuration():
+    """Testa configurações do sistema"""
+    print("⚙️  Testando configurações...")
+    
+    # Verifica configurações básicas
+    print(f"   📁 Banco de dados: {Config.DATABASE_URL}")
+    print(f"   🌐 Flask host: {Config.FLASK_HOST}:{Config.FLASK_PORT}")
+    print(f"   📝 Log level: {Config.LOG_LEVEL}")
+    assert Config.DATABASE_URL and Config.FLASK_PORT, "configurações básicas ausentes"
+    
+    # Verifica token do Telegram
+    if Config.TELEGRAM_BOT_TOKEN:
+        print("   ✅ Token do Telegram: Configurado")
+    else:
+        print("   ⚠️  Token do Telegram: Não configurado")
+    
+    # Verifica diretórios
+    directories = ['data', 'logs', 'web/templates', 'web/static']
+    for directory in directories:
+        if Path(directory).exists():
+            print(f"   ✅ Diretório {directory}: OK")
+        else:
+            print(f"   ⚠️  Diretório {directory}: Não encontrado")
 
 def main():
     """Executa todos os testes"""
@@ -189,8 +713,21 @@ def main():
     tests = [
         ("Configurações", test_configuration),
         ("Banco de Dados", test_database),
+        ("Índices", test_query_indexes),
+        ("Consultas por página", test_query_counts),
+        ("Cache de Consultas", test_query_cache),
         ("Scraper", test_scraper),
+        ("Dados Estruturados", test_structured_data),
         ("Sistema de Alertas", test_alert_system),
+        ("Falha na Gravação", test_price_write_failure),
+        ("Índice de Alertas", test_alert_index),
+        ("Janelas de Preço", test_price_stats_windows),
+        ("Throttling de Alertas", test_alert_throttle),
+        ("Fila de Notificações", test_notification_outbox),
+        ("Barramento de Eventos", test_event_bus),
+        ("Limite por Domínio", test_domain_limiter),
+        ("Agendador", test_scheduler),
+        ("Cadência Adaptativa", test_cadence),
         ("Interface Web", test_web_interface)
     ]
     
@@ -200,8 +737,13 @@ def main():
         print(f"\n🔍 {test_name.upper()}")
         print("-" * 30)
         
+        # Um teste passa quando termina sem exceção (as verificações são asserts)
         try:
-            results[test_name] = test_func()
+            test_func()
+            results[test_name] = True
+        except AssertionError as e:
+            print(f"   ❌ Verificação falhou: {e}")
+            results[test_name] = False
         except Exception as e:
             print(f"   ❌ Erro crítico: {e}")
             results[test_name] = False
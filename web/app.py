@@ -5,18 +5,24 @@ Aplicação Flask para interface web do Bot de Monitoramento de Preços
 import logging
 import sys
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Any
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, flash, stream_with_context
 from flask_cors import CORS
 
 # Adiciona o diretório src ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from src.database import DatabaseManager, init_database
+from src.database import DatabaseManager, init_database, PRODUCT_FIELDS, HISTORY_FIELDS
+from src.history import get_history_manager, HISTORY_RANGES
+from src.events import get_event_bus
+from src.jobs import get_job_queue, submit_product_refresh
+from src.scheduler import get_scheduler
+from src.cadence import get_cadence_model
 from src.scraper import ScraperManager
 from config.settings import Config
+from web.responses import init_app as init_responses
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +42,9 @@ def create_app():
     # Habilita CORS
     CORS(app)
     
+    # JSON rápido, ETag/304 e compressão gzip/brotli
+    init_responses(app)
+    
     # Inicializa o banco de dados
     try:
         init_database()
@@ -51,10 +60,12 @@ def create_app():
         try:
             stats = DatabaseManager.get_database_stats()
             recent_products = DatabaseManager.get_all_products()[:10]  # Últimos 10 produtos
+            price_stats = DatabaseManager.get_price_stats_map([p.id for p in recent_products])
             
             return render_template('dashboard.html', 
                                  stats=stats, 
-                                 recent_products=recent_products)
+                                 recent_products=recent_products,
+                                 price_stats=price_stats)
         except Exception as e:
             logger.error(f"Erro no dashboard: {e}")
             flash(f"Erro ao carregar dashboard: {e}", 'error')
@@ -75,21 +86,17 @@ def create_app():
     def product_detail(product_id):
         """Página de detalhes do produto"""
         try:
-            product = DatabaseManager.get_product_by_id(product_id)
+            # Produto, estatísticas, alertas ativos e histórico em consultas fixas
+            product = DatabaseManager.get_product_view(product_id, history_limit=50)
             if not product:
                 flash('Produto não encontrado', 'error')
                 return redirect(url_for('products'))
             
-            # Busca histórico de preços
-            price_history = DatabaseManager.get_price_history(product_id, limit=50)
-            
-            # Busca alertas ativos
-            alerts = DatabaseManager.get_active_alerts(product_id)
-            
             return render_template('product_detail.html', 
                                  product=product, 
-                                 price_history=price_history,
-                                 alerts=alerts)
+                                 price_history=product['price_history'],
+                                 price_stats=product['price_stats'],
+                                 alerts=product['alerts'])
         except Exception as e:
             logger.error(f"Erro ao carregar detalhes do produto: {e}")
             flash(f"Erro ao carregar produto: {e}", 'error')
@@ -143,7 +150,8 @@ def create_app():
     def alerts():
         """Página de alertas"""
         try:
-            active_alerts = DatabaseManager.get_active_alerts()
+            # Alertas com o produto já carregado (sem consultas por alerta no template)
+            active_alerts = DatabaseManager.get_alert_views()
             return render_template('alerts.html', alerts=active_alerts)
         except Exception as e:
             logger.error(f"Erro ao carregar alertas: {e}")
@@ -172,58 +180,164 @@ def create_app():
         return render_template('test_scraper.html')
     
     # API Endpoints
+    def page_args() -> Dict[str, Any]:
+        """Parâmetros comuns das APIs paginadas: limit, cursor, fields e since"""
+        limit = request.args.get('limit', Config.API_PAGE_SIZE, type=int)
+        fields = request.args.get('fields')
+        since = request.args.get('since')
+        if since:
+            try:
+                since = datetime.fromisoformat(since.replace('Z', '+00:00'))
+            except ValueError:
+                raise ValueError(f"Data inválida em since: {since}")
+            if since.tzinfo is not None:
+                # O banco guarda UTC sem fuso
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return {
+            'limit': max(1, min(limit, Config.API_MAX_PAGE_SIZE)),
+            'cursor': request.args.get('cursor') or None,
+            'fields': [f.strip() for f in fields.split(',') if f.strip()] if fields else None,
+            'since': since or None,
+            # format=rows: colunas uma vez e linhas como listas (sem um objeto por item)
+            'as_rows': request.args.get('format', 'objects') == 'rows'
+        }
+    
+    def page_response(items, next_cursor, order: str, args: Dict[str, Any], all_fields):
+        if args['as_rows']:
+            payload = {'fields': args['fields'] or list(all_fields), 'rows': items}
+        else:
+            payload = {'items': items}
+        payload.update(next_cursor=next_cursor, order=order, limit=args['limit'])
+        return jsonify(payload)
+    
     @app.route('/api/products')
     def api_products():
-        """API endpoint para listar produtos"""
+        """API endpoint para listar produtos
+        
+        Paginação por cursor: ?order=id|last_updated|price_drop&limit=&cursor=
+        &fields=id,name,current_price&since=<ISO 8601> (alterados depois da data)
+        &format=objects|rows.
+        """
         try:
-            products = DatabaseManager.get_all_products()
-            return jsonify([product.to_dict() for product in products])
+            args = page_args()
+            order = request.args.get('order', 'id')
+            items, next_cursor = DatabaseManager.get_products_page(order=order, **args)
+            return page_response(items, next_cursor, order, args, PRODUCT_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             logger.error(f"Erro na API de produtos: {e}")
             return jsonify({'error': str(e)}), 500
     
     @app.route('/api/product/<int:product_id>/history')
     def api_product_history(product_id):
-        """API endpoint para histórico de preços"""
+        """API endpoint para histórico de preços
+        
+        Com ?range=24h|7d|30d|90d|1y|all retorna a série do período na resolução
+        adequada (bruto, hora, dia, semana ou mês); sem ele, os registros brutos
+        paginados por cursor (?order=desc|asc&limit=&cursor=&fields=&since=&format=).
+        """
         try:
-            limit = request.args.get('limit', 50, type=int)
-            history = DatabaseManager.get_price_history(product_id, limit)
-            return jsonify([h.to_dict() for h in history])
+            range_key = request.args.get('range')
+            if range_key:
+                if range_key not in HISTORY_RANGES:
+                    return jsonify({'error': f'Período inválido: {range_key}'}), 400
+                return jsonify(get_history_manager().get_series(product_id, range_key))
+            
+            args = page_args()
+            order = request.args.get('order', 'desc')
+            if order not in ('desc', 'asc'):
+                return jsonify({'error': f'Ordenação inválida: {order}'}), 400
+            items, next_cursor = DatabaseManager.get_price_history_page(product_id, newest_first=(order == 'desc'), **args)
+            return page_response(items, next_cursor, order, args, HISTORY_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             logger.error(f"Erro na API de histórico: {e}")
             return jsonify({'error': str(e)}), 500
     
     @app.route('/api/product/<int:product_id>/update', methods=['POST'])
     def api_update_product(product_id):
-        """API endpoint para atualizar preço de um produto"""
+        """API endpoint para atualizar preço de um produto
+        
+        A coleta roda na fila de jobs: responde 202 com o id do job, consultável
+        em /api/jobs/<id> (ou pelo evento 'job' em /api/events).
+        """
         try:
             product = DatabaseManager.get_product_by_id(product_id)
             if not product:
                 return jsonify({'error': 'Produto não encontrado'}), 404
             
-            # Faz scraping atualizado
-            product_data = scraper_manager.scrape_product(product.url)
-            
-            if not product_data:
-                return jsonify({'error': 'Não foi possível atualizar o produto'}), 400
+            # Pedidos simultâneos para o mesmo produto reaproveitam o job em andamento
+            job, _ = submit_product_refresh(product_id)
+            status_url = url_for('api_job', job_id=job.id)
             
-            # Atualiza no banco
-            success = DatabaseManager.update_product_price(product_id, product_data.price)
+            response = jsonify({
+                'success': True,
+                'job_id': job.id,
+                'status': job.status,
+                'status_url': status_url,
+                'message': 'Atualização enfileirada'
+            })
+            response.status_code = 202
+            response.headers['Location'] = status_url
+            return response
+                
+        except Exception as e:
+            logger.error(f"Erro ao enfileirar atualização do produto: {e}")
+            return jsonify({'error': str(e)}), 500
+    
+    @app.route('/api/jobs/<job_id>')
+    def api_job(job_id):
+        """API endpoint para o estado de um job (queued, running, done ou failed)"""
+        job = get_job_queue().get(job_id)
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        return jsonify(job.to_dict())
+    
+    @app.route('/api/product/<int:product_id>/refresh_interval', methods=['GET', 'PUT'])
+    def api_product_refresh_interval(product_id):
+        """API endpoint para o intervalo de atualização de um produto
+        
+        PUT {"seconds": N} fixa a cadência sem reiniciar o agendador;
+        {"seconds": null} volta à cadência adaptativa (volatilidade e alertas próximos).
+        """
+        try:
+            product = DatabaseManager.get_product_by_id(product_id)
+            if not product:
+                return jsonify({'error': 'Produto não encontrado'}), 404
             
-            if success:
-                return jsonify({
-                    'success': True,
-                    'old_price': product.current_price,
-                    'new_price': product_data.price,
-                    'message': 'Produto atualizado com sucesso'
-                })
-            else:
-                return jsonify({'error': 'Erro ao atualizar produto'}), 500
+            key = ('product', product_id)
+            if request.method == 'PUT':
+                seconds = (request.get_json(silent=True) or {}).get('seconds')
+                if seconds is not None and (not isinstance(seconds, int) or isinstance(seconds, bool) or seconds <= 0):
+                    return jsonify({'error': 'seconds deve ser um inteiro positivo ou null'}), 400
                 
+                if not DatabaseManager.set_refresh_interval(product_id, seconds):
+                    return jsonify({'error': 'Erro ao salvar intervalo'}), 500
+            else:
+                seconds = product.refresh_interval
+            
+            effective = get_cadence_model().intervals([product_id]).get(product_id, Config.REFRESH_INTERVAL_SECONDS)
+            if request.method == 'PUT':
+                get_scheduler().set_interval(key, effective)
+            
+            return jsonify({
+                'product_id': product_id,
+                'seconds': seconds,
+                'effective_seconds': effective,
+                'schedule': get_scheduler().get_task(key)
+            })
+            
         except Exception as e:
-            logger.error(f"Erro ao atualizar produto: {e}")
+            logger.error(f"Erro no intervalo de atualização do produto {product_id}: {e}")
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/scheduler')
+    def api_scheduler():
+        """API endpoint para as métricas do agendador (atraso da fila e prazos perdidos) e da cadência adaptativa"""
+        return jsonify({**get_scheduler().get_stats(), 'cadence': get_cadence_model().get_stats()})
+    
     @app.route('/api/add_alert', methods=['POST'])
     def api_add_alert():
         """API endpoint para adicionar alerta"""
@@ -235,16 +349,21 @@ def create_app():
             alert_type = data.get('alert_type')
             threshold_price = data.get('threshold_price')
             percentage_threshold = data.get('percentage_threshold')
+            throttle_seconds = data.get('throttle_seconds')  # opcional: padrão ALERT_THROTTLE_SECONDS
             
             if not all([product_id, alert_type]):
                 return jsonify({'error': 'Dados obrigatórios faltando'}), 400
             
+            if throttle_seconds is not None and (not isinstance(throttle_seconds, int) or throttle_seconds <= 0):
+                return jsonify({'error': 'throttle_seconds deve ser um inteiro positivo'}), 400
+            
             alert = DatabaseManager.add_alert(
                 product_id=product_id,
                 chat_id=chat_id,
                 alert_type=alert_type,
                 threshold_price=threshold_price,
-                percentage_threshold=percentage_threshold
+                percentage_threshold=percentage_threshold,
+                throttle_seconds=throttle_seconds
             )
             
             if alert:
@@ -270,6 +389,47 @@ def create_app():
             logger.error(f"Erro na API de estatísticas: {e}")
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/stats/cache')
+    def api_cache_stats():
+        """API endpoint para os contadores do cache de consultas
+        
+        Separado de /api/stats: os contadores mudam a cada leitura e anulariam
+        o ETag do polling do dashboard.
+        """
+        return jsonify(DatabaseManager.get_cache_stats())
+    
+    @app.route('/api/events')
+    def api_events():
+        """Stream SSE de eventos ao vivo (price, alert, stats e resync)
+        
+        ?product_id= limita aos eventos de um produto. Na reconexão o navegador
+        envia Last-Event-ID e recebe os eventos perdidos.
+        """
+        bus = get_event_bus()
+        last_event_id = request.headers.get('Last-Event-ID')
+        subscription = bus.subscribe(last_event_id=last_event_id, product_id=request.args.get('product_id', type=int))
+        if subscription is None:
+            return jsonify({'error': 'Muitas conexões de eventos abertas'}), 503
+        
+        def stream():
+            try:
+                yield f"retry: {Config.SSE_RETRY_MS}\n\n"
+                while True:
+                    events = subscription.get(timeout=Config.SSE_KEEPALIVE_SECONDS)
+                    # Eventos descartados: o cliente recarrega o estado em vez de aplicar deltas
+                    if subscription.take_dropped():
+                        yield "event: resync\ndata: {}\n\n"
+                    if not events:
+                        # Comentário SSE: mantém a conexão e detecta clientes desconectados
+                        yield ": keepalive\n\n"
+                        continue
+                    yield ''.join(event.to_sse() for event in events)
+            finally:
+                bus.unsubscribe(subscription)
+        
+        return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
     # Filtros de template
     @app.template_filter('currency')
     def currency_filter(value):
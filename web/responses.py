@@ -0,0 +1,121 @@
+"""
+Serialização e pós-processamento das respostas da interface web
+JSON rápido (orjson quando instalado), ETag/304 para o polling do dashboard e
+compressão gzip/brotli negociada pelo Accept-Encoding
+"""
+
+import gzip
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+from flask import Flask, Response, request
+from flask.json.provider import DefaultJSONProvider
+
+from config.settings import Config
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Chaves não-string (ex.: mapas por product_id) como no json da biblioteca padrão
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if ORJSON_AVAILABLE else 0
+
+# Tipos de conteúdo que recebem ETag e compressão
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/css', 'application/javascript', 'text/plain'}
+
+def _default(value: Any) -> Any:
+    """Tipos que nenhum dos serializadores trata sozinho"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+def dumps(obj: Any) -> bytes:
+    """Serializa para JSON em bytes (orjson escreve direto de tuplas/listas, sem dicts intermediários)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Provider de JSON do Flask: jsonify() passa a usar orjson quando disponível"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if ORJSON_AVAILABLE and not kwargs:
+            return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS).decode('utf-8')
+        kwargs.setdefault('default', _default)
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+def _negotiate_encoding() -> str:
+    """Codificação aceita pelo cliente, preferindo brotli"""
+    accepted = request.accept_encodings
+    if BROTLI_AVAILABLE and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return ''
+
+def finalize_response(response: Response) -> Response:
+    """Adiciona ETag (304 quando o cliente já tem a versão) e comprime respostas grandes"""
+    if (request.method not in ('GET', 'HEAD') or response.status_code != 200
+            or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    # ETag do corpo sem compressão; o navegador revalida (no-cache) e recebe 304 se nada mudou
+    response.add_etag()
+    response.headers.setdefault('Cache-Control', 'no-cache')
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if not Config.RESPONSE_COMPRESSION_ENABLED or len(body) < Config.COMPRESSION_MIN_SIZE:
+        return response
+
+    encoding = _negotiate_encoding()
+    if not encoding or 'Content-Encoding' in response.headers:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    # Representações comprimidas diferem byte a byte: ETag fraca
+    etag, _ = response.get_etag()
+    response.set_etag(etag, weak=True)
+    return response
+
+def init_app(app: Flask):
+    """Instala o serializador rápido e o pós-processamento das respostas"""
+    app.json = FastJSONProvider(app)
+    app.after_request(finalize_response)
+    logger.info(
+        f"Respostas: JSON via {'orjson' if ORJSON_AVAILABLE else 'json'}, "
+        f"compressão {'br/gzip' if BROTLI_AVAILABLE else 'gzip'} a partir de {Config.COMPRESSION_MIN_SIZE} bytes"
+    )